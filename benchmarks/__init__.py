@@ -0,0 +1 @@
+"""Benchmarks del generador de documentos. Se ejecutan con `python -m benchmarks.<modulo>`."""
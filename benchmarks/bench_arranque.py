@@ -0,0 +1,107 @@
+"""
+Tiempo de arranque en frío de backend.py y api/index.py.
+
+    python -m benchmarks.bench_arranque --repeticiones 5 [--precarga]
+
+Cada repetición corre en un proceso nuevo y mide la importación del punto de entrada,
+la primera respuesta de la página (/) y la primera generación con un archivo pequeño.
+Con --precarga se activa GENERADOR_PRECARGA, que importa pandas y openpyxl en segundo
+plano al arrancar. Se informa la mediana de las repeticiones.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PUNTOS_ENTRADA = ('backend', 'api.index')
+
+
+def medir_arranque(punto_entrada, origen, plantilla):
+    """
+    En el proceso actual: segundos de importación, de la primera página y de la primera
+    generación con los archivos `origen` y `plantilla` (rutas), que incluye importar
+    las dependencias pesadas si no se precargaron.
+    """
+    inicio = time.perf_counter()
+    modulo = __import__(punto_entrada, fromlist=['app'])
+    importacion = time.perf_counter() - inicio
+    pesados = [nombre for nombre in ('pandas', 'openpyxl') if nombre in sys.modules]
+    cliente = modulo.app.test_client()
+
+    inicio = time.perf_counter()
+    respuesta = cliente.get('/')
+    respuesta.close()
+    pagina = time.perf_counter() - inicio
+
+    datos = {'archivo': open(origen, 'rb'), 'plantilla': open(plantilla, 'rb')}
+    inicio = time.perf_counter()
+    respuesta = cliente.post('/api/generar_documentos', data=datos, content_type='multipart/form-data')
+    codigo = respuesta.status_code
+    generacion = time.perf_counter() - inicio
+    if codigo != 200:
+        raise RuntimeError(f'La generación respondió {codigo}')
+    return {'importacion': importacion, 'pagina': pagina, 'generacion': generacion, 'pesados': pesados}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--precarga', action='store_true', help='Activa GENERADOR_PRECARGA')
+    parser.add_argument('--salida', help='Archivo JSON con los resultados')
+    parser.add_argument('--hijo', nargs=3, metavar=('PUNTO', 'ORIGEN', 'PLANTILLA'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo is not None:
+        with open(os.devnull, 'w') as nulo:
+            salida, sys.stdout = sys.stdout, nulo
+            try:
+                resultado = medir_arranque(*args.hijo)
+            finally:
+                sys.stdout = salida
+        print(json.dumps(resultado))
+        return
+
+    # Los archivos se preparan aquí: generarlos en el proceso medido importaría pandas antes de tiempo
+    from benchmarks.sinteticos import generar_archivo_origen, generar_plantilla_sintetica
+
+    directorio = tempfile.mkdtemp(prefix='bench_arranque_')
+    origen = os.path.join(directorio, 'origen.xlsx')
+    plantilla = os.path.join(directorio, 'plantilla.xlsx')
+    with open(origen, 'wb') as archivo:
+        archivo.write(generar_archivo_origen(1, carreras_por_institucion=1, estudiantes_por_carrera=1))
+    with open(plantilla, 'wb') as archivo:
+        archivo.write(generar_plantilla_sintetica())
+
+    entorno = dict(os.environ, GENERADOR_CACHE_DOCUMENTOS_MB='0')
+    entorno['GENERADOR_PRECARGA'] = '1' if args.precarga else '0'
+    resultados = {}
+    for punto_entrada in PUNTOS_ENTRADA:
+        mediciones = []
+        for _ in range(args.repeticiones):
+            proceso = subprocess.run([sys.executable, '-m', 'benchmarks.bench_arranque', '--hijo', punto_entrada,
+                                      origen, plantilla], capture_output=True, text=True, check=True, env=entorno)
+            mediciones.append(json.loads(proceso.stdout.strip().splitlines()[-1]))
+        resumen = {etapa: round(statistics.median(m[etapa] for m in mediciones), 4)
+                   for etapa in ('importacion', 'pagina', 'generacion')}
+        resumen['pesados_al_importar'] = mediciones[0]['pesados']
+        resultados[punto_entrada] = resumen
+        print(f"{punto_entrada:>10}: importación {resumen['importacion'] * 1000:6.0f} ms, "
+              f"primera página {resumen['pagina'] * 1000:5.0f} ms, "
+              f"primera generación {resumen['generacion'] * 1000:6.0f} ms "
+              f"(cargados al importar: {', '.join(resumen['pesados_al_importar']) or 'ninguno'})", file=sys.stderr)
+
+    for ruta in (origen, plantilla):
+        os.remove(ruta)
+    os.rmdir(directorio)
+
+    if args.salida:
+        with open(args.salida, 'w') as archivo:
+            json.dump({'precarga': args.precarga, 'resultados': resultados}, archivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
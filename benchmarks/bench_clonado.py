@@ -0,0 +1,52 @@
+"""
+Compara el clonado de la plantilla preparada con la ruta anterior de guardado y
+recarga (`load_workbook(BytesIO(save_virtual_workbook(wb)))`) por institución.
+
+    python -m benchmarks.bench_clonado --repeticiones 200
+"""
+import argparse
+import time
+from io import BytesIO
+
+from openpyxl import load_workbook
+
+from benchmarks.sinteticos import generar_plantilla_sintetica
+from generador.plantilla import PlantillaPreparada, save_virtual_workbook
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeticiones', type=int, default=100)
+    parser.add_argument('--plantilla', help='Ruta a una plantilla real (por defecto, una sintética)')
+    args = parser.parse_args()
+
+    if args.plantilla:
+        with open(args.plantilla, 'rb') as f:
+            contenido = f.read()
+    else:
+        contenido = generar_plantilla_sintetica()
+
+    wb_plantilla = load_workbook(BytesIO(contenido))
+
+    inicio = time.perf_counter()
+    plantilla = PlantillaPreparada(wb_plantilla)
+    preparacion = time.perf_counter() - inicio
+
+    recarga = medir(lambda: load_workbook(BytesIO(save_virtual_workbook(wb_plantilla))), args.repeticiones)
+    clonado = medir(plantilla.clonar, args.repeticiones)
+
+    print(f"Preparación única de la plantilla: {preparacion * 1000:.2f} ms")
+    print(f"Guardado y recarga por institución: {recarga * 1000:.2f} ms")
+    print(f"Clonado de plantilla preparada:    {clonado * 1000:.2f} ms")
+    print(f"Aceleración: {recarga / clonado:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Mide la escritura en celdas combinadas de una institución con muchas filas: búsqueda
+lineal en merged_cells.ranges frente al índice de celdas combinadas.
+
+    python -m benchmarks.bench_combinadas --filas 1500
+"""
+import argparse
+import os
+import time
+
+from benchmarks.sinteticos import generar_origen_sintetico, generar_plantilla_sintetica
+from generador import documento
+from generador.agregado import agregar_instituciones
+from generador.combinadas import IndiceCombinadas
+from generador.documento import procesar_institucion_en_memoria, rellenar_hoja, set_cell_value
+from generador.plantilla import PlantillaPreparada
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    funcion()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--filas', type=int, default=1200, help='Estudiantes de la única institución')
+    args = parser.parse_args()
+
+    plantilla = PlantillaPreparada.desde_bytes(generar_plantilla_sintetica())
+    origen = generar_origen_sintetico(1, carreras_por_institucion=1, estudiantes_por_carrera=args.filas)
+    registro = agregar_instituciones(origen)[0]
+
+    # Hoja ya llena, con tres rangos combinados por fila a partir de la 90
+    wb = plantilla.clonar()
+    ws = wb.worksheets[plantilla.indice_hoja]
+    rellenar_hoja(ws, registro)
+    combinadas = IndiceCombinadas.desde_hoja(ws)
+    coordenadas = [(fila, columna) for fila in range(90, 88 + args.filas) for columna in (3, 6, 8)]
+    print(f"Rangos combinados en la hoja: {len(ws.merged_cells.ranges)}")
+
+    lineal = medir(lambda: [set_cell_value(ws, f, c, 'x') for f, c in coordenadas])
+    indexada = medir(lambda: [set_cell_value(ws, f, c, 'x', combinadas) for f, c in coordenadas])
+    print(f"Escritura en {len(coordenadas)} celdas combinadas, búsqueda lineal: {lineal * 1000:.1f} ms")
+    print(f"Escritura en {len(coordenadas)} celdas combinadas, con índice:      {indexada * 1000:.1f} ms")
+    print(f"Aceleración: {lineal / indexada:.0f}x")
+
+    for motor in (documento.MOTOR_OPENPYXL, documento.MOTOR_XML):
+        os.environ[documento.VARIABLE_MOTOR] = motor
+        tiempo = medir(lambda: procesar_institucion_en_memoria(registro, plantilla, plantilla.indice_hoja,
+                                                               en_base64=False))
+        print(f"Documento completo con el motor {motor}: {tiempo * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
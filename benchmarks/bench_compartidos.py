@@ -0,0 +1,92 @@
+"""
+Tiempo de generación con instituciones que solo difieren en el nombre, generando cada
+documento o uno por grupo.
+
+    python -m benchmarks.bench_compartidos --instituciones 40 --grupos 4
+
+El origen tiene `--grupos` instituciones distintas y cada una se repite con otros
+nombres hasta sumar `--instituciones`. Para cada motor se mide procesar_instituciones
+contra procesar_compartiendo y se comprueba que los documentos sean iguales salvo
+docProps/core.xml (la fecha de creación).
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+
+from benchmarks.sinteticos import generar_origen_sintetico, generar_plantilla_sintetica
+from generador import documento
+from generador.agregado import InstitucionAgregada, agregar_instituciones
+from generador.columnas import COLUMNA_INSTITUCION
+from generador.compartidos import procesar_compartiendo
+from generador.paralelo import procesar_instituciones
+from generador.plantilla import PlantillaPreparada
+
+
+def repetir(instituciones, total):
+    """`total` instituciones que repiten los datos de `instituciones` con otros nombres"""
+    repetidas = []
+    for i in range(total):
+        registro = instituciones[i % len(instituciones)]
+        nombre = f'{registro.institucion} SEDE {i}'
+        responsable = {**registro.responsable, COLUMNA_INSTITUCION: nombre} if registro.responsable else None
+        repetidas.append(InstitucionAgregada(nombre, registro.filas, registro.fecha_inicio, registro.carreras,
+                                             responsable))
+    return repetidas
+
+
+def partes(contenido):
+    with zipfile.ZipFile(io.BytesIO(contenido)) as paquete:
+        return {nombre: paquete.read(nombre) for nombre in paquete.namelist() if nombre != 'docProps/core.xml'}
+
+
+def medir(generar):
+    inicio = time.perf_counter()
+    archivos = list(generar())
+    return time.perf_counter() - inicio, archivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--instituciones', type=int, default=40)
+    parser.add_argument('--grupos', type=int, default=4, help='Instituciones con datos distintos')
+    parser.add_argument('--estudiantes', type=int, default=20, help='Estudiantes por carrera')
+    parser.add_argument('--salida', help='Archivo JSON con los resultados')
+    args = parser.parse_args()
+
+    plantilla = PlantillaPreparada.desde_bytes(generar_plantilla_sintetica())
+    origen = generar_origen_sintetico(args.grupos, carreras_por_institucion=3, estudiantes_por_carrera=args.estudiantes)
+    instituciones = repetir(agregar_instituciones(origen), args.instituciones)
+    indice_hoja = plantilla.indice_hoja
+
+    salida_original, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    resultados = []
+    try:
+        for motor in (documento.MOTOR_OPENPYXL, documento.MOTOR_XML):
+            os.environ[documento.VARIABLE_MOTOR] = motor
+            individual, esperados = medir(lambda: procesar_instituciones(instituciones, plantilla, indice_hoja,
+                                                                         procesos=1, en_base64=False))
+            compartido, obtenidos = medir(lambda: procesar_compartiendo(instituciones, plantilla, indice_hoja,
+                                                                        procesos=1))
+            iguales = all(partes(a['contenido']) == partes(b['contenido']) for a, b in zip(esperados, obtenidos))
+            resultados.append({'motor': motor, 'individual_s': round(individual, 4),
+                               'compartido_s': round(compartido, 4), 'iguales': iguales})
+    finally:
+        sys.stdout.close()
+        sys.stdout = salida_original
+
+    for fila in resultados:
+        print(f"{fila['motor']:>8}: individual {fila['individual_s']:.3f} s, compartido {fila['compartido_s']:.3f} s "
+              f"({fila['individual_s'] / fila['compartido_s']:.2f}x), "
+              f"{'iguales' if fila['iguales'] else 'DISTINTOS'}", file=sys.stderr)
+
+    if args.salida:
+        with open(args.salida, 'w') as archivo:
+            json.dump(resultados, archivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Tiempo de guardado y tamaño de los documentos según el nivel de compresión.
+
+    python -m benchmarks.bench_compresion --instituciones 20 --niveles 0 1 6 9
+
+Para cada motor, nivel de GENERADOR_COMPRESION_DOCUMENTOS y valor de
+GENERADOR_CONSERVAR_PARTES genera los mismos documentos y mide el tiempo de la etapa
+de guardado y los bytes producidos. Después mide el ZIP que los reúne con cada nivel
+de GENERADOR_COMPRESION_PAQUETES.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from benchmarks.sinteticos import generar_origen_sintetico, generar_plantilla_sintetica
+from generador import compresion, documento, metricas
+from generador.agregado import agregar_instituciones
+from generador.empaquetado import transmitir_zip
+from generador.plantilla import PlantillaPreparada
+
+
+def generar(plantilla, instituciones):
+    """Documentos de las instituciones con la configuración actual y segundos de guardado"""
+    with metricas.recolectar(observar=False) as recolector:
+        archivos = [documento.procesar_institucion_en_memoria(registro, plantilla, plantilla.indice_hoja, en_base64=False)
+                    for registro in instituciones]
+    return archivos, recolector.tiempos.get('guardado', 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--instituciones', type=int, default=20)
+    parser.add_argument('--estudiantes', type=int, default=40, help='Estudiantes por carrera')
+    parser.add_argument('--niveles', type=int, nargs='+', default=[0, 1, 3, 6, 9])
+    parser.add_argument('--motores', nargs='+', default=[documento.MOTOR_OPENPYXL, documento.MOTOR_XML],
+                        choices=[documento.MOTOR_OPENPYXL, documento.MOTOR_XML])
+    parser.add_argument('--salida', help='Archivo JSON con los resultados')
+    args = parser.parse_args()
+
+    plantilla = PlantillaPreparada.desde_bytes(generar_plantilla_sintetica())
+    origen = generar_origen_sintetico(args.instituciones, carreras_por_institucion=3,
+                                      estudiantes_por_carrera=args.estudiantes)
+    instituciones = agregar_instituciones(origen)
+
+    salida_original, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    resultados = {'documentos': [], 'paquetes': []}
+    try:
+        for motor in args.motores:
+            os.environ[documento.VARIABLE_MOTOR] = motor
+            for nivel in args.niveles:
+                os.environ[compresion.VARIABLE_NIVEL_DOCUMENTOS] = str(nivel)
+                for conservar in ('1', '0'):
+                    os.environ[compresion.VARIABLE_CONSERVAR_PARTES] = conservar
+                    archivos, guardado = generar(plantilla, instituciones)
+                    resultados['documentos'].append({
+                        'motor': motor, 'nivel': nivel, 'conservar_partes': conservar == '1',
+                        'guardado_ms_doc': round(guardado / len(archivos) * 1000, 3),
+                        'bytes_doc': round(sum(len(a['contenido']) for a in archivos) / len(archivos)),
+                    })
+
+        # El paquete reúne los documentos con la configuración por omisión
+        for variable in (compresion.VARIABLE_NIVEL_DOCUMENTOS, compresion.VARIABLE_CONSERVAR_PARTES):
+            os.environ.pop(variable, None)
+        archivos, _ = generar(plantilla, instituciones)
+        for nivel in args.niveles:
+            os.environ[compresion.VARIABLE_NIVEL_PAQUETES] = str(nivel)
+            inicio = time.perf_counter()
+            total = sum(len(parte) for parte in transmitir_zip(archivos))
+            resultados['paquetes'].append({'nivel': nivel, 'segundos': round(time.perf_counter() - inicio, 4),
+                                           'bytes': total})
+    finally:
+        sys.stdout.close()
+        sys.stdout = salida_original
+
+    for fila in resultados['documentos']:
+        print(f"{fila['motor']:>8} nivel {fila['nivel']} {'conservando' if fila['conservar_partes'] else 'recomprimiendo'}: "
+              f"guardado {fila['guardado_ms_doc']:7.2f} ms/doc, {fila['bytes_doc'] / 1024:7.1f} KB/doc", file=sys.stderr)
+    for fila in resultados['paquetes']:
+        print(f"paquete nivel {fila['nivel']}: {fila['segundos'] * 1000:7.1f} ms, {fila['bytes'] / 1024:8.1f} KB",
+              file=sys.stderr)
+
+    if args.salida:
+        with open(args.salida, 'w') as archivo:
+            json.dump(resultados, archivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
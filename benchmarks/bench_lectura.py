@@ -0,0 +1,66 @@
+"""
+Compara la lectura completa del archivo origen (pd.read_excel de todas las columnas)
+con el lector proyectado de generador.lectura, en tiempo y memoria máxima.
+
+    python -m benchmarks.bench_lectura --filas 50000
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+from benchmarks.sinteticos import generar_origen_sintetico
+from generador import lectura
+
+
+def medir(funcion):
+    """Tiempo de una ejecución y memoria máxima de otra (tracemalloc distorsiona el tiempo)"""
+    inicio = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - inicio
+    del resultado
+    tracemalloc.start()
+    resultado = funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, duracion, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--filas', type=int, default=50000)
+    args = parser.parse_args()
+
+    estudiantes = max(1, args.filas // (100 * 5))
+    origen = generar_origen_sintetico(100, carreras_por_institucion=5, estudiantes_por_carrera=estudiantes)
+    # Columnas que trae una exportación regional y que el generador no usa
+    for extra in ('CURP', 'CORREO', 'TELEFONO', 'DOMICILIO', 'OBSERVACIONES'):
+        origen[extra] = [f'{extra} {n}' for n in range(len(origen))]
+    salida = BytesIO()
+    origen.to_excel(salida, index=False)
+    contenido = salida.getvalue()
+    print(f"Archivo origen: {len(origen)} filas, {len(origen.columns)} columnas, {len(contenido) / 1e6:.1f} MB")
+
+    _, duracion, pico = medir(lambda: lectura.leer_encabezados(contenido))
+    print(f"Solo encabezados:         {duracion:6.2f} s, pico {pico / 1e6:7.1f} MB")
+
+    df, duracion, pico = medir(lambda: pd.read_excel(BytesIO(contenido)))
+    print(f"read_excel completo:      {duracion:6.2f} s, pico {pico / 1e6:7.1f} MB, "
+          f"DataFrame {df.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+
+    for lector in (lectura.LECTOR_PANDAS, lectura.LECTOR_CALAMINE):
+        os.environ[lectura.VARIABLE_LECTOR] = lector
+        try:
+            df, duracion, pico = medir(lambda: lectura.leer_origen(contenido))
+        except ImportError:
+            print(f"Lector {lector}: no instalado")
+            continue
+        print(f"Lector proyectado {lector:8}{duracion:6.2f} s, pico {pico / 1e6:7.1f} MB, "
+              f"DataFrame {df.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
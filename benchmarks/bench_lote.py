@@ -0,0 +1,92 @@
+"""
+Tiempo total de varios archivos origen: una solicitud por archivo contra una de lote.
+
+    GENERADOR_PROCESOS=4 python -m benchmarks.bench_lote --origenes 6 --instituciones 10
+
+Con /api/generar_documentos cada archivo es una solicitud que prepara su plan y, con
+más de un proceso, inicia su propio pool; /api/generar_lote prepara la plantilla una
+vez y genera las instituciones de todos los archivos en una sola cola. La caché de
+documentos se desactiva para que ambas rutas generen todo; la de plantillas se vacía
+antes de cada medición.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault('GENERADOR_CACHE_DOCUMENTOS_MB', '0')
+
+from benchmarks.sinteticos import generar_archivo_origen, generar_plantilla_sintetica
+from generador import plantilla as modulo_plantilla
+
+
+def _vaciar_cache_plantillas():
+    modulo_plantilla._cache = None
+
+
+def por_archivo(cliente, origenes, plantilla):
+    _vaciar_cache_plantillas()
+    inicio = time.perf_counter()
+    for nombre, contenido in origenes:
+        respuesta = cliente.post('/api/generar_documentos',
+                                 data={'archivo': (io.BytesIO(contenido), nombre),
+                                       'plantilla': (io.BytesIO(plantilla), 'plantilla.xlsx')},
+                                 content_type='multipart/form-data')
+        if not json.loads(respuesta.get_data()).get('success'):
+            raise RuntimeError(f'La generación de {nombre} falló')
+    return time.perf_counter() - inicio
+
+
+def en_lote(cliente, origenes, plantilla):
+    _vaciar_cache_plantillas()
+    inicio = time.perf_counter()
+    respuesta = cliente.post('/api/generar_lote',
+                             data={'archivos': [(io.BytesIO(contenido), nombre) for nombre, contenido in origenes],
+                                   'plantilla': (io.BytesIO(plantilla), 'plantilla.xlsx')},
+                             content_type='multipart/form-data')
+    if not json.loads(respuesta.get_data()).get('success'):
+        raise RuntimeError('La generación del lote falló')
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--origenes', type=int, default=6, help='Archivos origen (una oficina regional cada uno)')
+    parser.add_argument('--instituciones', type=int, default=10, help='Instituciones por archivo')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--salida', help='Archivo JSON con los resultados')
+    args = parser.parse_args()
+
+    import backend
+
+    plantilla = generar_plantilla_sintetica()
+    origenes = [(f'region_{i}.xlsx', generar_archivo_origen(args.instituciones, carreras_por_institucion=3,
+                                                             estudiantes_por_carrera=4))
+                for i in range(args.origenes)]
+    cliente = backend.app.test_client()
+
+    salida_original, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        tiempos = {'por_archivo': [], 'lote': []}
+        for _ in range(args.repeticiones):
+            tiempos['por_archivo'].append(por_archivo(cliente, origenes, plantilla))
+            tiempos['lote'].append(en_lote(cliente, origenes, plantilla))
+    finally:
+        sys.stdout.close()
+        sys.stdout = salida_original
+
+    resultados = {ruta: round(min(valores), 4) for ruta, valores in tiempos.items()}
+    resultados['procesos'] = os.environ.get('GENERADOR_PROCESOS', '1')
+    print(f"{args.origenes} archivos x {args.instituciones} instituciones, procesos={resultados['procesos']}: "
+          f"por archivo {resultados['por_archivo']:.3f} s, lote {resultados['lote']:.3f} s "
+          f"({resultados['por_archivo'] / resultados['lote']:.2f}x)", file=sys.stderr)
+
+    if args.salida:
+        with open(args.salida, 'w') as archivo:
+            json.dump(resultados, archivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
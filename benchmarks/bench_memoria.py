@@ -0,0 +1,77 @@
+"""
+Memoria máxima (RSS) de una solicitud a /api/generar_documentos según el número de instituciones.
+
+    python -m benchmarks.bench_memoria --instituciones 50 200 800 --formato json
+
+Cada medición corre en un proceso nuevo, que consume la respuesta por partes como
+lo haría un cliente y la descarta. La línea base es el RSS del mismo proceso después
+de importar todo y preparar los archivos, antes de la solicitud.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+
+def medir_solicitud(instituciones, formato, estudiantes):
+    """En el proceso actual: (RSS base, RSS máximo) en MB, bytes de respuesta y segundos"""
+    from io import BytesIO
+
+    from flask import Flask
+
+    from benchmarks.sinteticos import generar_archivo_origen, generar_plantilla_sintetica
+    from generador.rutas import bp
+
+    # Con la caché de documentos se retendrían todos los documentos generados
+    os.environ.setdefault('GENERADOR_CACHE_DOCUMENTOS_MB', '0')
+
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    cliente = app.test_client()
+    origen = generar_archivo_origen(instituciones, carreras_por_institucion=3, estudiantes_por_carrera=estudiantes)
+    plantilla = generar_plantilla_sintetica()
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    inicio = time.perf_counter()
+    respuesta = cliente.post(f'/api/generar_documentos?formato={formato}', data={
+        'archivo': (BytesIO(origen), 'origen.xlsx'),
+        'plantilla': (BytesIO(plantilla), 'plantilla.xlsx'),
+    }, content_type='multipart/form-data', buffered=False)
+    total = sum(len(parte) for parte in respuesta.response)
+    duracion = time.perf_counter() - inicio
+    respuesta.close()
+    return base, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, total, duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--instituciones', type=int, nargs='+', default=[50, 200, 800])
+    parser.add_argument('--estudiantes', type=int, default=4, help='Estudiantes por carrera')
+    parser.add_argument('--formato', choices=['json', 'zip'], default='json')
+    parser.add_argument('--hijo', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo is not None:
+        with open(os.devnull, 'w') as nulo:
+            salida, sys.stdout = sys.stdout, nulo
+            try:
+                resultado = medir_solicitud(args.hijo, args.formato, args.estudiantes)
+            finally:
+                sys.stdout = salida
+        print(json.dumps(resultado))
+        return
+
+    for instituciones in args.instituciones:
+        proceso = subprocess.run([sys.executable, '-m', 'benchmarks.bench_memoria', '--hijo', str(instituciones),
+                                  '--formato', args.formato, '--estudiantes', str(args.estudiantes)],
+                                 capture_output=True, text=True, check=True)
+        base, pico, total, duracion = json.loads(proceso.stdout.strip().splitlines()[-1])
+        print(f"{instituciones:>5} instituciones: RSS base {base:6.1f} MB, pico {pico:6.1f} MB "
+              f"(+{pico - base:5.1f} MB), respuesta {total / 1e6:6.1f} MB en {duracion:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Compara el tiempo de formatear actividades con la función original y con el
+normalizador memorizado de generador.normalizacion.
+
+    python -m benchmarks.bench_normalizacion --filas 200000
+
+Las funciones originales se conservan aquí como referencia; tests/test_normalizacion.py
+verifica que los normalizadores den exactamente lo mismo que ellas.
+"""
+import argparse
+import random
+import re
+import sys
+import time
+
+from generador.normalizacion import Normalizador, formatear_actividad
+
+
+def format_career_name_original(career_name):
+    words = career_name.split()
+    formatted_words = []
+    for word in words:
+        if word.upper() in ['DE', 'DEL', 'LA', 'LAS', 'LOS', 'Y', 'EN']:
+            formatted_words.append(word.lower())
+        else:
+            formatted_words.append(word.capitalize())
+    return ' '.join(formatted_words)
+
+
+def format_activity_text_original(activity_text):
+    if not activity_text:
+        return activity_text
+    formatted_text = activity_text.lower()
+    sentences = re.split(r'(\.+\s*)', formatted_text)
+    formatted_sentences = []
+    capitalize_next = True
+    for part in sentences:
+        if part.strip() == '':
+            formatted_sentences.append(part)
+        elif re.match(r'\.+', part):
+            formatted_sentences.append(part)
+            capitalize_next = True
+        else:
+            if capitalize_next:
+                if part:
+                    formatted_sentences.append(part[0].upper() + part[1:])
+                else:
+                    formatted_sentences.append(part)
+                capitalize_next = False
+            else:
+                formatted_sentences.append(part)
+    return ''.join(formatted_sentences)
+
+
+def medir(funcion, textos):
+    inicio = time.perf_counter()
+    for texto in textos:
+        funcion(texto)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--filas', type=int, default=100000)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    # Carga típica: unos cientos de actividades distintas repetidas en miles de filas
+    aleatorio = random.Random(args.semilla)
+    actividades = [f'APOYO EN EL AREA {n}. REVISION DE DOCUMENTOS... Y ARCHIVO' for n in range(300)]
+    textos = [aleatorio.choice(actividades) for _ in range(args.filas)]
+    original = medir(format_activity_text_original, textos)
+    memorizada = medir(Normalizador(formatear_actividad), textos)
+    print(f"{len(textos)} actividades: original {original * 1000:.0f} ms, memorizada {memorizada * 1000:.0f} ms "
+          f"({original / memorizada:.0f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+Compara la generación secuencial con el pool de procesos para varias cantidades de procesos.
+
+    python -m benchmarks.bench_paralelo --instituciones 200 --procesos 1 2 4 8
+"""
+import argparse
+import time
+
+from benchmarks.sinteticos import generar_origen_sintetico, generar_plantilla_sintetica
+from generador.agregado import agregar_instituciones
+from generador.paralelo import procesar_instituciones
+from generador.plantilla import PlantillaPreparada
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--instituciones', type=int, default=100)
+    parser.add_argument('--carreras', type=int, default=3)
+    parser.add_argument('--estudiantes', type=int, default=5)
+    parser.add_argument('--procesos', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    instituciones = agregar_instituciones(generar_origen_sintetico(args.instituciones, args.carreras, args.estudiantes))
+    plantilla = PlantillaPreparada.desde_bytes(generar_plantilla_sintetica())
+
+    base = None
+    for procesos in args.procesos:
+        inicio = time.perf_counter()
+        documentos = list(procesar_instituciones(instituciones, plantilla, 1, procesos=procesos))
+        duracion = time.perf_counter() - inicio
+        base = base or duracion
+        print(f"{procesos:>2} procesos: {duracion:.2f} s para {len(documentos)} documentos "
+              f"(aceleración {base / duracion:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
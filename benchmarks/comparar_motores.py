@@ -0,0 +1,125 @@
+"""
+Genera los mismos documentos con el motor openpyxl y con el motor XML, verifica
+que el contenido sea equivalente celda por celda y compara los tiempos.
+
+    python -m benchmarks.comparar_motores --instituciones 20
+
+Termina con código 1 si algún documento difiere.
+"""
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+
+from openpyxl import load_workbook
+
+from benchmarks.sinteticos import generar_origen_sintetico, generar_plantilla_sintetica
+from generador import documento
+from generador.agregado import agregar_instituciones
+from generador.plantilla import PlantillaPreparada
+
+# Conjuntos de datos: nombre -> parámetros de generar_origen_sintetico y columnas a eliminar
+ESCENARIOS = {
+    'basico': ({'carreras_por_institucion': 1, 'estudiantes_por_carrera': 2}, ()),
+    'desbordado': ({'carreras_por_institucion': 6, 'estudiantes_por_carrera': 4}, ()),
+    'muchos_estudiantes': ({'carreras_por_institucion': 3, 'estudiantes_por_carrera': 40,
+                            'actividades_por_estudiante': 2}, ()),
+    'columnas_faltantes': ({'carreras_por_institucion': 2}, ('FECHA DE INICIO', 'ACTIVIDADES')),
+    # Tabla por encima de GENERADOR_UMBRAL_FILAS: con openpyxl configurado se escribe por filas
+    'tabla_grande': ({'carreras_por_institucion': 2, 'estudiantes_por_carrera': 600}, ()),
+}
+
+
+def describir_celda(celda):
+    return (
+        celda.value,
+        celda.number_format,
+        repr(celda.font),
+        repr(celda.border),
+        repr(celda.alignment),
+        repr(celda.fill),
+    )
+
+
+def describir_documento(contenido, excluir):
+    """Valores, estilos, rangos combinados y anchos de cada hoja del documento"""
+    wb = load_workbook(BytesIO(contenido))
+    hojas = {}
+    for ws in wb.worksheets:
+        celdas = {(c.row, c.column): describir_celda(c)
+                  for fila in ws.iter_rows() for c in fila
+                  if (ws.title, c.row, c.column) not in excluir}
+        hojas[ws.title] = (
+            celdas,
+            sorted(str(r) for r in ws.merged_cells.ranges),
+            {letra: d.width for letra, d in ws.column_dimensions.items() if d.customWidth},
+        )
+    return hojas
+
+
+def celdas_combinadas_plantilla(contenido):
+    # openpyxl normaliza al cargar las celdas combinadas de la plantilla (estilo y bordes),
+    # mientras que el motor XML las conserva tal cual; no se comparan
+    wb = load_workbook(BytesIO(contenido))
+    excluir = set()
+    for ws in wb.worksheets:
+        for rango in ws.merged_cells.ranges:
+            for fila, columna in list(rango.cells)[1:]:
+                excluir.add((ws.title, fila, columna))
+    return excluir
+
+
+def generar(motor, plantilla, instituciones):
+    os.environ[documento.VARIABLE_MOTOR] = motor
+    # Sin umbral, para que el motor openpyxl escriba también las tablas grandes
+    os.environ[documento.VARIABLE_UMBRAL_FILAS] = '0'
+    inicio = time.perf_counter()
+    archivos = [documento.procesar_institucion_en_memoria(registro, plantilla, plantilla.indice_hoja, en_base64=False)
+                for registro in instituciones]
+    return archivos, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--instituciones', type=int, default=10)
+    parser.add_argument('--plantilla', help='Ruta a una plantilla real (por defecto, una sintética)')
+    args = parser.parse_args()
+
+    if args.plantilla:
+        with open(args.plantilla, 'rb') as f:
+            contenido = f.read()
+    else:
+        contenido = generar_plantilla_sintetica()
+
+    plantilla = PlantillaPreparada.desde_bytes(contenido)
+    if plantilla.plantilla_xml(plantilla.indice_hoja) is None:
+        print("La plantilla no es compatible con el motor XML")
+        sys.exit(1)
+    excluir = celdas_combinadas_plantilla(contenido)
+
+    diferencias = 0
+    for escenario, (parametros, faltantes) in ESCENARIOS.items():
+        origen = generar_origen_sintetico(args.instituciones, **parametros).drop(columns=list(faltantes))
+        instituciones = agregar_instituciones(origen)
+
+        esperados, tiempo_openpyxl = generar(documento.MOTOR_OPENPYXL, plantilla, instituciones)
+        obtenidos, tiempo_xml = generar(documento.MOTOR_XML, plantilla, instituciones)
+
+        for esperado, obtenido in zip(esperados, obtenidos):
+            if describir_documento(esperado['contenido'], excluir) != describir_documento(obtenido['contenido'], excluir):
+                diferencias += 1
+                print(f"DIFERENCIA en {escenario}: {esperado['nombre']}")
+
+        print(f"{escenario}: openpyxl {tiempo_openpyxl / len(instituciones) * 1000:.2f} ms/doc, "
+              f"xml {tiempo_xml / len(instituciones) * 1000:.2f} ms/doc "
+              f"({tiempo_openpyxl / tiempo_xml:.1f}x)")
+
+    if diferencias:
+        print(f"{diferencias} documentos difieren entre motores")
+        sys.exit(1)
+    print("Los documentos de ambos motores son equivalentes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Datos sintéticos para los benchmarks."""
+from io import BytesIO
+
+from openpyxl import Workbook
+from openpyxl.styles import Border, Side, Alignment, Font
+
+
+def generar_plantilla_sintetica():
+    """
+    Construye un XLSX con la distribución de filas que espera el generador:
+    fecha en la fila 7, dirección en la 66, tabla de carreras en 88/89 y
+    datos del responsable en 116/119/122. Devuelve los bytes del archivo.
+    """
+    wb = Workbook()
+    wb.active.title = 'PORTADA'
+    wb.active['A1'] = 'REGISTRO DE PROGRAMAS'
+    ws = wb.create_sheet('REG. DE PROG.')
+
+    borde = Border(left=Side(style='thin'), right=Side(style='thin'),
+                   top=Side(style='thin'), bottom=Side(style='thin'))
+    centrado = Alignment(horizontal='center', vertical='center', wrap_text=True)
+
+    for columna, ancho in (('A', 4), ('B', 12), ('E', 6), ('G', 40)):
+        ws.column_dimensions[columna].width = ancho
+    ws.row_dimensions[87].height = 24
+
+    # Texto fijo y formato en el cuerpo del documento
+    for fila in range(1, 130):
+        ws.cell(row=fila, column=1).value = f'Etiqueta {fila}' if fila % 5 == 0 else None
+        for col in range(2, 9):
+            ws.cell(row=fila, column=col).font = Font(size=10)
+
+    ws.cell(row=7, column=2).value = 'FECHA DE INICIO:'
+    ws.merge_cells(start_row=7, start_column=5, end_row=7, end_column=8)
+    ws.cell(row=66, column=2).value = 'DIRECCIÓN:'
+    ws.merge_cells(start_row=66, start_column=6, end_row=66, end_column=8)
+
+    # Encabezado y filas preformateadas de la tabla de carreras
+    ws.cell(row=87, column=2).value = 'CARRERA'
+    ws.cell(row=87, column=5).value = 'ALUMNOS'
+    ws.cell(row=87, column=7).value = 'ACTIVIDADES'
+    for fila in (88, 89):
+        for col in range(2, 9):
+            celda = ws.cell(row=fila, column=col)
+            celda.border = borde
+            celda.alignment = centrado
+            celda.font = Font(size=9)
+        ws.merge_cells(start_row=fila, start_column=2, end_row=fila, end_column=4)
+        ws.merge_cells(start_row=fila, start_column=5, end_row=fila, end_column=6)
+        ws.merge_cells(start_row=fila, start_column=7, end_row=fila, end_column=8)
+
+    # Datos del responsable
+    for fila, etiqueta in ((116, 'INSTITUCIÓN:'), (119, 'NOMBRE:'), (122, 'CARGO:')):
+        ws.cell(row=fila, column=2).value = etiqueta
+        ws.merge_cells(start_row=fila, start_column=5, end_row=fila, end_column=8)
+
+    salida = BytesIO()
+    wb.save(salida)
+    return salida.getvalue()
+
+
+def generar_origen_sintetico(instituciones=50, carreras_por_institucion=3, estudiantes_por_carrera=5,
+                             actividades_por_estudiante=1, semilla=0):
+    """
+    Construye un DataFrame con las columnas del archivo origen. Cada estudiante
+    aporta `actividades_por_estudiante` filas con actividades distintas.
+    """
+    import random
+
+    import pandas as pd
+
+    aleatorio = random.Random(semilla)
+    actividades = [f'APOYO EN EL AREA {n}. REVISION DE DOCUMENTOS Y ARCHIVO' for n in range(20)]
+    filas = []
+    for i in range(instituciones):
+        institucion = f'INSTITUTO TECNOLOGICO NUM. {i}'
+        for c in range(carreras_por_institucion):
+            carrera = f'INGENIERIA EN SISTEMAS DE LA ESPECIALIDAD {c}'
+            for e in range(estudiantes_por_carrera):
+                for a in range(actividades_por_estudiante):
+                    filas.append({
+                        'INSTITUCION': institucion,
+                        'NOMBRES': f'ESTUDIANTE {e}',
+                        'APELLIDO PATERNO': 'PEREZ',
+                        'CARRERA': carrera,
+                        'ACTIVIDADES': actividades[(e + a) % len(actividades)],
+                        'FECHA DE INICIO': pd.Timestamp('2025-01-06') + pd.Timedelta(days=aleatorio.randint(0, 60)),
+                        'NOMBRE A QUIEN SE DIRIGE CARTA DE ACEPTACION': f'LIC. RESPONSABLE {i}',
+                        'CARGO ESCOLAR': 'DIRECTOR',
+                        'REGION': 'ALTIPLANO',
+                    })
+    return pd.DataFrame(filas)
+
+
+def generar_archivo_origen(instituciones=50, carreras_por_institucion=3, estudiantes_por_carrera=5,
+                           actividades_por_estudiante=1, semilla=0):
+    """Igual que generar_origen_sintetico, pero devuelve los bytes del XLSX como se subiría"""
+    origen = generar_origen_sintetico(instituciones, carreras_por_institucion, estudiantes_por_carrera,
+                                      actividades_por_estudiante, semilla)
+    salida = BytesIO()
+    origen.to_excel(salida, index=False)
+    return salida.getvalue()
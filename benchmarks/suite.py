@@ -0,0 +1,220 @@
+"""
+Suite de benchmarks del generador sobre escenarios sintéticos, con resultados en JSON.
+
+Para cada escenario mide la latencia de extremo a extremo de /api/generar_documentos,
+el tiempo de cada etapa (lectura, agrupación, clonado, llenado, guardado y
+codificación, sumado sobre todas las instituciones) y la memoria máxima de una
+solicitud. El JSON se puede guardar por versión para detectar regresiones.
+
+    python -m benchmarks.suite --salida resultados.json
+    python -m benchmarks.suite --escenarios basico desbordado --repeticiones 5
+
+El motor, el lector y los procesos se toman de GENERADOR_MOTOR, GENERADOR_LECTOR y
+GENERADOR_PROCESOS, igual que en el servidor. La caché de documentos se desactiva
+salvo que se indique GENERADOR_CACHE_DOCUMENTOS_MB. El resumen legible va a stderr.
+"""
+import argparse
+import base64
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib import metadata
+from io import BytesIO
+
+from flask import Flask
+
+from benchmarks.sinteticos import generar_archivo_origen, generar_plantilla_sintetica
+from generador import documento, incremental
+from generador.agregado import agregar_instituciones
+from generador.compresion import conservar_partes, guardar_libro, nivel_documentos
+from generador.lectura import lector_configurado, leer_origen
+from generador.paralelo import procesos_configurados
+from generador.plantilla import PlantillaPreparada
+from generador.rutas import bp
+
+# Parámetros de generar_archivo_origen para cada escenario
+ESCENARIOS = {
+    'basico': dict(instituciones=20, carreras_por_institucion=3, estudiantes_por_carrera=5),
+    'muchas_instituciones': dict(instituciones=200, carreras_por_institucion=2, estudiantes_por_carrera=3),
+    'desbordado': dict(instituciones=10, carreras_por_institucion=4, estudiantes_por_carrera=12,
+                       actividades_por_estudiante=2),
+    'muchos_estudiantes': dict(instituciones=2, carreras_por_institucion=2, estudiantes_por_carrera=500),
+}
+
+ETAPAS = ('lectura', 'agrupacion', 'clonado', 'llenado', 'guardado', 'codificacion')
+
+
+def medir_etapas(contenido, plantilla):
+    """
+    Recorre las mismas etapas que leer_entrada y procesar_institucion_en_memoria,
+    tomando el tiempo de cada una. Devuelve (tiempos por etapa, filas, documentos).
+    """
+    reloj = time.perf_counter
+    tiempos = dict.fromkeys(ETAPAS, 0.0)
+
+    inicio = reloj()
+    df = leer_origen(contenido)
+    tiempos['lectura'] = reloj() - inicio
+
+    inicio = reloj()
+    instituciones = agregar_instituciones(df)
+    tiempos['agrupacion'] = reloj() - inicio
+
+    indice_hoja = plantilla.indice_hoja
+    partes = plantilla.partes_originales() if conservar_partes() else None
+
+    for registro in instituciones:
+        plantilla_xml = None
+        if documento.motor_documento(registro) == documento.MOTOR_XML:
+            plantilla_xml = plantilla.plantilla_xml(indice_hoja)
+        inicio = reloj()
+        if plantilla_xml is not None:
+            documento_xml = plantilla_xml.nuevo_documento()
+            ws = documento_xml.hoja
+        else:
+            wb = plantilla.clonar()
+            ws = wb.worksheets[min(indice_hoja, len(wb.worksheets) - 1)]
+        clonado = reloj()
+        documento.rellenar_hoja(ws, registro, plantilla.combinadas(indice_hoja), plantilla.plan(indice_hoja))
+        llenado = reloj()
+        if plantilla_xml is not None:
+            contenido_documento = documento_xml.guardar()
+        else:
+            contenido_documento = guardar_libro(wb, partes)
+        guardado = reloj()
+        base64.b64encode(contenido_documento).decode('utf-8')
+        codificado = reloj()
+
+        tiempos['clonado'] += clonado - inicio
+        tiempos['llenado'] += llenado - clonado
+        tiempos['guardado'] += guardado - llenado
+        tiempos['codificacion'] += codificado - guardado
+
+    return tiempos, len(df), len(instituciones)
+
+
+def solicitar(cliente, contenido, contenido_plantilla):
+    """Una solicitud a /api/generar_documentos con respuesta JSON"""
+    respuesta = cliente.post('/api/generar_documentos', data={
+        'archivo': (BytesIO(contenido), 'origen.xlsx'),
+        'plantilla': (BytesIO(contenido_plantilla), 'plantilla.xlsx'),
+    }, content_type='multipart/form-data')
+    # La respuesta se transmite por partes: leerla completa es parte de la latencia
+    cuerpo = respuesta.get_data(as_text=True)
+    if respuesta.status_code != 200 or not json.loads(cuerpo).get('success'):
+        raise RuntimeError(f"La solicitud falló con {respuesta.status_code}: {cuerpo[-500:]}")
+    return respuesta
+
+
+def resumir(valores):
+    return {
+        'mediana': round(statistics.median(valores), 6),
+        'minimo': round(min(valores), 6),
+        'maximo': round(max(valores), 6),
+    }
+
+
+def ejecutar_escenario(cliente, parametros, contenido_plantilla, repeticiones):
+    contenido = generar_archivo_origen(**parametros)
+    plantilla = PlantillaPreparada.desde_bytes(contenido_plantilla)
+
+    # La salida del generador (un print por documento) no forma parte de la medición
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        # Calentamiento: importaciones perezosas, caché de plantillas y plantilla XML
+        solicitar(cliente, contenido, contenido_plantilla)
+        medir_etapas(contenido, plantilla)
+
+        latencias = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            solicitar(cliente, contenido, contenido_plantilla)
+            latencias.append(time.perf_counter() - inicio)
+
+        mediciones = [medir_etapas(contenido, plantilla) for _ in range(repeticiones)]
+
+        # En una ejecución aparte: tracemalloc distorsiona el tiempo
+        tracemalloc.start()
+        solicitar(cliente, contenido, contenido_plantilla)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    _, filas, documentos = mediciones[0]
+    return {
+        'parametros': parametros,
+        'bytes_origen': len(contenido),
+        'filas': filas,
+        'documentos': documentos,
+        'extremo_a_extremo_s': resumir(latencias),
+        'etapas_s': {etapa: resumir([tiempos[etapa] for tiempos, _, _ in mediciones]) for etapa in ETAPAS},
+        'memoria_pico_mb': round(pico / 1e6, 2),
+    }
+
+
+def commit_actual():
+    try:
+        resultado = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                   check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return resultado.stdout.strip()
+
+
+def entorno():
+    """Versión del código, dependencias y configuración con que se midió"""
+    return {
+        'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit_actual(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'versiones': {paquete: metadata.version(paquete) for paquete in ('flask', 'pandas', 'openpyxl')},
+        'motor': documento.motor_configurado(),
+        'umbral_filas': documento.umbral_filas(),
+        'compresion_documentos': nivel_documentos(),
+        'conservar_partes': conservar_partes(),
+        'lector': lector_configurado(),
+        'procesos': procesos_configurados(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--escenarios', nargs='+', choices=sorted(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--salida', help='Archivo JSON de resultados; si se omite se escribe en stdout')
+    args = parser.parse_args()
+
+    # Cada solicitud repite los mismos datos: sin esto se mediría la caché de documentos
+    os.environ.setdefault(incremental.VARIABLE_CACHE_MB, '0')
+
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    cliente = app.test_client()
+    contenido_plantilla = generar_plantilla_sintetica()
+
+    resultados = {'entorno': entorno(), 'repeticiones': args.repeticiones, 'escenarios': {}}
+    for nombre in args.escenarios:
+        resultado = ejecutar_escenario(cliente, ESCENARIOS[nombre], contenido_plantilla, args.repeticiones)
+        resultados['escenarios'][nombre] = resultado
+        etapas = ', '.join(f"{etapa} {valores['mediana']:.2f}" for etapa, valores in resultado['etapas_s'].items())
+        print(f"{nombre}: {resultado['documentos']} documentos, {resultado['filas']} filas, "
+              f"{resultado['extremo_a_extremo_s']['mediana']:.2f} s de extremo a extremo, "
+              f"pico {resultado['memoria_pico_mb']:.1f} MB ({etapas} s)", file=sys.stderr)
+
+    texto = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto + '\n')
+    else:
+        print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Núcleo de generación de documentos compartido por backend.py y api/index.py."""
@@ -0,0 +1,7 @@
+"""Punto de entrada de `python -m generador`: generación por lotes (ver generador.lote)."""
+import sys
+
+from generador.lote import main
+
+if __name__ == '__main__':
+    sys.exit(main())
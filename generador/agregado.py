@@ -0,0 +1,130 @@
+"""
+Agregación del archivo origen en una sola pasada vectorizada.
+
+En lugar de entregar al generador un DataFrame por institución (y volver a agrupar
+por carrera y recorrer fila por fila en cada documento), aquí se calcula de una vez
+para todas las instituciones lo único que el documento necesita: alumnos y
+actividades únicas por carrera, la fecha de inicio más antigua y los datos del
+responsable. Los registros resultantes son objetos pequeños, baratos de enviar a
+los procesos trabajadores.
+"""
+import pandas as pd
+
+from generador.columnas import (COLUMNA_ACTIVIDADES, COLUMNA_CARGO, COLUMNA_CARRERA, COLUMNA_DESTINATARIO,
+                                COLUMNA_FECHA, COLUMNA_INSTITUCION)
+from generador.nombres import canonizar_institucion
+
+
+class CarreraAgregada:
+    """Carrera de una institución: número de alumnos (filas) y actividades únicas en orden de aparición"""
+
+    __slots__ = ('nombre', 'estudiantes', 'actividades')
+
+    def __init__(self, nombre, estudiantes, actividades):
+        self.nombre = nombre
+        self.estudiantes = estudiantes
+        self.actividades = actividades
+
+
+class InstitucionAgregada:
+    """
+    Datos de una institución listos para el documento. `fecha_inicio` es None si no
+    hay fechas y `responsable` es None si la primera fila no tiene destinatario.
+    """
+
+    __slots__ = ('institucion', 'filas', 'fecha_inicio', 'carreras', 'responsable')
+
+    def __init__(self, institucion, filas, fecha_inicio=None, carreras=(), responsable=None):
+        self.institucion = institucion
+        # Filas del archivo origen que pertenecen a la institución
+        self.filas = filas
+        self.fecha_inicio = fecha_inicio
+        self.carreras = list(carreras)
+        self.responsable = responsable
+
+
+def canonizar_columna(serie):
+    """
+    La columna de instituciones con cada valor canonizado (ver canonizar_institucion),
+    calculado una vez por valor único; si ninguno cambia se devuelve la misma serie
+    """
+    valores = serie.cat.categories if isinstance(serie.dtype, pd.CategoricalDtype) else serie.dropna().unique()
+    cambios = {valor: canonica for valor in valores if (canonica := canonizar_institucion(valor)) != valor}
+    if not cambios:
+        return serie
+    canonica = serie.map(lambda valor: cambios.get(valor, valor))
+    # Como categoría, las claves se ordenan igual que si el origen las trajera ya canonizadas
+    return canonica.astype('category') if isinstance(serie.dtype, pd.CategoricalDtype) else canonica
+
+
+def fechas_inicio(df):
+    """
+    Fecha más antigua de cada institución que tiene alguna, como el sort_values(...).iloc[0]
+    original por institución: las fechas vacías van al final y se toma la primera.
+    """
+    try:
+        # Una sola ordenación para todas las instituciones; min() fallaría con fechas en
+        # texto junto a celdas vacías
+        ordenadas = df.sort_values(COLUMNA_FECHA, na_position='last', kind='stable')
+    except TypeError:
+        # Tipos que no se comparan entre sí (p. ej. texto en una institución y fechas en
+        # otra): cada institución se ordena por separado, como en el original
+        fechas = {}
+        for institucion, grupo in df.groupby(COLUMNA_INSTITUCION, observed=True)[COLUMNA_FECHA]:
+            primera = grupo.sort_values(na_position='last').iloc[0]
+            if not pd.isna(primera):
+                fechas[institucion] = primera
+        return fechas
+    return ordenadas.groupby(COLUMNA_INSTITUCION, observed=True)[COLUMNA_FECHA].first().dropna().to_dict()
+
+
+def agregar_instituciones(df):
+    """
+    Devuelve una InstitucionAgregada por institución, en el mismo orden que
+    `df.groupby('INSTITUCION')` (claves ordenadas, sin las filas sin institución). Las
+    variantes de espacios de un nombre se agrupan en la misma institución, cuya clave
+    (y nombre de archivo) es el nombre canonizado; el documento conserva el texto
+    original de su primera fila.
+    """
+    df = df[df[COLUMNA_INSTITUCION].notna()]
+    # El texto original se conserva para el documento; la clave canonizada solo agrupa
+    originales = df[COLUMNA_INSTITUCION]
+    instituciones = canonizar_columna(originales)
+    if instituciones is not originales:
+        df = df.assign(**{COLUMNA_INSTITUCION: instituciones})
+    columnas = df.columns
+    filas = df.groupby(COLUMNA_INSTITUCION, observed=True).size()
+
+    fechas = {}
+    if COLUMNA_FECHA in columnas:
+        fechas = fechas_inicio(df[[COLUMNA_INSTITUCION, COLUMNA_FECHA]])
+
+    carreras = {}
+    if COLUMNA_CARRERA in columnas:
+        actividades = {}
+        if COLUMNA_ACTIVIDADES in columnas:
+            # drop_duplicates conserva la primera aparición, en el orden original de las filas
+            unicas = df.loc[df[COLUMNA_CARRERA].notna() & df[COLUMNA_ACTIVIDADES].notna(),
+                            [COLUMNA_INSTITUCION, COLUMNA_CARRERA, COLUMNA_ACTIVIDADES]].drop_duplicates()
+            actividades = unicas.groupby([COLUMNA_INSTITUCION, COLUMNA_CARRERA], sort=False, observed=True)
+            actividades = actividades[COLUMNA_ACTIVIDADES].agg(list).to_dict()
+        for (institucion, carrera), estudiantes in df.groupby([COLUMNA_INSTITUCION, COLUMNA_CARRERA], observed=True).size().items():
+            carreras.setdefault(institucion, []).append(
+                CarreraAgregada(carrera, int(estudiantes), actividades.get((institucion, carrera), [])))
+
+    responsables = {}
+    if COLUMNA_DESTINATARIO in columnas:
+        # El responsable se toma de la primera fila de cada institución
+        seleccion = (~df[COLUMNA_INSTITUCION].duplicated() & df[COLUMNA_DESTINATARIO].notna()).to_numpy()
+        campos = [c for c in (COLUMNA_INSTITUCION, COLUMNA_DESTINATARIO, COLUMNA_CARGO) if c in columnas]
+        # Por posición: el índice del DataFrame puede repetir etiquetas
+        textos = originales.to_numpy()[seleccion].tolist()
+        for registro, texto in zip(df.loc[seleccion, campos].to_dict('records'), textos):
+            # La celda de la institución lleva el nombre como viene en esa primera fila
+            responsables[registro[COLUMNA_INSTITUCION]] = {**registro, COLUMNA_INSTITUCION: texto}
+
+    return [
+        InstitucionAgregada(institucion, int(total), fechas.get(institucion), carreras.get(institucion, ()),
+                            responsables.get(institucion))
+        for institucion, total in filas.items()
+    ]
@@ -0,0 +1,16 @@
+"""
+Columnas del archivo origen que usa el generador.
+
+Están aparte de la lectura y la agregación para consultarlas sin importar pandas
+(p. ej. al validar los encabezados en /api/validar).
+"""
+COLUMNA_INSTITUCION = 'INSTITUCION'
+COLUMNA_CARRERA = 'CARRERA'
+COLUMNA_ACTIVIDADES = 'ACTIVIDADES'
+COLUMNA_FECHA = 'FECHA DE INICIO'
+COLUMNA_DESTINATARIO = 'NOMBRE A QUIEN SE DIRIGE CARTA DE ACEPTACION'
+COLUMNA_CARGO = 'CARGO ESCOLAR'
+
+COLUMNAS_REQUERIDAS = [COLUMNA_INSTITUCION]
+COLUMNAS_OPCIONALES = ['NOMBRES', 'APELLIDO PATERNO', COLUMNA_CARRERA, COLUMNA_ACTIVIDADES, COLUMNA_FECHA,
+                       COLUMNA_DESTINATARIO, COLUMNA_CARGO, 'REGION']
@@ -0,0 +1,66 @@
+"""Índice de celdas combinadas para escribir en la celda superior izquierda sin recorrer los rangos."""
+
+
+def mapa_rangos(rangos):
+    """
+    Devuelve (anclas, extensiones) de los rangos: `anclas` lleva cada celda combinada,
+    excepto la superior izquierda de su rango, a la celda superior izquierda, y
+    `extensiones` lleva la celda superior izquierda a la inferior derecha.
+    `rangos` son objetos con min_row, min_col, max_row y max_col.
+    """
+    anclas = {}
+    extensiones = {}
+    for rango in rangos:
+        _registrar(anclas, extensiones, None, rango.min_row, rango.min_col, rango.max_row, rango.max_col)
+    return anclas, extensiones
+
+
+def _registrar(anclas, extensiones, base, min_row, min_col, max_row, max_col):
+    ancla = (min_row, min_col)
+    base_anclas, base_extensiones = base if base is not None else ({}, {})
+    if ancla not in extensiones and ancla not in base_extensiones:
+        extensiones[ancla] = (max_row, max_col)
+    for fila in range(min_row, max_row + 1):
+        for columna in range(min_col, max_col + 1):
+            coordenada = (fila, columna)
+            # Si la celda ya pertenece a otro rango se conserva el primero registrado
+            if coordenada != ancla and coordenada not in anclas and coordenada not in base_anclas:
+                anclas[coordenada] = ancla
+
+
+class IndiceCombinadas:
+    """
+    Celdas combinadas de una hoja. El mapa de la plantilla (`base`, de mapa_rangos)
+    se calcula una vez y se comparte sin modificarse; los rangos que agrega cada
+    documento se guardan aparte.
+    """
+
+    def __init__(self, base=None):
+        self._base = base if base is not None else ({}, {})
+        self._anclas = {}
+        self._extensiones = {}
+
+    @classmethod
+    def desde_hoja(cls, ws):
+        return cls(mapa_rangos(ws.merged_cells.ranges))
+
+    @property
+    def base(self):
+        """Mapa (anclas, extensiones) de la plantilla"""
+        return self._base
+
+    def ancla(self, row, column):
+        """Celda superior izquierda del rango que contiene (row, column), o None si no está combinada"""
+        coordenada = (row, column)
+        ancla = self._anclas.get(coordenada)
+        return ancla if ancla is not None else self._base[0].get(coordenada)
+
+    def contiene(self, min_row, min_col, max_row, max_col):
+        """Indica si el rango ya está dentro de uno registrado, como comprueba openpyxl antes de agregarlo"""
+        ancla = self.ancla(min_row, min_col) or (min_row, min_col)
+        extension = self._extensiones.get(ancla) or self._base[1].get(ancla)
+        return extension is not None and max_row <= extension[0] and max_col <= extension[1]
+
+    def agregar(self, start_row, start_column, end_row, end_column):
+        _registrar(self._anclas, self._extensiones, self._base, start_row, start_column, end_row, end_column)
+
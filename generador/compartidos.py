@@ -0,0 +1,147 @@
+"""
+Un solo documento para las instituciones con los mismos datos.
+
+Las exportaciones suelen traer instituciones cuyas carreras, actividades, fecha y
+responsable coinciden y solo cambia el nombre, que en el documento aparece únicamente
+en la celda del responsable (la columna INSTITUCION). `procesar_compartiendo` genera
+el documento de cada grupo una vez, con una marca en esa celda, y de él obtiene el de
+cada institución reemplazando la marca: solo se recomprimen las partes que la
+contienen (la hoja o sharedStrings.xml) y las demás se copian con sus datos ya
+comprimidos. El resultado es el mismo documento que generaría
+procesar_institucion_en_memoria.
+"""
+import hashlib
+import zipfile
+from collections import Counter
+from io import BytesIO
+
+from openpyxl.cell.cell import ERROR_CODES, ILLEGAL_CHARACTERS_RE
+
+from generador.agregado import InstitucionAgregada
+from generador.columnas import COLUMNA_INSTITUCION
+from generador.compresion import EntradaZip, ensamblar_zip, entrada_original, nivel_documentos
+from generador.documento import motor_documento
+from generador.metricas import medir
+from generador.nombres import institucion_texto, nombre_documento
+from generador.paralelo import procesar_instituciones
+
+# Texto que ocupa el lugar del nombre de la institución en el documento compartido
+MARCA = 'GENERADORINSTITUCION7F3C9A2E5D1B4086'
+_MARCA = MARCA.encode('ascii')
+
+
+def _compartible(nombre):
+    """
+    Si el nombre se escribe en la celda como texto tal cual, de modo que basta con
+    reemplazar la marca: sin espacios al inicio o al final (que agregarían
+    xml:space), caracteres no permitidos, fórmulas ni códigos de error
+    """
+    return (isinstance(nombre, str) and nombre != '' and len(nombre) <= 32767 and ' '.join(nombre.split()) == nombre
+            and not ILLEGAL_CHARACTERS_RE.search(nombre) and not nombre.startswith('=')
+            and nombre not in ERROR_CODES)
+
+
+def clave_cuerpo(registro):
+    """
+    Hash de los datos del documento del registro salvo el nombre de la institución,
+    o None si su nombre no puede reemplazarse en un documento compartido
+    """
+    responsable = registro.responsable
+    if responsable is not None:
+        if not _compartible(responsable.get(COLUMNA_INSTITUCION)):
+            return None
+        responsable = sorted((columna, valor) for columna, valor in responsable.items()
+                             if columna != COLUMNA_INSTITUCION)
+    carreras = [(carrera.nombre, carrera.estudiantes, list(carrera.actividades)) for carrera in registro.carreras]
+    datos = (motor_documento(registro), registro.fecha_inicio, carreras, responsable)
+    return hashlib.sha256(repr(datos).encode('utf-8')).hexdigest()
+
+
+def claves_compartidas(instituciones):
+    """Clave de cada institución que comparte documento con otra, en orden; None para las demás"""
+    claves = [clave_cuerpo(registro) for registro in instituciones]
+    repetidas = {clave for clave, total in Counter(claves).items() if clave is not None and total > 1}
+    return [clave if clave in repetidas else None for clave in claves]
+
+
+def registro_marcado(registro):
+    """Copia del registro con la marca en lugar del nombre de la institución"""
+    responsable = registro.responsable
+    if responsable is not None:
+        responsable = {**responsable, COLUMNA_INSTITUCION: MARCA}
+    return InstitucionAgregada(MARCA, registro.filas, registro.fecha_inicio, registro.carreras, responsable)
+
+
+def _escapar(texto):
+    return texto.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+class CuerpoCompartido:
+    """Documento generado con la marca, del que se obtiene el de cada institución del grupo"""
+
+    def __init__(self, contenido):
+        self._contenido = contenido
+        # EntradaZip que se copian tal cual o (nombre, datos, fecha) de las partes con la marca
+        self._entradas = []
+        self._marcadas = 0
+        with zipfile.ZipFile(BytesIO(contenido)) as paquete:
+            for info in paquete.infolist():
+                datos = paquete.read(info)
+                entrada = None if _MARCA in datos else entrada_original(contenido, info)
+                if entrada is None:
+                    entrada = (info.filename, datos, info.date_time)
+                    self._marcadas += _MARCA in datos
+                self._entradas.append(entrada)
+
+    def documento(self, registro):
+        """Bytes del XLSX del registro"""
+        if not self._marcadas:
+            # Sin responsable el nombre no aparece en el documento
+            return self._contenido
+        nombre = _escapar(registro.responsable[COLUMNA_INSTITUCION]).encode('utf-8')
+        nivel = nivel_documentos()
+        with medir('guardado'):
+            return ensamblar_zip(
+                entrada if isinstance(entrada, EntradaZip)
+                else EntradaZip.comprimir(entrada[0], entrada[1].replace(_MARCA, nombre), entrada[2], nivel)
+                for entrada in self._entradas
+            )
+
+
+def procesar_compartiendo(instituciones, plantilla, indice_hoja=1, procesos=None, claves=None):
+    """
+    Como procesar_instituciones (con en_base64=False), pero las instituciones con los
+    mismos datos salvo el nombre se generan una sola vez por grupo. El documento de
+    cada grupo se conserva solo hasta entregar el de su última institución. `claves`
+    son las de claves_compartidas, si ya se calcularon.
+    """
+    if claves is None:
+        claves = claves_compartidas(instituciones)
+    restantes = Counter(clave for clave in claves if clave is not None)
+
+    # Se genera la primera institución de cada grupo, con la marca
+    tareas = []
+    vistas = set()
+    for registro, clave in zip(instituciones, claves):
+        if clave is None:
+            tareas.append(registro)
+        elif clave not in vistas:
+            vistas.add(clave)
+            tareas.append(registro_marcado(registro))
+
+    generados = procesar_instituciones(tareas, plantilla, indice_hoja, procesos=procesos, en_base64=False)
+    cuerpos = {}
+    try:
+        for registro, clave in zip(instituciones, claves):
+            if clave is None:
+                yield next(generados)
+                continue
+            cuerpo = cuerpos.get(clave)
+            if cuerpo is None:
+                cuerpo = cuerpos[clave] = CuerpoCompartido(next(generados)['contenido'])
+            restantes[clave] -= 1
+            if not restantes[clave]:
+                del cuerpos[clave]
+            yield {'nombre': nombre_documento(institucion_texto(registro)), 'contenido': cuerpo.documento(registro)}
+    finally:
+        generados.close()
@@ -0,0 +1,218 @@
+"""
+Compresión de los XLSX generados y de los paquetes ZIP de documentos.
+
+GENERADOR_COMPRESION_DOCUMENTOS fija el nivel de deflate (0 a 9; 0 guarda sin
+comprimir) de las partes que se escriben en cada XLSX y GENERADOR_COMPRESION_PAQUETES
+el de los ZIP que reúnen varios documentos. Las partes de un documento idénticas a
+las de la plantilla (tema, imágenes...) se copian con sus datos ya comprimidos en
+lugar de volver a comprimirse, salvo con GENERADOR_CONSERVAR_PARTES=0; el motor XML
+siempre las copia así.
+"""
+import datetime
+import itertools
+import os
+import struct
+import time
+import zipfile
+import zlib
+from io import BytesIO
+
+VARIABLE_NIVEL_DOCUMENTOS = 'GENERADOR_COMPRESION_DOCUMENTOS'
+VARIABLE_NIVEL_PAQUETES = 'GENERADOR_COMPRESION_PAQUETES'
+VARIABLE_CONSERVAR_PARTES = 'GENERADOR_CONSERVAR_PARTES'
+
+# El nivel por omisión de zlib, el que usa openpyxl al guardar
+NIVEL_DOCUMENTOS = 6
+# Los XLSX ya van comprimidos; el nivel 1 evita gastar CPU en volver a comprimirlos
+NIVEL_PAQUETES = 1
+
+# Bytes de texto que se reúnen antes de pasarlos al compresor en `comprimir_partes`
+_TAMANO_BLOQUE = 1 << 16
+
+
+def _nivel_entorno(variable, por_defecto):
+    try:
+        return min(9, max(0, int(os.environ.get(variable, por_defecto))))
+    except ValueError:
+        return por_defecto
+
+
+def nivel_documentos():
+    """Lee de GENERADOR_COMPRESION_DOCUMENTOS el nivel de compresión de los XLSX"""
+    return _nivel_entorno(VARIABLE_NIVEL_DOCUMENTOS, NIVEL_DOCUMENTOS)
+
+
+def nivel_paquetes():
+    """Lee de GENERADOR_COMPRESION_PAQUETES el nivel de compresión de los ZIP de documentos"""
+    return _nivel_entorno(VARIABLE_NIVEL_PAQUETES, NIVEL_PAQUETES)
+
+
+def conservar_partes():
+    """Lee de GENERADOR_CONSERVAR_PARTES si se copian sin recomprimir las partes sin cambios"""
+    return os.environ.get(VARIABLE_CONSERVAR_PARTES, '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def metodo_zip(nivel):
+    """Método y nivel de compresión para zipfile según el nivel configurado"""
+    if nivel == 0:
+        return zipfile.ZIP_STORED, None
+    return zipfile.ZIP_DEFLATED, nivel
+
+
+class EntradaZip:
+    """Parte del paquete con sus datos ya comprimidos, lista para copiarse sin recomprimir"""
+
+    __slots__ = ('nombre', 'metodo', 'crc', 'comprimido', 'tamano', 'banderas', 'fecha', 'hora', 'datos')
+
+    def __init__(self, nombre, metodo, crc, tamano, datos, fecha_hora, banderas=0):
+        self.nombre = nombre.encode('utf-8')
+        self.metodo = metodo
+        self.crc = crc
+        self.tamano = tamano
+        self.comprimido = len(datos)
+        self.datos = datos
+        # Bit 11: nombre en UTF-8. El bit 3 (descriptor de datos) no aplica: los tamaños van en el encabezado
+        self.banderas = (banderas & ~0x08) | (0x800 if self.nombre != nombre.encode('ascii', 'ignore') else 0)
+        anio, mes, dia, horas, minutos, segundos = fecha_hora
+        self.fecha = (max(anio, 1980) - 1980) << 9 | mes << 5 | dia
+        self.hora = horas << 11 | minutos << 5 | segundos // 2
+
+    @classmethod
+    def comprimir(cls, nombre, contenido, fecha_hora=(1980, 1, 1, 0, 0, 0), nivel=NIVEL_DOCUMENTOS):
+        if nivel == 0:
+            return cls(nombre, zipfile.ZIP_STORED, zlib.crc32(contenido), len(contenido), contenido, fecha_hora)
+        compresor = zlib.compressobj(nivel, zlib.DEFLATED, -15)
+        datos = compresor.compress(contenido) + compresor.flush()
+        return cls(nombre, zipfile.ZIP_DEFLATED, zlib.crc32(contenido), len(contenido), datos, fecha_hora)
+
+    @classmethod
+    def comprimir_partes(cls, nombre, partes, fecha_hora=(1980, 1, 1, 0, 0, 0), nivel=NIVEL_DOCUMENTOS):
+        """
+        Como `comprimir`, pero con el contenido dado como fragmentos de texto que se
+        comprimen conforme llegan, sin reunirlos. Deflate da los mismos bytes.
+        """
+        compresor = zlib.compressobj(nivel, zlib.DEFLATED, -15) if nivel else None
+        datos = []
+        crc = tamano = 0
+        pendientes = []
+        acumulado = 0
+        for parte in itertools.chain(partes, (None,)):
+            if parte is not None:
+                pendientes.append(parte)
+                acumulado += len(parte)
+                if acumulado < _TAMANO_BLOQUE:
+                    continue
+            bloque = ''.join(pendientes).encode('utf-8')
+            pendientes.clear()
+            acumulado = 0
+            crc = zlib.crc32(bloque, crc)
+            tamano += len(bloque)
+            datos.append(compresor.compress(bloque) if compresor else bloque)
+        if compresor is None:
+            return cls(nombre, zipfile.ZIP_STORED, crc, tamano, b''.join(datos), fecha_hora)
+        datos.append(compresor.flush())
+        return cls(nombre, zipfile.ZIP_DEFLATED, crc, tamano, b''.join(datos), fecha_hora)
+
+    def encabezado_local(self):
+        return struct.pack('<4s5H3L2H', b'PK\x03\x04', 20, self.banderas, self.metodo, self.hora, self.fecha,
+                           self.crc, self.comprimido, self.tamano, len(self.nombre), 0) + self.nombre
+
+    def encabezado_central(self, posicion):
+        return struct.pack('<4s6H3L5H2L', b'PK\x01\x02', 20, 20, self.banderas, self.metodo, self.hora,
+                           self.fecha, self.crc, self.comprimido, self.tamano, len(self.nombre), 0, 0, 0, 0,
+                           0, posicion) + self.nombre
+
+
+def entrada_original(contenido, info):
+    """
+    Copia los datos comprimidos de una parte del XLSX original, sin descomprimirlos.
+    Devuelve None si la parte está cifrada o necesita ZIP64.
+    """
+    if info.flag_bits & 0x01 or info.file_size >= 0xFFFFFFFF or info.header_offset >= 0xFFFFFFFF:
+        return None
+    longitud_nombre, longitud_extra = struct.unpack('<2H', contenido[info.header_offset + 26:info.header_offset + 30])
+    inicio = info.header_offset + 30 + longitud_nombre + longitud_extra
+    datos = contenido[inicio:inicio + info.compress_size]
+    return EntradaZip(info.filename, info.compress_type, info.CRC, info.file_size, datos, info.date_time, info.flag_bits)
+
+
+def fin_directorio(centrales, posicion):
+    """Directorio central y registro final del ZIP, con el directorio empezando en `posicion`"""
+    directorio = b''.join(centrales)
+    return directorio + struct.pack('<4s4H2LH', b'PK\x05\x06', 0, 0, len(centrales), len(centrales),
+                                    len(directorio), posicion, 0)
+
+
+def ensamblar_zip(entradas):
+    """Bytes del ZIP con las EntradaZip en orden"""
+    partes = []
+    centrales = []
+    posicion = 0
+    for entrada in entradas:
+        local = entrada.encabezado_local()
+        centrales.append(entrada.encabezado_central(posicion))
+        partes.append(local)
+        partes.append(entrada.datos)
+        posicion += len(local) + len(entrada.datos)
+    partes.append(fin_directorio(centrales, posicion))
+    return b''.join(partes)
+
+
+def partes_plantilla(contenido):
+    """Partes del XLSX de la plantilla que pueden copiarse: nombre -> (EntradaZip, contenido)"""
+    partes = {}
+    with zipfile.ZipFile(BytesIO(contenido)) as paquete:
+        for info in paquete.infolist():
+            entrada = entrada_original(contenido, info)
+            if entrada is not None:
+                partes[info.filename] = (entrada, paquete.read(info))
+    return partes
+
+
+class _ArchivoPartes:
+    """Sustituto de ZipFile para el ExcelWriter de openpyxl: reúne las partes sin comprimirlas"""
+
+    def __init__(self):
+        self.partes = []
+
+    def writestr(self, nombre, datos):
+        if isinstance(datos, str):
+            datos = datos.encode('utf-8')
+        self.partes.append((nombre, datos))
+
+    def write(self, ruta, nombre):
+        with open(ruta, 'rb') as archivo:
+            self.partes.append((nombre, archivo.read()))
+
+    def namelist(self):
+        return [nombre for nombre, _ in self.partes]
+
+    def close(self):
+        pass
+
+
+def guardar_libro(wb, originales=None, nivel=None):
+    """
+    Bytes del XLSX del libro de openpyxl comprimido con `nivel` (por omisión, el
+    configurado). Las partes idénticas a las de `originales` (ver `partes_plantilla`)
+    conservan sus datos ya comprimidos.
+    """
+    # openpyxl se importa aquí: empaquetado usa este módulo y se carga al arrancar las rutas
+    from openpyxl.writer.excel import ExcelWriter
+
+    if nivel is None:
+        nivel = nivel_documentos()
+    archivo = _ArchivoPartes()
+    # Como workbook.save (save_workbook), que es quien actualiza la fecha de modificación
+    wb.properties.modified = datetime.datetime.utcnow()
+    ExcelWriter(wb, archivo).save()
+
+    fecha_hora = time.localtime()[:6]
+    entradas = []
+    for nombre, datos in archivo.partes:
+        original = originales.get(nombre) if originales else None
+        if original is not None and original[1] == datos:
+            entradas.append(original[0])
+        else:
+            entradas.append(EntradaZip.comprimir(nombre, datos, fecha_hora, nivel))
+    return ensamblar_zip(entradas)
@@ -0,0 +1,250 @@
+"""Generación del documento de una institución a partir de la plantilla."""
+import base64
+import os
+
+from generador.combinadas import IndiceCombinadas
+from generador.compresion import conservar_partes, guardar_libro
+from generador.formato import formato_filas
+from generador.metricas import medir
+from generador.nombres import institucion_texto, nombre_documento
+from generador.normalizacion import normalizar_actividad, normalizar_carrera
+from generador.plan import MAPEO_ALTIPLANO, compilar_plan
+
+# Motor de escritura de los documentos: "openpyxl" (por defecto) carga el modelo de
+# objetos completo de la plantilla; "xml" parcha directamente el XML de la hoja
+VARIABLE_MOTOR = 'GENERADOR_MOTOR'
+MOTOR_OPENPYXL = 'openpyxl'
+MOTOR_XML = 'xml'
+
+# Filas de la tabla de carreras a partir de las cuales el documento se escribe con el
+# motor XML aunque el configurado sea openpyxl: la hoja se escribe fila por fila sin
+# cargar el modelo de objetos. 0 lo desactiva
+VARIABLE_UMBRAL_FILAS = 'GENERADOR_UMBRAL_FILAS'
+UMBRAL_FILAS = 1000
+
+def motor_configurado():
+    """Lee el motor de escritura de la variable de entorno GENERADOR_MOTOR"""
+    return os.environ.get(VARIABLE_MOTOR, MOTOR_OPENPYXL).strip().lower()
+
+def umbral_filas():
+    """Lee de la variable de entorno GENERADOR_UMBRAL_FILAS el umbral de la escritura por filas"""
+    try:
+        return max(0, int(os.environ.get(VARIABLE_UMBRAL_FILAS, UMBRAL_FILAS)))
+    except ValueError:
+        return UMBRAL_FILAS
+
+def filas_tabla(registro):
+    """Filas que ocupa la tabla de carreras del registro, con el mismo avance que rellenar_hoja"""
+    fila_actual = 0
+    filas_ocupadas = 0
+    for carrera in registro.carreras:
+        filas = max(carrera.estudiantes, 1, len(carrera.actividades))
+        filas_ocupadas = max(filas_ocupadas, fila_actual + filas)
+        fila_actual += len(carrera.actividades)
+    return filas_ocupadas
+
+def motor_documento(registro):
+    """
+    Motor con el que se escribe el documento del registro: el configurado o, si la
+    tabla de carreras rebasa el umbral de filas, el XML
+    """
+    motor = motor_configurado()
+    if motor != MOTOR_XML:
+        umbral = umbral_filas()
+        if umbral and filas_tabla(registro) > umbral:
+            return MOTOR_XML
+    return motor
+
+def procesar_institucion_en_memoria(registro, plantilla, indice_hoja=1, en_base64=True):
+    """
+    Procesa los datos de una institución y genera un documento en memoria.
+    `registro` es la InstitucionAgregada de la institución y `plantilla` una
+    PlantillaPreparada; cada documento trabaja sobre un clon propio.
+    Con en_base64=False, 'contenido' son los bytes del XLSX sin codificar.
+    """
+    # Asegurarse de que institucion es un string
+    institucion_str = institucion_texto(registro)
+    
+    try:
+        plantilla_xml = plantilla.plantilla_xml(indice_hoja) if motor_documento(registro) == MOTOR_XML else None
+        
+        if plantilla_xml is not None:
+            # Motor XML: se parcha directamente la hoja del paquete de la plantilla y las
+            # filas se escriben una por una; las celdas fijas de la plantilla se copian tal cual
+            with medir('clonado'):
+                documento = plantilla_xml.nuevo_documento()
+            with medir('llenado'):
+                rellenar_hoja(documento.hoja, registro, plantilla.combinadas(indice_hoja), plantilla.plan(indice_hoja))
+            with medir('guardado'):
+                contenido = documento.guardar()
+        else:
+            # Crear una copia del libro de trabajo en memoria a partir de la plantilla preparada
+            with medir('clonado'):
+                wb = plantilla.clonar()
+            
+            # Verificar que el índice de la hoja sea válido
+            if indice_hoja >= len(wb.worksheets):
+                print(f"Advertencia: El índice de hoja {indice_hoja} no es válido. Se usará la última hoja disponible.")
+                ws = wb.worksheets[-1]
+            else:
+                ws = wb.worksheets[indice_hoja]
+            
+            with medir('llenado'):
+                rellenar_hoja(ws, registro, plantilla.combinadas(indice_hoja), plantilla.plan(indice_hoja))
+            
+            # Guardar el archivo en memoria con el nivel de compresión configurado
+            with medir('guardado'):
+                contenido = guardar_libro(wb, plantilla.partes_originales() if conservar_partes() else None)
+        
+        nombre_archivo = nombre_documento(institucion_str)
+        
+        # Convertir a base64 para enviar al frontend en JSON
+        if en_base64:
+            with medir('codificacion'):
+                contenido = base64.b64encode(contenido).decode('utf-8')
+        
+        print(f"Documento generado en memoria: {nombre_archivo}")
+        
+        return {
+            'nombre': nombre_archivo,
+            'contenido': contenido
+        }
+        
+    except Exception as e:
+        print(f"Error al procesar institución {institucion_str}: {str(e)}")
+        raise e
+
+def rellenar_hoja(ws, registro, combinadas=None, plan=None):
+    """
+    Escribe los datos de la institución (InstitucionAgregada) en la hoja. `ws` puede ser
+    una hoja de openpyxl o la HojaXml del motor XML, que ofrece la misma interfaz para
+    estas operaciones. `combinadas` es el IndiceCombinadas de la hoja y `plan` el
+    PlanLlenado de su plantilla (ver generador.plan); si no se indican se construyen
+    aquí, con el mapeo de ALTIPLANO.
+    """
+    if combinadas is None:
+        combinadas = IndiceCombinadas.desde_hoja(ws)
+    if plan is None:
+        plan = compilar_plan(MAPEO_ALTIPLANO, combinadas.base)
+    escribir = plan.escribir
+    
+    # Fecha de inicio más antigua
+    if registro.fecha_inicio is not None and plan.fecha_inicio is not None:
+        escribir(ws, plan.fecha_inicio, registro.fecha_inicio, combinadas)
+    
+    # Textos fijos de la región (la dirección en ALTIPLANO)
+    for celda, texto in plan.textos:
+        escribir(ws, celda, texto, combinadas)
+    
+    # Carreras, ya agrupadas y ordenadas como con groupby('CARRERA')
+    if registro.carreras:
+        # Inicializar fila para carreras (igual que en el script PowerShell)
+        fila_actual = plan.fila_tabla
+        columna_carrera = plan.columna_carrera
+        columna_estudiantes = plan.columna_estudiantes
+        columna_actividad = plan.columna_actividad
+        # Anclas de la plantilla en las columnas de la tabla; el resto de las celdas se escribe tal cual
+        anclas_carrera = plan.anclas_carrera
+        anclas_estudiantes = plan.anclas_estudiantes
+        anclas_actividad = plan.anclas_actividad
+        
+        # Formato de las filas más allá de las preformateadas, aplicado por bloques
+        formato = formato_filas(ws, combinadas, plan.rangos)
+        # Última fila ya formateada y combinada: una carrera con más estudiantes que
+        # actividades se traslapa con la siguiente, y esas filas no se repiten
+        fila_formateada = plan.ultima_preformateada
+        anchos_ajustados = False
+        
+        # Procesar cada carrera
+        for carrera in registro.carreras:
+            # Formatear el nombre de la carrera con solo la primera letra en mayúscula
+            nombre_carrera = str(carrera.nombre) if carrera.nombre is not None else "sin_carrera"
+            nombre_carrera_formateado = format_career_name(nombre_carrera)
+            
+            num_estudiantes = carrera.estudiantes
+            ultima_fila = fila_actual + max(num_estudiantes, 1) - 1
+            
+            # Formatear y combinar los rangos de fila en las filas de la carrera que no estén preformateadas
+            if ultima_fila > fila_formateada:
+                formato.formatear_bloque(max(fila_actual, fila_formateada + 1), ultima_fila)
+                fila_formateada = ultima_fila
+            
+            if fila_actual > plan.ultima_preformateada and not anchos_ajustados:
+                # Ajustar el ancho de las columnas al salir de las filas preformateadas
+                for letra, ancho in plan.anchos.items():
+                    ws.column_dimensions[letra].width = ancho
+                anchos_ajustados = True
+            
+            # Escribir nombre de carrera y número de estudiantes en cada fila de la carrera
+            # (replicar valores en lugar de combinar celdas, igual que en el script PowerShell)
+            for fila in range(fila_actual, ultima_fila + 1):
+                ws.cell(*anclas_carrera.get(fila, (fila, columna_carrera))).value = nombre_carrera_formateado
+                ws.cell(*anclas_estudiantes.get(fila, (fila, columna_estudiantes))).value = num_estudiantes
+            
+            # Las actividades que exceden las filas de la carrera solo llevan formato en su columna
+            ultima_actividad = fila_actual + len(carrera.actividades) - 1
+            if ultima_actividad > fila_formateada:
+                formato.formatear(fila_formateada + 1, ultima_actividad, [columna_actividad])
+            
+            # Agregar actividades únicas (igual que en el script PowerShell)
+            fila_actividad = fila_actual
+            for actividad in carrera.actividades:
+                # Formatear la actividad con la función de formato de oraciones
+                actividad_formateada = format_activity_text(actividad)
+                ws.cell(*anclas_actividad.get(fila_actividad, (fila_actividad, columna_actividad))).value = \
+                    actividad_formateada
+                fila_actividad += 1
+            
+            # Actualizar siguiente fila (igual que en el script PowerShell)
+            fila_actual = fila_actividad
+    
+    # Actualizar datos del responsable si están disponibles (igual que en el script PowerShell)
+    responsable = registro.responsable
+    if responsable is not None:
+        for columna, celda in plan.responsable:
+            escribir(ws, celda, responsable[columna], combinadas)
+
+def format_career_name(career_name):
+    """
+    Formatea el nombre de la carrera para que solo la primera letra de cada palabra esté en mayúscula.
+    Los resultados se memorizan (ver generador.normalizacion).
+    """
+    return normalizar_carrera(career_name)
+
+def format_activity_text(activity_text):
+    """
+    Formatea el texto de la actividad para que solo la primera letra de la primera palabra esté en mayúscula,
+    y la primera letra después de cada punto también esté en mayúscula. Los resultados se memorizan.
+    """
+    return normalizar_actividad(activity_text)
+
+def set_cell_value(worksheet, row, column, value, combinadas=None):
+    """
+    Establece el valor de una celda, manejando celdas fusionadas.
+    Si la celda está fusionada, modifica la celda superior izquierda de la fusión.
+    Con `combinadas` (IndiceCombinadas) la fusión se busca en el índice en lugar de
+    recorrer todos los rangos de la hoja.
+    """
+    if combinadas is not None:
+        ancla = combinadas.ancla(row, column)
+        if ancla is not None:
+            row, column = ancla
+        worksheet.cell(row=row, column=column).value = value
+        return
+    
+    try:
+        # Intentar establecer el valor directamente
+        worksheet.cell(row=row, column=column).value = value
+    except Exception as e:
+        # Si hay un error (probablemente por celda fusionada), buscar la celda superior izquierda de la fusión
+        for merged_range in worksheet.merged_cells.ranges:
+            min_row, min_col, max_row, max_col = merged_range.min_row, merged_range.min_col, merged_range.max_row, merged_range.max_col
+            
+            # Verificar si la celda está dentro del rango fusionado
+            if min_row <= row <= max_row and min_col <= column <= max_col:
+                # Modificar la celda superior izquierda de la fusión
+                worksheet.cell(row=min_row, column=min_col).value = value
+                return
+        
+        # Si no se encontró ninguna fusión que contenga la celda, relanzar el error original
+        raise e
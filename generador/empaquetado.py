@@ -0,0 +1,91 @@
+"""Empaquetado de los documentos generados en un ZIP o un JSON transmitidos por partes."""
+import json
+import os
+import re
+import zipfile
+
+from generador.compresion import metodo_zip, nivel_paquetes
+
+TIPO_ZIP = 'application/zip'
+TIPO_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class _SalidaZip:
+    """
+    Destino de escritura sin posicionamiento para zipfile: acumula lo escrito hasta
+    que se vacía, de modo que el ZIP puede enviarse al cliente conforme se construye.
+    """
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def abrir_zip(destino):
+    """Abre un ZIP de escritura sobre `destino` con la compresión configurada para los paquetes de documentos"""
+    metodo, nivel = metodo_zip(nivel_paquetes())
+    return zipfile.ZipFile(destino, 'w', compression=metodo, compresslevel=nivel)
+
+
+def carpetas_origen(nombres):
+    """
+    Carpeta del paquete para cada archivo origen de un lote: su nombre sin ruta ni
+    extensión, con un sufijo numérico si dos archivos se llaman igual
+    """
+    carpetas = []
+    for nombre in nombres:
+        # El nombre lo envía el cliente: no debe salir de su carpeta dentro del ZIP
+        base = os.path.splitext(re.split(r'[\\/]', nombre)[-1])[0].strip(' .') or 'origen'
+        carpeta = base
+        repeticion = 2
+        while carpeta in carpetas:
+            carpeta = f'{base} ({repeticion})'
+            repeticion += 1
+        carpetas.append(carpeta)
+    return carpetas
+
+
+def transmitir_zip(archivos):
+    """
+    Genera los bytes de un ZIP con cada archivo {'nombre', 'contenido'} en cuanto se
+    recibe, sin retener en memoria más que el documento en curso.
+    """
+    salida = _SalidaZip()
+    with abrir_zip(salida) as zip_salida:
+        for archivo in archivos:
+            zip_salida.writestr(archivo['nombre'], archivo['contenido'])
+            yield salida.vaciar()
+    # Directorio central del ZIP
+    yield salida.vaciar()
+
+
+def transmitir_json(archivos, campos, campos_finales=None):
+    """
+    Genera por partes el JSON {**campos, 'archivos': [...], **campos_finales(), 'success': true},
+    escribiendo cada archivo ({'nombre', 'contenido'} o sus datos) en cuanto se recibe. Si la generación
+    falla a media transmisión el código HTTP ya se envió, así que el JSON se cierra con
+    "success": false y el error.
+    """
+    yield json.dumps({**campos, 'archivos': []})[:-2]
+    separador = ''
+    try:
+        for archivo in archivos:
+            yield separador + json.dumps(archivo)
+            separador = ', '
+    except Exception as e:
+        print(f"Error al procesar documentos: {str(e)}")
+        yield '], ' + json.dumps({'success': False, 'error': f'Error al procesar documentos: {str(e)}'})[1:]
+        return
+    finales = campos_finales() if campos_finales is not None else {}
+    yield '], ' + json.dumps({**finales, 'success': True})[1:]
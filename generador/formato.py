@@ -0,0 +1,131 @@
+"""
+Formato por bloques de las filas de la tabla de carreras que exceden las filas
+preformateadas de la plantilla.
+
+El estilo de esas filas (borde delgado, texto centrado con ajuste y fuente de
+tamaño 9) se registra una sola vez por libro y se aplica a un bloque completo de
+filas de una pasada. Solo se formatea la primera celda de cada rango B-D, E-F y
+G-H: al combinar, openpyxl reemplaza las demás por celdas combinadas sin estilo
+que reciben las orillas del borde de la primera, así que darles formato antes
+sería trabajo perdido.
+
+Para no pasar por los descriptores de estilo de cada celda, FormatoFilas escribe
+directamente el estado interno de openpyxl (Cell._style, Worksheet._cells y las
+colecciones _fonts, _borders y _alignments del libro). Depende por eso de la versión
+de openpyxl fijada en requirements.txt; tests/test_formato.py compara su resultado
+con el de la API pública y debe pasar antes de cambiarla.
+"""
+from copy import copy
+
+from openpyxl.cell.cell import MergedCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.merge import MergedCellRange
+
+BORDE_FILA = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+ALINEACION_FILA = Alignment(horizontal='center', vertical='center', wrap_text=True)
+FUENTE_FILA = Font(size=9)
+
+# Rangos que se combinan en cada fila: B-D (carrera), E-F (alumnos) y G-H (actividad)
+RANGOS_FILA = ((2, 4), (5, 6), (7, 8))
+
+_LADOS = ('top', 'left', 'right', 'bottom')
+
+
+def orillas_combinada(borde_inicial, es_ultima):
+    """
+    Bordes que MergedCellRange.format suma a una celda combinada de una fila: las
+    orillas superior e inferior del borde de la primera celda, más la derecha si la
+    celda cierra el rango
+    """
+    for nombre in _LADOS:
+        lado = getattr(borde_inicial, nombre)
+        if (lado and lado.style is None) or nombre == 'left' or (nombre == 'right' and not es_ultima):
+            continue
+        yield Border(**{nombre: lado})
+
+
+def formato_filas(ws, combinadas, rangos=RANGOS_FILA):
+    """Formato de filas para la hoja: la HojaXml del motor XML ofrece el suyo"""
+    crear = getattr(ws, 'formato_filas', None)
+    return crear(combinadas, rangos) if crear is not None else FormatoFilas(ws, combinadas, rangos)
+
+
+class FormatoFilas:
+    """Aplica el formato de fila a bloques de filas de una hoja de openpyxl"""
+
+    def __init__(self, ws, combinadas, rangos=RANGOS_FILA):
+        self.ws = ws
+        self.combinadas = combinadas
+        # Rangos (columna inicial, columna final) que se combinan en cada fila
+        self.rangos = rangos
+        libro = ws.parent
+        # Registro único de los componentes del estilo en las colecciones del libro
+        self._fuente = libro._fonts.add(FUENTE_FILA)
+        self._borde = libro._borders.add(BORDE_FILA)
+        self._alineacion = libro._alignments.add(ALINEACION_FILA)
+        self._estilos = {}
+        self._estilos_combinadas = {}
+
+    def formatear_bloque(self, fila_inicio, fila_fin):
+        """Formatea las filas [fila_inicio, fila_fin] y combina B-D, E-F y G-H en cada una"""
+        self.formatear(fila_inicio, fila_fin, [inicio for inicio, _ in self.rangos])
+        self.combinar(fila_inicio, fila_fin)
+
+    def formatear(self, fila_inicio, fila_fin, columnas):
+        """Aplica borde, alineación y fuente de la fila a `columnas` en cada fila del bloque"""
+        ws = self.ws
+        for fila in range(fila_inicio, fila_fin + 1):
+            for columna in columnas:
+                celda = ws.cell(row=fila, column=columna)
+                # Cada celda necesita su propia copia: openpyxl modifica el arreglo al asignar formatos.
+                # Las celdas nuevas no tienen arreglo hasta que se les asigna un formato
+                celda._style = copy(self._con_formato(celda._style or StyleArray()))
+
+    def _con_formato(self, estilo):
+        clave = tuple(estilo)
+        con_formato = self._estilos.get(clave)
+        if con_formato is None:
+            con_formato = copy(estilo)
+            con_formato.fontId = self._fuente
+            con_formato.borderId = self._borde
+            con_formato.alignmentId = self._alineacion
+            self._estilos[clave] = con_formato
+        return con_formato
+
+    def combinar(self, fila_inicio, fila_fin):
+        """Combina los rangos de fila del bloque con el mismo resultado que Worksheet.merge_cells"""
+        ws = self.ws
+        combinadas = self.combinadas
+        rangos = ws.merged_cells.ranges
+        for fila in range(fila_inicio, fila_fin + 1):
+            for inicio, fin in self.rangos:
+                # Como MultiCellRange.add: no se agrega si ya está dentro de otro rango
+                if not combinadas.contiene(fila, inicio, fila, fin):
+                    rangos.add(MergedCellRange(ws, f'{get_column_letter(inicio)}{fila}:{get_column_letter(fin)}{fila}'))
+                borde = ws.cell(row=fila, column=inicio)._style.borderId
+                for columna in range(inicio + 1, fin + 1):
+                    celda = MergedCell(ws, row=fila, column=columna)
+                    celda._style = copy(self._estilo_combinada(borde, columna == fin))
+                    ws._cells[(fila, columna)] = celda
+                combinadas.agregar(fila, inicio, fila, fin)
+
+    def _estilo_combinada(self, id_borde, es_ultima):
+        # Las celdas combinadas nuevas no tienen estilo antes de recibir las orillas
+        clave = (id_borde, es_ultima)
+        estilo = self._estilos_combinadas.get(clave)
+        if estilo is None:
+            bordes = self.ws.parent._borders
+            borde = bordes[0]
+            for orilla in orillas_combinada(bordes[id_borde], es_ultima):
+                borde = borde + orilla
+            estilo = StyleArray()
+            estilo.borderId = bordes.add(borde)
+            self._estilos_combinadas[clave] = estilo
+        return estilo
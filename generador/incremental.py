@@ -0,0 +1,150 @@
+"""
+Regeneración incremental de documentos.
+
+Cada institución tiene una huella estable: el hash de los datos con que se llena su
+documento (la InstitucionAgregada), de la plantilla, la hoja, el motor y la
+compresión. Los documentos generados se guardan en una caché acotada por esa
+huella, así que al volver a subir un archivo casi igual solo se regeneran las
+instituciones cuyos datos cambiaron y las demás salen de la caché. De las que se
+regeneran, las que tienen los mismos datos salvo el nombre comparten un solo
+documento (ver generador.compartidos).
+"""
+import base64
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from generador.compartidos import claves_compartidas, procesar_compartiendo
+from generador.compresion import conservar_partes, nivel_documentos
+from generador.documento import motor_documento
+from generador.metricas import medir
+from generador.nombres import nombres_documentos
+
+# Memoria máxima, en MB, de los documentos que se conservan entre solicitudes (0 la desactiva)
+VARIABLE_CACHE_MB = 'GENERADOR_CACHE_DOCUMENTOS_MB'
+
+
+def huella_registro(registro, huella_plantilla, indice_hoja, motor, compresion=None):
+    """
+    Hash SHA-256 de todo lo que determina el documento de la institución. Se usa la
+    institución agregada y no las filas del origen: las columnas que el documento no
+    usa (nombres de los alumnos, región...) no obligan a regenerarlo.
+    """
+    carreras = [(carrera.nombre, carrera.estudiantes, list(carrera.actividades)) for carrera in registro.carreras]
+    responsable = sorted(registro.responsable.items()) if registro.responsable is not None else None
+    datos = (huella_plantilla, indice_hoja, motor, compresion, registro.institucion, registro.fecha_inicio, carreras,
+             responsable)
+    return hashlib.sha256(repr(datos).encode('utf-8')).hexdigest()
+
+
+class CacheDocumentos:
+    """Documentos {'nombre', 'contenido'} por huella, con desalojo LRU por encima de `capacidad` bytes"""
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self._documentos = OrderedDict()
+        self._ocupado = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, huella):
+        with self._lock:
+            documento = self._documentos.get(huella)
+            if documento is not None:
+                self._documentos.move_to_end(huella)
+            return documento
+
+    def guardar(self, huella, documento):
+        tamano = len(documento['contenido'])
+        if tamano > self.capacidad:
+            return
+        with self._lock:
+            if huella in self._documentos:
+                return
+            self._documentos[huella] = documento
+            self._ocupado += tamano
+            while self._ocupado > self.capacidad:
+                _, desalojado = self._documentos.popitem(last=False)
+                self._ocupado -= len(desalojado['contenido'])
+
+
+_cache = None
+_lock_cache = threading.Lock()
+
+
+def cache_documentos():
+    """Caché de documentos del proceso, dimensionada con GENERADOR_CACHE_DOCUMENTOS_MB (128 por defecto)"""
+    global _cache
+    with _lock_cache:
+        if _cache is None:
+            try:
+                megabytes = float(os.environ.get(VARIABLE_CACHE_MB, 128))
+            except ValueError:
+                print(f"Advertencia: Valor no válido para {VARIABLE_CACHE_MB}. Se usarán 128 MB.")
+                megabytes = 128
+            _cache = CacheDocumentos(int(megabytes * 1024 * 1024))
+        return _cache
+
+
+class PlanIncremental:
+    """
+    Instituciones de una solicitud separadas en las que salen de la caché y las que
+    se regeneran. Los documentos en caché se retienen al planear, de modo que un
+    desalojo posterior no cambia lo informado en `aciertos`. El nombre de cada
+    documento se resuelve al planear (ver nombres_documentos, con `grupos`), así que
+    las instituciones cuyo nombre de archivo coincide no se sobrescriben y quedan en
+    `colisiones`.
+    """
+
+    def __init__(self, instituciones, plantilla, indice_hoja, cache=None, grupos=None):
+        self.plantilla = plantilla
+        self.indice_hoja = indice_hoja
+        self.nombres, self.colisiones = nombres_documentos(instituciones, grupos)
+        self._cache = cache if cache is not None else cache_documentos()
+        # Sin huella de la plantilla no hay forma de saber si un documento sigue vigente
+        usar_cache = plantilla.huella is not None and self._cache.capacidad > 0
+        compresion = (nivel_documentos(), conservar_partes())
+
+        self._entradas = []
+        for registro in instituciones:
+            # El motor es el que escribirá este documento, que depende del tamaño de su tabla
+            huella = (huella_registro(registro, plantilla.huella, indice_hoja, motor_documento(registro), compresion)
+                      if usar_cache else None)
+            documento = self._cache.obtener(huella) if huella is not None else None
+            self._entradas.append((registro, huella, documento))
+        self.aciertos = sum(1 for _, _, documento in self._entradas if documento is not None)
+        self.regenerados = len(self._entradas) - self.aciertos
+        # Documentos regenerados que se obtienen del de otra institución con los mismos datos
+        self._claves = claves_compartidas(self._pendientes())
+        claves = [clave for clave in self._claves if clave is not None]
+        self.compartidos = len(claves) - len(set(claves))
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def _pendientes(self):
+        return [registro for registro, _, documento in self._entradas if documento is None]
+
+    def resumen(self):
+        return {'aciertos': self.aciertos, 'regenerados': self.regenerados, 'compartidos': self.compartidos}
+
+    def documentos(self, en_base64=True, procesos=None):
+        """
+        Genera los documentos en el orden de las instituciones, como procesar_instituciones:
+        los de la caché tal cual y el resto con procesar_compartiendo, guardándolos en la caché
+        """
+        generados = procesar_compartiendo(self._pendientes(), self.plantilla, self.indice_hoja, procesos=procesos,
+                                          claves=self._claves)
+        try:
+            for nombre, (_, huella, documento) in zip(self.nombres, self._entradas):
+                if documento is None:
+                    documento = next(generados)
+                    if huella is not None:
+                        self._cache.guardar(huella, documento)
+                contenido = documento['contenido']
+                if en_base64:
+                    with medir('codificacion'):
+                        contenido = base64.b64encode(contenido).decode('utf-8')
+                yield {'nombre': nombre, 'contenido': contenido}
+        finally:
+            generados.close()
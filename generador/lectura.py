@@ -0,0 +1,127 @@
+"""
+Lectura del archivo origen.
+
+Solo se leen las columnas que usa el generador, con tipos fijos: los textos como
+objetos y las llaves de agrupación como texto y luego categóricas. Las llaves se
+leen como objetos y se convierten a texto antes de categorizarlas porque una columna
+con números y textos mezclados (una clave numérica entre nombres) no se puede ordenar
+al agrupar. Los encabezados se validan
+leyendo únicamente la primera fila, antes de analizar el cuerpo de la hoja.
+
+Si python-calamine está instalado se usa para leer el cuerpo, que es bastante más
+rápido que openpyxl con archivos grandes; si no, se usa pandas.read_excel.
+"""
+import os
+from datetime import date, datetime
+from io import BytesIO
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from generador.columnas import (COLUMNA_ACTIVIDADES, COLUMNA_CARGO, COLUMNA_CARRERA, COLUMNA_DESTINATARIO,
+                                COLUMNA_FECHA, COLUMNA_INSTITUCION, COLUMNAS_OPCIONALES, COLUMNAS_REQUERIDAS)
+
+# Lector del cuerpo de la hoja: "auto" (por defecto) usa calamine si está instalado,
+# "pandas" fuerza pandas.read_excel y "calamine" exige python-calamine
+VARIABLE_LECTOR = 'GENERADOR_LECTOR'
+LECTOR_AUTO = 'auto'
+LECTOR_PANDAS = 'pandas'
+LECTOR_CALAMINE = 'calamine'
+
+# Columnas que usa el generador y tipo con que se leen; la fecha se deja a la inferencia de pandas
+TIPOS_COLUMNAS = {
+    COLUMNA_INSTITUCION: object,
+    COLUMNA_CARRERA: object,
+    COLUMNA_ACTIVIDADES: object,
+    COLUMNA_FECHA: None,
+    COLUMNA_DESTINATARIO: object,
+    COLUMNA_CARGO: object,
+}
+
+# Llaves de agrupación: se convierten a texto y se guardan como categóricas
+COLUMNAS_CATEGORICAS = (COLUMNA_INSTITUCION, COLUMNA_CARRERA)
+
+
+def lector_configurado():
+    """Lee el lector del cuerpo de la hoja de la variable de entorno GENERADOR_LECTOR"""
+    return os.environ.get(VARIABLE_LECTOR, LECTOR_AUTO).strip().lower()
+
+
+def _abrir(origen):
+    # Bytes del archivo o un archivo binario con posicionamiento (p. ej. el de la subida)
+    if isinstance(origen, (bytes, bytearray)):
+        return BytesIO(origen)
+    origen.seek(0)
+    return origen
+
+
+def leer_encabezados(origen):
+    """
+    Nombres de las columnas del archivo, leyendo solo la fila de encabezados. `origen`
+    son los bytes del archivo o un archivo binario con posicionamiento.
+    """
+    return list(pd.read_excel(_abrir(origen), nrows=0).columns)
+
+
+def leer_origen(origen, encabezados=None):
+    """
+    Lee del archivo origen (bytes o archivo binario) las columnas de TIPOS_COLUMNAS
+    que existan en él. `encabezados` evita volver a leer la primera fila si ya se validó.
+    """
+    if encabezados is None:
+        encabezados = leer_encabezados(origen)
+    columnas = [c for c in TIPOS_COLUMNAS if c in encabezados]
+
+    lector = lector_configurado()
+    if lector != LECTOR_PANDAS:
+        try:
+            import python_calamine
+        except ImportError:
+            if lector == LECTOR_CALAMINE:
+                raise
+        else:
+            return _categorizar(_leer_calamine(python_calamine, origen, columnas))
+
+    tipos = {c: TIPOS_COLUMNAS[c] for c in columnas if TIPOS_COLUMNAS[c] is not None}
+    return _categorizar(pd.read_excel(_abrir(origen), usecols=columnas, dtype=tipos))
+
+
+def _categorizar(df):
+    # Cada valor de las llaves como texto (los vacíos se conservan) y la columna como categórica
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in df.columns:
+            serie = df[columna]
+            df[columna] = serie.where(serie.isna(), serie.astype(str)).astype('category')
+    return df
+
+
+def _valor_calamine(valor):
+    # Mismas conversiones que el lector openpyxl de pandas antes de inferir tipos
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if isinstance(valor, date) and not isinstance(valor, datetime):
+        return datetime(valor.year, valor.month, valor.day)
+    return valor
+
+
+def _leer_calamine(python_calamine, origen, columnas):
+    hoja = python_calamine.CalamineWorkbook.from_filelike(_abrir(origen)).get_sheet_by_index(0)
+    filas = hoja.to_python(skip_empty_area=False)
+    if not filas:
+        return pd.DataFrame(columns=columnas)
+
+    # Primera aparición de cada encabezado, como pandas con nombres repetidos
+    posiciones = {}
+    for posicion, nombre in enumerate(filas[0]):
+        posiciones.setdefault(nombre, posicion)
+    posiciones = [posiciones[columna] for columna in columnas]
+
+    # Se descartan las filas completamente vacías, como hace read_excel, antes de proyectar
+    datos = [columnas]
+    for fila in filas[1:]:
+        if any(valor != '' for valor in fila):
+            datos.append([_valor_calamine(fila[p]) if p < len(fila) else '' for p in posiciones])
+
+    # TextParser es el analizador que usa read_excel: valores nulos, inferencia y tipos iguales
+    tipos = {c: TIPOS_COLUMNAS[c] for c in columnas if TIPOS_COLUMNAS[c] is not None}
+    return TextParser(datos, header=0, dtype=tipos, skip_blank_lines=False).read()
@@ -0,0 +1,145 @@
+"""
+Generación por lotes desde la línea de comandos, sin pasar por el servidor HTTP.
+
+    python -m generador origen.xlsx --plantilla plantilla.xlsx --salida documentos
+    python -m generador "exportaciones/*.xlsx" --plantilla plantilla.xlsx --procesos 4 --reanudar
+
+Cada documento se escribe en el directorio de salida en cuanto termina su
+institución. Con varios archivos origen, los documentos de cada uno van en un
+subdirectorio con el nombre del archivo (con un sufijo numérico si dos archivos de
+carpetas distintas se llaman igual, como en el ZIP de /api/generar_lote). Con --reanudar se omiten los documentos
+que ya existen y son más recientes que el archivo origen y la plantilla.
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+
+from generador.agregado import agregar_instituciones
+from generador.compartidos import procesar_compartiendo
+from generador.empaquetado import carpetas_origen
+from generador.lectura import COLUMNAS_REQUERIDAS, leer_encabezados, leer_origen
+from generador.nombres import nombres_documentos
+from generador.plantilla import PlantillaPreparada
+
+
+class ErrorLote(Exception):
+    """Error en un archivo origen; se informa y se continúa con los demás"""
+
+
+def expandir_origenes(patrones):
+    """Rutas de los archivos origen, expandiendo los patrones glob, sin repetir"""
+    rutas = []
+    for patron in patrones:
+        coincidencias = sorted(glob.glob(patron)) if glob.has_magic(patron) else [patron]
+        for ruta in coincidencias:
+            if ruta not in rutas:
+                rutas.append(ruta)
+    return rutas
+
+
+def leer_instituciones(ruta):
+    """Lee y agrega el archivo origen con las mismas validaciones que /api/generar_documentos"""
+    with open(ruta, 'rb') as archivo:
+        contenido = archivo.read()
+    encabezados = leer_encabezados(contenido)
+    if not encabezados:
+        raise ErrorLote('El archivo de datos está vacío')
+    for columna in COLUMNAS_REQUERIDAS:
+        if columna not in encabezados:
+            raise ErrorLote(f'No se encontró la columna requerida: {columna}')
+    df = leer_origen(contenido, encabezados)
+    if df.empty:
+        raise ErrorLote('El archivo de datos está vacío')
+    return agregar_instituciones(df)
+
+
+def escribir_archivo(ruta, contenido):
+    """
+    Escribe en un temporal del mismo directorio y lo renombra: un documento a medio
+    escribir por una interrupción nunca pasa por uno terminado al reanudar
+    """
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
+def actualizado(ruta, referencia):
+    """Indica si el documento existe y es posterior a `referencia` (marca de tiempo)"""
+    try:
+        return os.path.getmtime(ruta) >= referencia
+    except OSError:
+        return False
+
+
+def generar_lote(ruta_origen, plantilla, directorio, procesos=None, reanudar=False, referencia=0.0):
+    """
+    Genera en `directorio` los documentos del archivo origen, uno por institución,
+    escribiendo cada uno en cuanto termina. Con `reanudar` se omiten los documentos
+    posteriores a `referencia` y al archivo origen. Devuelve (generados, omitidos).
+    """
+    instituciones = leer_instituciones(ruta_origen)
+    os.makedirs(directorio, exist_ok=True)
+
+    # Los nombres que coinciden reciben un sufijo para que ningún documento sobrescriba a otro
+    nombres, _ = nombres_documentos(instituciones)
+    pendientes = list(zip(nombres, instituciones))
+    if reanudar:
+        referencia = max(referencia, os.path.getmtime(ruta_origen))
+        pendientes = [(nombre, registro) for nombre, registro in pendientes
+                      if not actualizado(os.path.join(directorio, nombre), referencia)]
+
+    generados = 0
+    archivos = procesar_compartiendo([registro for _, registro in pendientes], plantilla, plantilla.indice_hoja,
+                                     procesos=procesos)
+    for (nombre, _), archivo in zip(pendientes, archivos):
+        escribir_archivo(os.path.join(directorio, nombre), archivo['contenido'])
+        generados += 1
+    return generados, len(instituciones) - len(pendientes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m generador', description=__doc__.splitlines()[1])
+    parser.add_argument('origenes', nargs='+', metavar='origen',
+                        help='Archivo origen o patrón glob (entre comillas para que no lo expanda el shell)')
+    parser.add_argument('--plantilla', required=True, help='Plantilla XLSX')
+    parser.add_argument('--salida', default='documentos_generados', help='Directorio de salida')
+    parser.add_argument('--procesos', type=int, default=None,
+                        help='Procesos de generación (por defecto, GENERADOR_PROCESOS)')
+    parser.add_argument('--reanudar', '--resume', action='store_true',
+                        help='Omitir los documentos que ya existen y están al día')
+    args = parser.parse_args(argv)
+
+    origenes = expandir_origenes(args.origenes)
+    faltantes = [ruta for ruta in origenes if not os.path.isfile(ruta)]
+    if not origenes or faltantes:
+        parser.error(f"No se encontraron los archivos origen: {', '.join(faltantes or args.origenes)}")
+
+    try:
+        with open(args.plantilla, 'rb') as archivo:
+            plantilla = PlantillaPreparada.desde_bytes(archivo.read())
+    except Exception as e:
+        print(f"Error al verificar la plantilla: {str(e)}", file=sys.stderr)
+        return 1
+    referencia = os.path.getmtime(args.plantilla)
+
+    # Un subdirectorio distinto por archivo, aunque dos se llamen igual (a/export.xlsx y b/export.xlsx)
+    carpetas = carpetas_origen(origenes) if len(origenes) > 1 else [''] * len(origenes)
+    errores = 0
+    for ruta, carpeta in zip(origenes, carpetas):
+        directorio = os.path.join(args.salida, carpeta) if carpeta else args.salida
+        try:
+            generados, omitidos = generar_lote(ruta, plantilla, directorio, args.procesos, args.reanudar, referencia)
+        except Exception as e:
+            print(f"Error al procesar {ruta}: {str(e)}", file=sys.stderr)
+            errores += 1
+            continue
+        print(f"{ruta}: {generados} documentos generados, {omitidos} omitidos, en {directorio}")
+
+    return 1 if errores else 0
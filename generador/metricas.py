@@ -0,0 +1,186 @@
+"""
+Medición del tiempo de cada etapa de la generación.
+
+Con GENERADOR_METRICAS activo, cada etapa medida con `medir` se registra en un
+histograma por etapa que /metrics expone en el formato de texto de Prometheus. Los
+histogramas son del proceso: con varios procesos de servidor cada uno expone los
+suyos. Desactivado (por defecto), `medir` devuelve un contexto vacío y no se toma
+ningún tiempo.
+
+Aparte, una solicitud puede pedir el desglose de sus propios tiempos: `recolectar`
+acumula las etapas medidas en el hilo actual mientras está activo, aunque las
+métricas estén desactivadas.
+"""
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+VARIABLE_METRICAS = 'GENERADOR_METRICAS'
+
+# Etapas medidas: por solicitud las cuatro primeras, por institución las demás
+ETAPAS = (
+    'lectura_archivo',  # lectura de la plantilla subida
+    'lectura_excel',    # encabezados y cuerpo del archivo origen
+    'plantilla',        # preparación de la plantilla u obtención de la caché
+    'agrupacion',       # agregado por institución y carrera
+    'clonado',          # copia de la plantilla para el documento
+    'llenado',          # escritura de los datos en la hoja
+    'guardado',         # serialización del XLSX
+    'codificacion',     # base64 para la respuesta JSON
+)
+
+# Límites superiores de los buckets en segundos, como los de los clientes de Prometheus
+LIMITES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+TIPO_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+_SIN_MEDICION = nullcontext()
+_hilo = threading.local()
+
+
+def metricas_activas():
+    """Lee de la variable de entorno GENERADOR_METRICAS si se registran los histogramas"""
+    return os.environ.get(VARIABLE_METRICAS, '').strip().lower() in ('1', 'true', 'si', 'sí', 'on')
+
+
+class Histograma:
+    """Conteo por bucket, suma y total de las observaciones de una etapa"""
+
+    def __init__(self, limites=LIMITES):
+        self.limites = limites
+        self.cuentas = [0] * len(limites)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for posicion, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cuentas[posicion] += 1
+                break
+        self.suma += valor
+        self.total += 1
+
+
+class RegistroMetricas:
+    """Histogramas por etapa del proceso, protegidos por un lock"""
+
+    NOMBRE = 'generador_etapa_segundos'
+
+    def __init__(self):
+        self._histogramas = {etapa: Histograma() for etapa in ETAPAS}
+        self._lock = threading.Lock()
+
+    def observar(self, etapa, segundos):
+        with self._lock:
+            histograma = self._histogramas.get(etapa)
+            if histograma is None:
+                histograma = self._histogramas[etapa] = Histograma()
+            histograma.observar(segundos)
+
+    def texto_prometheus(self):
+        """Los histogramas en el formato de exposición de texto de Prometheus"""
+        lineas = [
+            f'# HELP {self.NOMBRE} Duración de cada etapa de la generación de documentos.',
+            f'# TYPE {self.NOMBRE} histogram',
+        ]
+        with self._lock:
+            for etapa, histograma in self._histogramas.items():
+                acumulado = 0
+                for limite, cuenta in zip(histograma.limites, histograma.cuentas):
+                    acumulado += cuenta
+                    lineas.append(f'{self.NOMBRE}_bucket{{etapa="{etapa}",le="{limite}"}} {acumulado}')
+                lineas.append(f'{self.NOMBRE}_bucket{{etapa="{etapa}",le="+Inf"}} {histograma.total}')
+                lineas.append(f'{self.NOMBRE}_sum{{etapa="{etapa}"}} {histograma.suma}')
+                lineas.append(f'{self.NOMBRE}_count{{etapa="{etapa}"}} {histograma.total}')
+        return '\n'.join(lineas) + '\n'
+
+
+_registro = RegistroMetricas()
+
+
+def registro_metricas():
+    return _registro
+
+
+class Recolector:
+    """
+    Tiempos acumulados por etapa mientras está activo en el hilo. Con observar=False
+    solo acumula: lo usan los procesos trabajadores, cuyos tiempos registra el principal.
+    """
+
+    def __init__(self, observar=True):
+        self.tiempos = {}
+        self.observar = observar
+        self._inicio = None
+        self._anterior = None
+
+    def agregar(self, etapa, segundos):
+        self.tiempos[etapa] = self.tiempos.get(etapa, 0.0) + segundos
+        if self.observar and metricas_activas():
+            _registro.observar(etapa, segundos)
+
+    def desglose(self):
+        """Segundos por etapa, en el orden de ETAPAS, y el total desde que se activó"""
+        desglose = {etapa: round(self.tiempos[etapa], 4) for etapa in ETAPAS if etapa in self.tiempos}
+        desglose['total'] = round(time.perf_counter() - self._inicio, 4)
+        return desglose
+
+    def __enter__(self):
+        # Puede volver a activarse (p. ej. al transmitir la respuesta); el total cuenta desde la primera vez
+        if self._inicio is None:
+            self._inicio = time.perf_counter()
+        self._anterior = getattr(_hilo, 'recolector', None)
+        _hilo.recolector = self
+        return self
+
+    def __exit__(self, *exc):
+        _hilo.recolector = self._anterior
+        return False
+
+
+class _Medicion:
+    __slots__ = ('etapa', 'recolector', 'inicio')
+
+    def __init__(self, etapa, recolector):
+        self.etapa = etapa
+        self.recolector = recolector
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self.inicio
+        if self.recolector is not None:
+            self.recolector.agregar(self.etapa, segundos)
+        else:
+            _registro.observar(self.etapa, segundos)
+        return False
+
+
+def recolectar(activo=True, observar=True):
+    """Recolector de tiempos para el hilo actual, o un contexto vacío (que entrega None) si no está activo"""
+    return Recolector(observar) if activo else nullcontext()
+
+
+def midiendo():
+    """Indica si las etapas se están midiendo en el hilo actual"""
+    return getattr(_hilo, 'recolector', None) is not None or metricas_activas()
+
+
+def medir(etapa):
+    """Contexto que mide la etapa, o un contexto vacío si no hay nada que registrar"""
+    recolector = getattr(_hilo, 'recolector', None)
+    if recolector is None and not metricas_activas():
+        return _SIN_MEDICION
+    return _Medicion(etapa, recolector)
+
+
+def registrar(tiempos):
+    """Registra tiempos por etapa medidos en otro proceso como si se hubieran medido aquí"""
+    recolector = getattr(_hilo, 'recolector', None)
+    for etapa, segundos in tiempos.items():
+        if recolector is not None:
+            recolector.agregar(etapa, segundos)
+        elif metricas_activas():
+            _registro.observar(etapa, segundos)
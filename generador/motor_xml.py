@@ -0,0 +1,973 @@
+"""
+Motor de escritura que parcha directamente el XML de la hoja de la plantilla.
+
+La plantilla se indexa una sola vez (`PlantillaXml`): filas y celdas de la hoja a
+llenar, rangos combinados, columnas y estilos. Cada documento (`DocumentoXml`)
+expone una `HojaXml` con la parte de la interfaz de una hoja de openpyxl que usa
+`rellenar_hoja` (cell, merge_cells, column_dimensions, merged_cells y
+formato_filas) y registra solo los cambios. Al guardar se reescriben la hoja y, si hace falta, styles.xml;
+el resto de las partes del paquete se copian tal cual, ya comprimidas. La hoja se
+escribe fila por fila directamente al compresor, sin reunir su XML completo.
+
+Las reglas de tipos de valor, formatos de fecha y bordes de las celdas combinadas
+son las de openpyxl 3.1, para que el resultado sea equivalente al del motor
+openpyxl (ver tests/test_motores.py). El XML de cada celda se escribe aquí mismo,
+sin recurrir al escritor interno de openpyxl.
+"""
+import posixpath
+import re
+import threading
+import zipfile
+from io import BytesIO
+from xml.etree import ElementTree
+
+from openpyxl.cell.cell import ERROR_CODES, ILLEGAL_CHARACTERS_RE, get_type, get_time_format
+from openpyxl.compat import NUMERIC_TYPES
+from openpyxl.styles import Alignment, Border, Font
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import column_index_from_string, coordinate_from_string, range_boundaries
+from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH, from_excel, to_excel
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.xml.functions import fromstring, tostring
+
+from generador.compresion import EntradaZip, entrada_original, fin_directorio, nivel_documentos
+from generador.formato import (ALINEACION_FILA, BORDE_FILA, FUENTE_FILA, RANGOS_FILA, FormatoFilas,
+                               orillas_combinada)
+
+_NS_PRINCIPAL = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_NS_RELACIONES = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_NS_PAQUETE = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_RE_ATRIBUTO = re.compile(r'([\w:]+)="([^"]*)"')
+_RE_SHEETDATA = re.compile(r'<sheetData\s*/>|<sheetData>(.*?)</sheetData>', re.S)
+_RE_FILA = re.compile(r'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+_RE_CELDA = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_RE_ESTILO_CELDA = re.compile(r'\ss="\d*"')
+_RE_SPANS = re.compile(r'\sspans="[^"]*"')
+_RE_COMBINADAS = re.compile(r'<mergeCells\b[^>]*?(?:/>|>.*?</mergeCells>)', re.S)
+_RE_COMBINADA = re.compile(r'<mergeCell\s+ref="([^"]+)"\s*/>')
+_RE_COLUMNAS = re.compile(r'<cols>(.*?)</cols>', re.S)
+_RE_COLUMNA = re.compile(r'<col\b([^>]*?)/>')
+_RE_DIMENSION = re.compile(r'<dimension\s+ref="([^"]+)"\s*/>')
+
+# Elementos de la hoja que van después de <mergeCells>, en el orden del esquema
+_DESPUES_DE_COMBINADAS = (
+    'phoneticPr', 'conditionalFormatting', 'dataValidations', 'hyperlinks', 'printOptions',
+    'pageMargins', 'pageSetup', 'headerFooter', 'rowBreaks', 'colBreaks', 'customProperties',
+    'cellWatches', 'ignoredErrors', 'smartTags', 'drawing', 'legacyDrawing', 'legacyDrawingHF',
+    'drawingHF', 'picture', 'oleObjects', 'controls', 'webPublishItems', 'tableParts', 'extLst',
+)
+
+# Valor de una celda de la plantilla que no se ha modificado
+_SIN_CAMBIO = object()
+
+# Tipo de dato de los valores más comunes, como en Cell._bind_value
+_TIPOS = {int: 'n', float: 'n', str: 's', bool: 'b'}
+
+
+class PlantillaNoCompatible(Exception):
+    """La plantilla usa algo que el motor XML no sabe parchar; se debe usar el motor openpyxl"""
+
+
+def _atributos(texto):
+    return dict(_RE_ATRIBUTO.findall(texto))
+
+
+def _escapar_atributo(valor):
+    return valor.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def _xml_objeto(objeto):
+    return tostring(objeto.to_tree()).decode('utf-8')
+
+
+def _validar_texto(valor):
+    # Mismas reglas que Cell.check_string de openpyxl
+    if not isinstance(valor, str):
+        valor = str(valor, 'utf-8')
+    valor = str(valor)[:32767]
+    if next(ILLEGAL_CHARACTERS_RE.finditer(valor), None):
+        raise IllegalCharacterError(f"{valor} cannot be used in worksheets.")
+    return valor
+
+
+def _convertir_valor(valor, formato_actual):
+    """
+    Infiere el tipo de dato como Cell._bind_value de openpyxl.
+    Devuelve (tipo, valor, formato numérico nuevo o None).
+    """
+    t = type(valor)
+    try:
+        tipo = _TIPOS[t]
+    except KeyError:
+        tipo = get_type(t, valor)
+
+    if tipo is None and valor is not None:
+        raise ValueError("Cannot convert {0!r} to Excel".format(valor))
+
+    formato = None
+    if tipo == 'd':
+        if not is_date_format(formato_actual):
+            formato = get_time_format(t)
+    elif tipo == 's':
+        valor = _validar_texto(valor)
+        if len(valor) > 1 and valor.startswith('='):
+            tipo = 'f'
+        elif valor in ERROR_CODES:
+            tipo = 'e'
+
+    return tipo or 'n', valor, formato
+
+
+class _Seccion:
+    """Lista de elementos hijos de una sección de styles.xml (fonts, borders, numFmts, cellXfs)"""
+
+    def __init__(self, xml, etiqueta, hijo):
+        self.etiqueta = etiqueta
+        patron = re.compile(r'<%s\b[^>]*?(?:/>|>(.*?)</%s>)' % (etiqueta, etiqueta), re.S)
+        coincidencia = patron.search(xml)
+        self.span = coincidencia.span() if coincidencia else None
+        patron_hijo = re.compile(r'<%s\b[^>]*?(?:/>|>.*?</%s>)' % (hijo, hijo), re.S)
+        self.elementos = patron_hijo.findall(coincidencia.group(1) or '') if coincidencia else []
+        self.nuevos = []
+        self._indices = {}
+        for indice, elemento in enumerate(self.elementos):
+            self._indices.setdefault(elemento, indice)
+
+    def indice(self, elemento):
+        """Índice del elemento, agregándolo al final si no existe"""
+        indice = self._indices.get(elemento)
+        if indice is None:
+            indice = len(self.elementos)
+            self.elementos.append(elemento)
+            self.nuevos.append(elemento)
+            self._indices[elemento] = indice
+        return indice
+
+    def xml(self):
+        return '<%s count="%d">%s</%s>' % (self.etiqueta, len(self.elementos), ''.join(self.elementos), self.etiqueta)
+
+
+class _EstilosXml:
+    """
+    Índice de styles.xml de la plantilla. Los estilos derivados (fuente, borde,
+    alineación o formato numérico nuevos sobre un estilo existente) se agregan al
+    final de cada sección y se comparten entre los documentos de la plantilla.
+    """
+
+    def __init__(self, xml):
+        self._xml = xml
+        self._lock = threading.Lock()
+        self._formatos = _Seccion(xml, 'numFmts', 'numFmt')
+        self._fuentes = _Seccion(xml, 'fonts', 'font')
+        self._bordes = _Seccion(xml, 'borders', 'border')
+        self._xfs = _Seccion(xml, 'cellXfs', 'xf')
+        if self._fuentes.span is None or self._bordes.span is None or self._xfs.span is None:
+            raise PlantillaNoCompatible('styles.xml sin fonts, borders o cellXfs')
+
+        self._codigos = {}
+        for elemento in self._formatos.elementos:
+            atributos = _atributos(elemento)
+            self._codigos[int(atributos['numFmtId'])] = atributos['formatCode']
+        self._bordes_leidos = {}
+        self._derivados = {}
+        self._sumas = {}
+        self._formatos_xf = {}
+        self._version = 0
+        self._xml_version = (0, None)
+        # openpyxl trata las celdas sin estilo (s="0") como índices en cero, no como el xf 0
+        self.cero = self._xfs.indice('<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>')
+        if self._xfs.nuevos:
+            self._version += 1
+
+    def _xf(self, indice):
+        elemento = self._xfs.elementos[indice]
+        apertura = re.match(r'<xf\b([^>]*?)/?>', elemento)
+        alineacion = re.search(r'<alignment\b[^>]*/>', elemento)
+        proteccion = re.search(r'<protection\b[^>]*/>', elemento)
+        return (_atributos(apertura.group(1)),
+                alineacion.group(0) if alineacion else None,
+                proteccion.group(0) if proteccion else None)
+
+    def formato(self, indice):
+        """Código del formato numérico de un xf"""
+        codigo = self._formatos_xf.get(indice)
+        if codigo is None:
+            with self._lock:
+                identificador = int(self._xf(indice)[0].get('numFmtId', 0))
+                codigo = self._codigos.get(identificador) or BUILTIN_FORMATS.get(identificador, 'General')
+            self._formatos_xf[indice] = codigo
+        return codigo
+
+    def borde(self, indice):
+        """Borde de un xf como objeto Border de openpyxl"""
+        with self._lock:
+            id_borde = int(self._xf(indice)[0].get('borderId', 0))
+            borde = self._bordes_leidos.get(id_borde)
+            if borde is None:
+                borde = Border.from_tree(fromstring(self._bordes.elementos[id_borde]))
+                self._bordes_leidos[id_borde] = borde
+            return borde
+
+    def fuente(self, indice):
+        """Fuente de un xf como objeto Font de openpyxl"""
+        with self._lock:
+            id_fuente = int(self._xf(indice)[0].get('fontId', 0))
+            return Font.from_tree(fromstring(self._fuentes.elementos[id_fuente]))
+
+    def alineacion(self, indice):
+        """Alineación de un xf como objeto Alignment de openpyxl"""
+        with self._lock:
+            xml_alineacion = self._xf(indice)[1]
+        return Alignment.from_tree(fromstring(xml_alineacion)) if xml_alineacion else Alignment()
+
+    def derivar(self, indice, fuente=None, borde=None, alineacion=None, formato=None):
+        """Índice del xf igual a `indice` con la fuente, borde, alineación o formato indicados"""
+        # Los objetos de estilo de openpyxl son inmutables en la práctica y se pueden usar como llave
+        clave = (indice, fuente, borde, alineacion, formato)
+        with self._lock:
+            derivado = self._derivados.get(clave)
+            if derivado is not None:
+                return derivado
+
+            atributos, xml_alineacion, xml_proteccion = self._xf(indice)
+            atributos = dict(atributos)
+            if fuente is not None:
+                atributos['fontId'] = str(self._fuentes.indice(_xml_objeto(fuente)))
+                atributos['applyFont'] = '1'
+            if borde is not None:
+                atributos['borderId'] = str(self._bordes.indice(_xml_objeto(borde)))
+                atributos['applyBorder'] = '1'
+            if alineacion is not None:
+                xml_alineacion = _xml_objeto(alineacion)
+                atributos['applyAlignment'] = '1'
+            if formato is not None:
+                atributos['numFmtId'] = str(self._id_formato(formato))
+                atributos['applyNumberFormat'] = '1'
+
+            hijos = ''.join(h for h in (xml_alineacion, xml_proteccion) if h)
+            texto_atributos = ''.join(f' {nombre}="{valor}"' for nombre, valor in atributos.items())
+            elemento = f'<xf{texto_atributos}>{hijos}</xf>' if hijos else f'<xf{texto_atributos}/>'
+
+            total = len(self._xfs.elementos)
+            derivado = self._xfs.indice(elemento)
+            if len(self._xfs.elementos) != total:
+                self._version += 1
+            self._derivados[clave] = derivado
+            return derivado
+
+    def sumar_borde(self, indice, borde):
+        """Índice del xf con `borde` sumado al borde actual, como `cell.border += borde` en openpyxl"""
+        clave = (indice, borde)
+        derivado = self._sumas.get(clave)
+        if derivado is None:
+            actual = self.borde(indice)
+            combinado = actual + borde
+            derivado = indice if combinado == actual else self.derivar(indice, borde=combinado)
+            self._sumas[clave] = derivado
+        return derivado
+
+    def _id_formato(self, codigo):
+        for identificador, existente in BUILTIN_FORMATS.items():
+            if existente == codigo:
+                return identificador
+        for identificador, existente in self._codigos.items():
+            if existente == codigo:
+                return identificador
+        identificador = max([163] + list(self._codigos)) + 1
+        self._codigos[identificador] = codigo
+        self._formatos.indice(f'<numFmt numFmtId="{identificador}" formatCode="{_escapar_atributo(codigo)}"/>')
+        return identificador
+
+    def xml(self):
+        """styles.xml con los estilos derivados, o None si no se ha agregado ninguno"""
+        with self._lock:
+            if self._version == 0:
+                return None
+            version, contenido = self._xml_version
+            if version == self._version:
+                return contenido
+
+            xml = self._xml
+            # Reemplazar de atrás hacia adelante para no alterar las posiciones pendientes
+            secciones = [s for s in (self._formatos, self._fuentes, self._bordes, self._xfs) if s.nuevos and s.span]
+            for seccion in sorted(secciones, key=lambda s: s.span[0], reverse=True):
+                inicio, fin = seccion.span
+                xml = xml[:inicio] + seccion.xml() + xml[fin:]
+            if self._formatos.nuevos and self._formatos.span is None:
+                # numFmts es el primer hijo de styleSheet
+                apertura = re.search(r'<styleSheet\b[^>]*>', xml)
+                xml = xml[:apertura.end()] + self._formatos.xml() + xml[apertura.end():]
+
+            contenido = xml.encode('utf-8')
+            self._xml_version = (self._version, contenido)
+            return contenido
+
+
+def _texto_elemento(elemento):
+    """Texto de un <si> o <is>: el <t> directo o el de cada <r>, sin las guías fonéticas"""
+    if elemento is None:
+        return None
+    partes = [elemento.findtext(f'{{{_NS_PRINCIPAL}}}t')]
+    partes.extend(r.findtext(f'{{{_NS_PRINCIPAL}}}t') for r in elemento.iter(f'{{{_NS_PRINCIPAL}}}r'))
+    return ''.join(p for p in partes if p)
+
+
+def _textos_compartidos(xml):
+    """Cadenas de sharedStrings.xml, en orden"""
+    raiz = ElementTree.fromstring(xml)
+    return [_texto_elemento(si) for si in raiz.iter(f'{{{_NS_PRINCIPAL}}}si')]
+
+
+def _entrada_original(contenido, info):
+    entrada = entrada_original(contenido, info)
+    if entrada is None:
+        raise PlantillaNoCompatible(f'Parte cifrada o ZIP64: {info.filename}')
+    return entrada
+
+
+def _resolver(base, destino):
+    if destino.startswith('/'):
+        return destino[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), destino))
+
+
+def _relaciones(paquete, parte):
+    ruta = posixpath.join(posixpath.dirname(parte), '_rels', posixpath.basename(parte) + '.rels')
+    raiz = ElementTree.fromstring(paquete.read(ruta))
+    return {r.get('Id'): (r.get('Type', ''), _resolver(parte, r.get('Target', '')), r)
+            for r in raiz.iter(f'{{{_NS_PAQUETE}}}Relationship')}
+
+
+def hojas_libro(paquete):
+    """
+    Ruta del libro del paquete XLSX (ZipFile), su elemento raíz, sus relaciones y las
+    rutas de sus hojas de cálculo en orden (sin las de gráficos)
+    """
+    raices = _relaciones(paquete, '')
+    ruta_libro = next(destino for tipo, destino, _ in raices.values() if tipo.endswith('/officeDocument'))
+    libro = ElementTree.fromstring(paquete.read(ruta_libro))
+    relaciones_libro = _relaciones(paquete, ruta_libro)
+
+    hojas = []
+    for hoja in libro.iter(f'{{{_NS_PRINCIPAL}}}sheet'):
+        tipo, destino, _ = relaciones_libro[hoja.get(f'{{{_NS_RELACIONES}}}id')]
+        if tipo.endswith('/worksheet'):
+            hojas.append(destino)
+    return ruta_libro, libro, relaciones_libro, hojas
+
+
+def rangos_combinados(xml):
+    """Rangos de <mergeCells> en el XML de una hoja (o en la parte que lo contiene)"""
+    combinadas = _RE_COMBINADAS.search(xml)
+    rangos = []
+    for referencia in _RE_COMBINADA.findall(combinadas.group(0) if combinadas else ''):
+        min_col, min_row, max_col, max_row = range_boundaries(referencia)
+        rangos.append(_Rango(min_row, min_col, max_row, max_col))
+    return rangos
+
+
+class _Rango:
+    """Rango combinado con los atributos que usa set_cell_value"""
+
+    __slots__ = ('min_row', 'min_col', 'max_row', 'max_col')
+
+    def __init__(self, min_row, min_col, max_row, max_col):
+        self.min_row = min_row
+        self.min_col = min_col
+        self.max_row = max_row
+        self.max_col = max_col
+
+    @property
+    def coord(self):
+        return (f'{get_column_letter(self.min_col)}{self.min_row}:'
+                f'{get_column_letter(self.max_col)}{self.max_row}')
+
+    def contiene(self, otro):
+        return (self.min_row <= otro.min_row and otro.max_row <= self.max_row
+                and self.min_col <= otro.min_col and otro.max_col <= self.max_col)
+
+    def celdas(self):
+        for fila in range(self.min_row, self.max_row + 1):
+            for columna in range(self.min_col, self.max_col + 1):
+                yield fila, columna
+
+    def bordes(self):
+        """Coordenadas de cada orilla, como en MergedCellRange de openpyxl"""
+        filas = range(self.min_row, self.max_row + 1)
+        columnas = range(self.min_col, self.max_col + 1)
+        return {
+            'top': [(self.min_row, c) for c in columnas],
+            'left': [(f, self.min_col) for f in filas],
+            'right': [(f, self.max_col) for f in filas],
+            'bottom': [(self.max_row, c) for c in columnas],
+        }
+
+
+class PlantillaXml:
+    """
+    Paquete de la plantilla indexado para parchar la hoja `indice_hoja`.
+    Lanza PlantillaNoCompatible si la hoja usa algo que este motor no soporta.
+    """
+
+    def __init__(self, contenido, indice_hoja=1):
+        paquete = zipfile.ZipFile(BytesIO(contenido))
+        nombres = paquete.namelist()
+
+        # Libro, hoja a llenar y estilos
+        ruta_libro, libro, relaciones_libro, hojas = hojas_libro(paquete)
+        if not hojas:
+            raise PlantillaNoCompatible('La plantilla no tiene hojas de cálculo')
+        if indice_hoja >= len(hojas):
+            print(f"Advertencia: El índice de hoja {indice_hoja} no es válido. Se usará la última hoja disponible.")
+            indice_hoja = len(hojas) - 1
+        self.ruta_hoja = hojas[indice_hoja]
+        self.ruta_estilos = next((d for t, d, _ in relaciones_libro.values() if t.endswith('/styles')), None)
+        if self.ruta_estilos is None:
+            raise PlantillaNoCompatible('La plantilla no tiene styles.xml')
+
+        propiedades = libro.find(f'{{{_NS_PRINCIPAL}}}workbookPr')
+        fecha_1904 = propiedades is not None and propiedades.get('date1904') in ('1', 'true')
+        self.epoch = MAC_EPOCH if fecha_1904 else WINDOWS_EPOCH
+
+        self.estilos = _EstilosXml(paquete.read(self.ruta_estilos).decode('utf-8'))
+        ruta_textos = next((d for t, d, _ in relaciones_libro.values() if t.endswith('/sharedStrings')), None)
+        self._textos = _textos_compartidos(paquete.read(ruta_textos)) if ruta_textos in nombres else []
+        # Estilos con el formato de fila ya derivados, por xf de origen; los comparten los documentos
+        self.estilos_fila = {}
+        self.estilos_combinadas = {}
+        self._indexar_hoja(paquete.read(self.ruta_hoja).decode('utf-8'))
+
+        # calcChain lista celdas con fórmula; si alguna se sobrescribe Excel pediría reparar
+        # el libro, así que se elimina como lo hace openpyxl y Excel la reconstruye
+        partes_modificadas = {}
+        ruta_cadena = next((d for t, d, _ in relaciones_libro.values() if t.endswith('/calcChain')), None)
+        if ruta_cadena in nombres:
+            ruta_rels = posixpath.join(posixpath.dirname(ruta_libro), '_rels', posixpath.basename(ruta_libro) + '.rels')
+            partes_modificadas[ruta_rels] = re.sub(
+                r'<Relationship\b[^>]*calcChain[^>]*/>', '', paquete.read(ruta_rels).decode('utf-8')).encode('utf-8')
+            partes_modificadas['[Content_Types].xml'] = re.sub(
+                r'<Override\b[^>]*calcChain[^>]*/>', '', paquete.read('[Content_Types].xml').decode('utf-8')).encode('utf-8')
+
+        # Partes que no cambian entre documentos: encabezados locales y datos ya comprimidos,
+        # concatenados en un solo bloque que se copia al inicio de cada documento
+        self._entradas_fijas = []
+        self._info_variables = {}
+        for info in paquete.infolist():
+            if info.filename == ruta_cadena:
+                continue
+            if info.filename in (self.ruta_hoja, self.ruta_estilos):
+                self._info_variables[info.filename] = info
+                continue
+            if info.filename in partes_modificadas:
+                entrada = EntradaZip.comprimir(info.filename, partes_modificadas[info.filename], info.date_time)
+            else:
+                entrada = _entrada_original(contenido, info)
+            self._entradas_fijas.append(entrada)
+
+        bloque = []
+        self._centrales_fijos = []
+        posicion = 0
+        for entrada in self._entradas_fijas:
+            self._centrales_fijos.append(entrada.encabezado_central(posicion))
+            local = entrada.encabezado_local()
+            bloque.append(local)
+            bloque.append(entrada.datos)
+            posicion += len(local) + len(entrada.datos)
+        self._bloque_fijo = b''.join(bloque)
+        self._estilos_originales = _entrada_original(contenido, self._info_variables[self.ruta_estilos])
+
+    def _indexar_hoja(self, xml):
+        if 't="shared"' in xml:
+            # Las fórmulas compartidas dependen de la celda maestra; openpyxl las traduce al cargar
+            raise PlantillaNoCompatible('La hoja usa fórmulas compartidas')
+
+        datos = _RE_SHEETDATA.search(xml)
+        if datos is None:
+            raise PlantillaNoCompatible('No se encontró <sheetData> en la hoja')
+        self._cabecera = xml[:datos.start()]
+        self._cola = xml[datos.end():]
+
+        # Filas y celdas: fila -> (atributos de <row>, xml original, {columna: (xml, estilo)})
+        self.filas = {}
+        for fila in _RE_FILA.finditer(datos.group(1) or ''):
+            atributos_fila = fila.group(1)
+            numero = _atributos(atributos_fila).get('r')
+            if numero is None:
+                raise PlantillaNoCompatible('Fila sin atributo r')
+            celdas = {}
+            for celda in _RE_CELDA.finditer(fila.group(2) or ''):
+                atributos = _atributos(celda.group(1))
+                if 'r' not in atributos:
+                    raise PlantillaNoCompatible('Celda sin atributo r')
+                columna = column_index_from_string(coordinate_from_string(atributos['r'])[0])
+                estilo = int(atributos.get('s') or 0)
+                celdas[columna] = (celda.group(0), estilo or self.estilos.cero)
+            self.filas[int(numero)] = (atributos_fila, fila.group(0), celdas)
+
+        # Rangos combinados y celdas que quedan dentro de ellos (sin contar la superior izquierda)
+        self.rangos = rangos_combinados(self._cola)
+        self.combinadas = set()
+        self.rango_de = {}
+        for rango in self.rangos:
+            self.combinadas.update(list(rango.celdas())[1:])
+            for coordenada in rango.celdas():
+                self.rango_de.setdefault(coordenada, rango)
+
+        # Columnas: columna inicial -> atributos de <col>
+        columnas = _RE_COLUMNAS.search(self._cabecera)
+        self.columnas = {}
+        for columna in _RE_COLUMNA.findall(columnas.group(1) if columnas else ''):
+            atributos = _atributos(columna)
+            self.columnas[int(atributos['min'])] = atributos
+
+    def valor_original(self, fila, columna):
+        """Valor de la celda en la plantilla, como lo leería openpyxl"""
+        original = self.filas.get(fila)
+        celda = original[2].get(columna) if original else None
+        if celda is None:
+            return None
+        xml, estilo = celda
+        atributos = _atributos(_RE_CELDA.match(xml).group(1))
+        tipo = atributos.get('t', 'n')
+        # La celda se copió sin la declaración del espacio de nombres de la hoja
+        elemento = ElementTree.fromstring(f'<c xmlns="{_NS_PRINCIPAL}"{xml[2:]}')
+        formula = elemento.find(f'{{{_NS_PRINCIPAL}}}f')
+        if formula is not None and formula.text:
+            return '=' + formula.text
+        if tipo == 'inlineStr':
+            return _texto_elemento(elemento.find(f'{{{_NS_PRINCIPAL}}}is'))
+        valor = elemento.findtext(f'{{{_NS_PRINCIPAL}}}v')
+        if valor is None:
+            return None
+        if tipo == 's':
+            return self._textos[int(valor)]
+        if tipo == 'b':
+            return valor in ('1', 'true')
+        if tipo in ('str', 'e'):
+            return valor
+        numero = float(valor) if any(c in valor for c in '.Ee') else int(valor)
+        if is_date_format(self.estilos.formato(estilo)):
+            return from_excel(numero, self.epoch)
+        return numero
+
+    def nuevo_documento(self):
+        return DocumentoXml(self)
+
+    def _partes_hoja(self, hoja):
+        """
+        XML de la hoja del documento, fila por fila: cada fila se escribe en cuanto se
+        genera, sin reunir la hoja completa. Las filas sin cambios se copian de la plantilla.
+        """
+        plantilla_filas = self.filas
+        cambios_por_fila = {}
+        for (fila, columna), estado in hoja._estados.items():
+            cambios_por_fila.setdefault(fila, {})[columna] = estado
+
+        yield self._cabecera_documento(hoja, max(plantilla_filas.keys() | cambios_por_fila.keys(), default=1),
+                                       max((c for _, c in hoja._estados), default=1))
+        yield '<sheetData>'
+        for numero in sorted(set(plantilla_filas) | set(cambios_por_fila)):
+            cambios = cambios_por_fila.pop(numero, None)
+            original = plantilla_filas.get(numero)
+            if cambios is None:
+                yield original[1]
+                continue
+
+            atributos_fila, _, celdas = original if original else ('', None, {})
+            if not atributos_fila:
+                atributos_fila = f' r="{numero}"'
+            partes = ['<row%s>' % _RE_SPANS.sub('', atributos_fila).rstrip()]
+            for columna in sorted(set(celdas) | set(cambios)):
+                estado = cambios.get(columna)
+                if estado is None:
+                    partes.append(celdas[columna][0])
+                else:
+                    partes.append(self._xml_celda(numero, columna, estado, celdas.get(columna)))
+            partes.append('</row>')
+            yield ''.join(partes)
+        yield '</sheetData>'
+        yield self._cola_documento(hoja)
+
+    def _xml_celda(self, fila, columna, estado, original):
+        if estado.valor is _SIN_CAMBIO:
+            # Solo cambió el estilo: se conserva el contenido original
+            if original is None:
+                return f'<c r="{get_column_letter(columna)}{fila}" s="{estado.estilo}"/>'
+            return self._reemplazar_estilo(original[0], estado.estilo)
+
+        return _xml_celda_valor(f'{get_column_letter(columna)}{fila}', estado.estilo, estado.tipo, estado.valor,
+                                self.epoch)
+
+    @staticmethod
+    def _reemplazar_estilo(xml, estilo):
+        fin_apertura = xml.index('>')
+        apertura = xml[:fin_apertura]
+        if _RE_ESTILO_CELDA.search(apertura):
+            apertura = _RE_ESTILO_CELDA.sub(f' s="{estilo}"', apertura, count=1)
+        else:
+            apertura = apertura.rstrip('/') + f' s="{estilo}"' + ('/' if apertura.endswith('/') else '')
+        return apertura + xml[fin_apertura:]
+
+    def _cabecera_documento(self, hoja, fila_maxima, columna_maxima):
+        cabecera = self._cabecera
+        anchos = {column_index_from_string(letra): c.width
+                  for letra, c in hoja.column_dimensions.items() if c.width is not None}
+        if anchos:
+            columnas = {minimo: dict(atributos) for minimo, atributos in self.columnas.items()}
+            for indice, ancho in anchos.items():
+                atributos = columnas.setdefault(indice, {'min': str(indice), 'max': str(indice)})
+                atributos['width'] = repr(float(ancho)).rstrip('0').rstrip('.')
+                atributos['customWidth'] = '1'
+            xml_columnas = '<cols>%s</cols>' % ''.join(
+                '<col%s/>' % ''.join(f' {n}="{v}"' for n, v in columnas[m].items()) for m in sorted(columnas))
+            if _RE_COLUMNAS.search(cabecera):
+                cabecera = _RE_COLUMNAS.sub(lambda _: xml_columnas, cabecera, count=1)
+            else:
+                cabecera = cabecera + xml_columnas
+
+        dimension = _RE_DIMENSION.search(cabecera)
+        if dimension:
+            min_col, min_row, max_col, max_row = range_boundaries(dimension.group(1) + (
+                '' if ':' in dimension.group(1) else ':' + dimension.group(1)))
+            max_row = max(max_row, fila_maxima)
+            max_col = max(max_col, columna_maxima)
+            referencia = f'{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}'
+            cabecera = cabecera[:dimension.start()] + f'<dimension ref="{referencia}"/>' + cabecera[dimension.end():]
+        return cabecera
+
+    def _cola_documento(self, hoja):
+        if not hoja._rangos_nuevos:
+            return self._cola
+        rangos = self.rangos + hoja._rangos_nuevos
+        xml_combinadas = '<mergeCells count="%d">%s</mergeCells>' % (
+            len(rangos), ''.join(f'<mergeCell ref="{r.coord}"/>' for r in rangos))
+        if _RE_COMBINADAS.search(self._cola):
+            return _RE_COMBINADAS.sub(lambda _: xml_combinadas, self._cola, count=1)
+
+        # Sin <mergeCells> en la plantilla: insertarlo antes del primer elemento que le sigue
+        posicion = self._cola.rindex('</worksheet>')
+        for etiqueta in _DESPUES_DE_COMBINADAS:
+            encontrado = re.search(r'<%s\b' % etiqueta, self._cola)
+            if encontrado:
+                posicion = encontrado.start()
+                break
+        return self._cola[:posicion] + xml_combinadas + self._cola[posicion:]
+
+    def guardar(self, hoja, nivel_compresion=6):
+        """Ensambla el XLSX del documento: bloque fijo, hoja parchada, estilos y directorio central"""
+        info_hoja = self._info_variables[self.ruta_hoja]
+        variables = [EntradaZip.comprimir_partes(self.ruta_hoja, self._partes_hoja(hoja), info_hoja.date_time,
+                                                  nivel_compresion)]
+        estilos = self.estilos.xml()
+        if estilos is None:
+            variables.append(self._estilos_originales)
+        else:
+            info_estilos = self._info_variables[self.ruta_estilos]
+            variables.append(EntradaZip.comprimir(self.ruta_estilos, estilos, info_estilos.date_time, nivel_compresion))
+
+        partes = [self._bloque_fijo]
+        centrales = list(self._centrales_fijos)
+        posicion = len(self._bloque_fijo)
+        for entrada in variables:
+            local = entrada.encabezado_local()
+            centrales.append(entrada.encabezado_central(posicion))
+            partes.append(local)
+            partes.append(entrada.datos)
+            posicion += len(local) + len(entrada.datos)
+
+        partes.append(fin_directorio(centrales, posicion))
+        return b''.join(partes)
+
+
+def _escapar_texto(texto):
+    return texto.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _texto_numero(valor):
+    # Como safe_string de openpyxl: NaN e infinito se escriben vacíos
+    if valor != valor or valor in (float('inf'), float('-inf')):
+        return ''
+    return '%.16g' % valor
+
+
+def _xml_celda_valor(coordenada, estilo, tipo, valor, epoch):
+    """
+    XML de una celda con su valor ya convertido por _convertir_valor, igual al que
+    escribe openpyxl 3.1 (etree_write_cell) para los mismos tipo y valor
+    """
+    if tipo == 'd':
+        if getattr(valor, 'tzinfo', None) is not None:
+            raise TypeError("Excel does not support timezones in datetimes. "
+                            "The tzinfo in the datetime/time object must be set to None.")
+        tipo, valor = 'n', to_excel(valor, epoch)
+
+    if valor is None or valor == '':
+        return f'<c r="{coordenada}" s="{estilo}" t="{"inlineStr" if tipo == "s" else tipo}" />'
+
+    if tipo == 's':
+        if not isinstance(valor, str):
+            raise ValueError(f'El motor XML no escribe texto enriquecido ({coordenada})')
+        recortado = valor.strip()
+        espacio = ' xml:space="preserve"' if recortado and recortado != valor else ''
+        return (f'<c r="{coordenada}" s="{estilo}" t="inlineStr">'
+                f'<is><t{espacio}>{_escapar_texto(valor)}</t></is></c>')
+
+    if tipo == 'f':
+        if not isinstance(valor, str):
+            raise ValueError(f'El motor XML no escribe fórmulas de matriz ni de tabla de datos ({coordenada})')
+        return f'<c r="{coordenada}" s="{estilo}"><f>{_escapar_texto(valor[1:])}</f><v /></c>'
+
+    texto = _texto_numero(valor) if isinstance(valor, NUMERIC_TYPES) else _escapar_texto(str(valor))
+    contenido = f'<v>{texto}</v>' if texto else '<v />'
+    return f'<c r="{coordenada}" s="{estilo}" t="{tipo}">{contenido}</c>'
+
+
+class _EstadoCelda:
+    __slots__ = ('estilo', 'valor', 'tipo')
+
+    def __init__(self, estilo):
+        self.estilo = estilo
+        self.valor = _SIN_CAMBIO
+        self.tipo = None
+
+
+class _CeldaXml:
+    """Celda de HojaXml con los atributos de una celda de openpyxl que usa el generador"""
+
+    __slots__ = ('_hoja', 'row', 'column')
+
+    def __init__(self, hoja, row, column):
+        self._hoja = hoja
+        self.row = row
+        self.column = column
+
+    @property
+    def value(self):
+        estado = self._hoja._estados.get((self.row, self.column))
+        if estado is not None and estado.valor is not _SIN_CAMBIO:
+            return estado.valor
+        return self._hoja._plantilla.valor_original(self.row, self.column)
+
+    @value.setter
+    def value(self, valor):
+        self._hoja._escribir_valor(self.row, self.column, valor)
+
+    @property
+    def border(self):
+        return self._hoja._estilos.borde(self._hoja._estilo(self.row, self.column))
+
+    @border.setter
+    def border(self, borde):
+        self._hoja._derivar(self.row, self.column, borde=borde)
+
+    @property
+    def font(self):
+        return self._hoja._estilos.fuente(self._hoja._estilo(self.row, self.column))
+
+    @font.setter
+    def font(self, fuente):
+        self._hoja._derivar(self.row, self.column, fuente=fuente)
+
+    @property
+    def alignment(self):
+        return self._hoja._estilos.alineacion(self._hoja._estilo(self.row, self.column))
+
+    @alignment.setter
+    def alignment(self, alineacion):
+        self._hoja._derivar(self.row, self.column, alineacion=alineacion)
+
+
+class _CeldaCombinadaXml(_CeldaXml):
+    """Equivalente a MergedCell: su valor es de solo lectura"""
+
+    __slots__ = ()
+
+    @property
+    def value(self):
+        return None
+
+    @value.setter
+    def value(self, valor):
+        raise AttributeError("'MergedCell' object attribute 'value' is read-only")
+
+
+class _DimensionColumna:
+    __slots__ = ('width',)
+
+    def __init__(self):
+        self.width = None
+
+
+class _Columnas(dict):
+    def __missing__(self, letra):
+        dimension = self[letra] = _DimensionColumna()
+        return dimension
+
+
+class _RangosCombinados:
+    def __init__(self, ranges):
+        self.ranges = ranges
+
+
+class _FormatoFilasXml(FormatoFilas):
+    """
+    FormatoFilas sobre una HojaXml: los estilos derivados se guardan por índice de xf
+    en la PlantillaXml, así que cada documento reutiliza los de los anteriores
+    """
+
+    def __init__(self, hoja, combinadas, rangos=RANGOS_FILA):
+        self.ws = hoja
+        self.combinadas = combinadas
+        self.rangos = rangos
+        self._estilos = hoja._plantilla.estilos_fila
+        self._estilos_combinadas = hoja._plantilla.estilos_combinadas
+
+    def formatear(self, fila_inicio, fila_fin, columnas):
+        hoja = self.ws
+        for fila in range(fila_inicio, fila_fin + 1):
+            for columna in columnas:
+                estado = hoja._estado(fila, columna)
+                estado.estilo = self._con_formato(estado.estilo)
+
+    def _con_formato(self, indice):
+        con_formato = self._estilos.get(indice)
+        if con_formato is None:
+            con_formato = self._estilos[indice] = self.ws._estilos.derivar(
+                indice, fuente=FUENTE_FILA, borde=BORDE_FILA, alineacion=ALINEACION_FILA)
+        return con_formato
+
+    def combinar(self, fila_inicio, fila_fin):
+        hoja = self.ws
+        for fila in range(fila_inicio, fila_fin + 1):
+            for inicio, fin in self.rangos:
+                hoja._agregar_rango(_Rango(fila, inicio, fila, fin))
+                estilo_inicial = hoja._estilo(fila, inicio)
+                for columna in range(inicio + 1, fin + 1):
+                    hoja._combinadas.add((fila, columna))
+                    estado = hoja._estados[(fila, columna)] = _EstadoCelda(
+                        self._estilo_combinada(estilo_inicial, columna == fin))
+                    estado.valor = None
+                    estado.tipo = 'n'
+                self.combinadas.agregar(fila, inicio, fila, fin)
+
+    def _estilo_combinada(self, indice, es_ultima):
+        # Mismo cálculo que FormatoFilas, a partir del xf sin estilo
+        clave = (indice, es_ultima)
+        estilo = self._estilos_combinadas.get(clave)
+        if estilo is None:
+            estilos = self.ws._estilos
+            estilo = estilos.cero
+            for orilla in orillas_combinada(estilos.borde(indice), es_ultima):
+                estilo = estilos.sumar_borde(estilo, orilla)
+            self._estilos_combinadas[clave] = estilo
+        return estilo
+
+
+class HojaXml:
+    """Registro de cambios sobre la hoja de la plantilla, con la interfaz de hoja de openpyxl"""
+
+    def __init__(self, plantilla):
+        self._plantilla = plantilla
+        self._estilos = plantilla.estilos
+        self._estados = {}
+        self._combinadas = set()
+        self._rangos_nuevos = []
+        # Rango combinado al que pertenece cada celda de los rangos agregados
+        self._rangos = {}
+        self.merged_cells = _RangosCombinados(list(plantilla.rangos))
+        self.column_dimensions = _Columnas()
+
+    def formato_filas(self, combinadas, rangos=RANGOS_FILA):
+        """Formato por bloques de las filas adicionales (ver generador.formato)"""
+        return _FormatoFilasXml(self, combinadas, rangos)
+
+    def cell(self, row, column):
+        coordenada = (row, column)
+        if coordenada in self._combinadas or coordenada in self._plantilla.combinadas:
+            return _CeldaCombinadaXml(self, row, column)
+        return _CeldaXml(self, row, column)
+
+    def _rango_de(self, fila, columna):
+        coordenada = (fila, columna)
+        rango = self._rangos.get(coordenada)
+        return rango if rango is not None else self._plantilla.rango_de.get(coordenada)
+
+    def _estado(self, fila, columna):
+        estado = self._estados.get((fila, columna))
+        if estado is None:
+            original = self._plantilla.filas.get(fila)
+            celda = original[2].get(columna) if original else None
+            estado = self._estados[(fila, columna)] = _EstadoCelda(celda[1] if celda else self._estilos.cero)
+        return estado
+
+    def _estilo(self, fila, columna):
+        estado = self._estados.get((fila, columna))
+        if estado is not None:
+            return estado.estilo
+        original = self._plantilla.filas.get(fila)
+        celda = original[2].get(columna) if original else None
+        return celda[1] if celda else self._estilos.cero
+
+    def _derivar(self, fila, columna, **cambios):
+        estado = self._estado(fila, columna)
+        estado.estilo = self._estilos.derivar(estado.estilo, **cambios)
+
+    def _escribir_valor(self, fila, columna, valor):
+        estado = self._estado(fila, columna)
+        tipo, valor, formato = _convertir_valor(valor, self._estilos.formato(estado.estilo))
+        if formato is not None:
+            estado.estilo = self._estilos.derivar(estado.estilo, formato=formato)
+        estado.valor = valor
+        estado.tipo = tipo
+
+    def _agregar_rango(self, rango):
+        # Como MultiCellRange.add: no se agrega si ya está contenido en otro rango
+        existente = self._rango_de(rango.min_row, rango.min_col)
+        if existente is None or not existente.contiene(rango):
+            self.merged_cells.ranges.append(rango)
+            self._rangos_nuevos.append(rango)
+            for coordenada in rango.celdas():
+                self._rangos.setdefault(coordenada, rango)
+
+    def merge_cells(self, range_string=None, start_row=None, start_column=None, end_row=None, end_column=None):
+        """Combina un rango con el mismo efecto que Worksheet.merge_cells de openpyxl"""
+        if range_string is not None:
+            start_column, start_row, end_column, end_row = range_boundaries(range_string)
+        rango = _Rango(start_row, start_column, end_row, end_column)
+        self._agregar_rango(rango)
+
+        # Las celdas combinadas pierden valor y estilo
+        for coordenada in list(rango.celdas())[1:]:
+            self._combinadas.add(coordenada)
+            estado = self._estados[coordenada] = _EstadoCelda(self._estilos.cero)
+            estado.valor = None
+            estado.tipo = 'n'
+
+        # Y reciben en las orillas el borde de la celda superior izquierda
+        borde_inicial = self.cell(rango.min_row, rango.min_col).border
+        for nombre, coordenadas in rango.bordes().items():
+            lado = getattr(borde_inicial, nombre)
+            if lado and lado.style is None:
+                continue
+            borde = Border(**{nombre: lado})
+            for fila, columna in coordenadas:
+                estilo = self._estilo(fila, columna)
+                sumado = self._estilos.sumar_borde(estilo, borde)
+                if sumado != estilo:
+                    self._estado(fila, columna).estilo = sumado
+
+
+class DocumentoXml:
+    """Documento de una institución generado por el motor XML"""
+
+    def __init__(self, plantilla):
+        self._plantilla = plantilla
+        self.hoja = HojaXml(plantilla)
+
+    def guardar(self, nivel_compresion=None):
+        """Devuelve los bytes del XLSX, con el nivel de compresión configurado si no se indica"""
+        if nivel_compresion is None:
+            nivel_compresion = nivel_documentos()
+        return self._plantilla.guardar(self.hoja, nivel_compresion)
@@ -0,0 +1,81 @@
+"""
+Clave de cada institución y nombre del archivo de su documento.
+
+En las exportaciones la misma institución llega a escribirse con espacios de más o
+saltos de línea, así que la clave con que se agrupan las filas, y de la que sale el
+nombre del archivo, es el nombre con los espacios normalizados; el documento conserva
+el texto original (ver README.md). El nombre del archivo conserva solo letras sin acento, dígitos
+y espacios (como el script PowerShell original), de modo que variantes como
+"U.N.A.M." y "UNAM" dan el mismo archivo: `resolver_nombres` detecta esas colisiones
+y agrega un sufijo numérico en lugar de que un documento sobrescriba a otro.
+"""
+import re
+
+NOMBRE_BASE = "2_REG. DE PROG. INST. EDUCATIVA - PEMEX 2025 ALTIPLANO.xlsx"
+
+_RE_NO_PERMITIDOS = re.compile(r'[^a-zA-Z0-9\s]')
+
+
+def canonizar_institucion(valor):
+    """Clave de la institución: los textos sin espacios al inicio ni al final y con uno solo entre palabras"""
+    if isinstance(valor, str):
+        return ' '.join(valor.split())
+    return valor
+
+
+def institucion_texto(registro):
+    """Nombre de la institución del registro como texto"""
+    return str(registro.institucion) if registro.institucion is not None else "sin_institucion"
+
+
+def nombre_documento(institucion_str):
+    """Construye el nombre del archivo reemplazando "INST. EDUCATIVA" por el nombre de la escuela"""
+    # Usar el mismo formato que el script PowerShell
+    nombre_limpio = _RE_NO_PERMITIDOS.sub('', institucion_str)
+    return NOMBRE_BASE.replace("INST. EDUCATIVA", nombre_limpio)
+
+
+def resolver_nombres(textos, grupos=None):
+    """
+    Nombre del archivo de cada institución (por su texto), en orden, y las colisiones
+    encontradas. Si el nombre de una institución ya lo tiene otra del mismo grupo (sin
+    distinguir mayúsculas, como los sistemas de archivos de Windows), recibe " (2)",
+    " (3)"... antes de la extensión. `grupos` indica, en el mismo orden, la carpeta de
+    cada institución (los archivos de un lote); en carpetas distintas no hay colisión.
+    Cada colisión es {'archivo', 'instituciones', 'nombres'} (y 'origen' con grupos).
+    """
+    if grupos is None:
+        grupos = [None] * len(textos)
+    nombres = []
+    usados = set()
+    colisiones = {}
+    for texto, grupo in zip(textos, grupos):
+        base = nombre_documento(texto)
+        nombre = base
+        repeticion = 2
+        while (grupo, nombre.casefold()) in usados:
+            raiz, extension = base.rsplit('.', 1)
+            nombre = f'{raiz} ({repeticion}).{extension}'
+            repeticion += 1
+        usados.add((grupo, nombre.casefold()))
+        nombres.append(nombre)
+        colision = colisiones.setdefault((grupo, base.casefold()), {'archivo': base, 'instituciones': [], 'nombres': []})
+        colision['instituciones'].append(texto)
+        colision['nombres'].append(nombre)
+
+    resultado = []
+    for (grupo, _), colision in colisiones.items():
+        if len(colision['instituciones']) > 1:
+            if grupo is not None:
+                colision['origen'] = grupo
+            resultado.append(colision)
+    return nombres, resultado
+
+
+def nombres_documentos(instituciones, grupos=None):
+    """Como `resolver_nombres`, para las InstitucionAgregada; avisa de cada colisión"""
+    nombres, colisiones = resolver_nombres([institucion_texto(registro) for registro in instituciones], grupos)
+    for colision in colisiones:
+        print(f"Advertencia: Las instituciones {', '.join(colision['instituciones'])} dan el mismo archivo "
+              f"{colision['archivo']}; se guardan como {', '.join(colision['nombres'])}")
+    return nombres, colisiones
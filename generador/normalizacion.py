@@ -0,0 +1,62 @@
+"""
+Normalización de los nombres de carrera y de los textos de actividad.
+
+Los mismos textos se repiten en muchas instituciones, así que cada `Normalizador`
+recuerda sus resultados en una caché LRU acotada.
+"""
+import re
+from functools import lru_cache
+
+# Palabras que se mantienen en minúsculas en los nombres de carrera
+PALABRAS_MINUSCULAS = frozenset(['DE', 'DEL', 'LA', 'LAS', 'LOS', 'Y', 'EN'])
+
+# Textos distintos que recuerda cada normalizador
+CAPACIDAD = 4096
+
+_RE_FIN_ORACION = re.compile(r'(\.+\s*)')
+_RE_PUNTOS = re.compile(r'\.+')
+
+
+def formatear_carrera(texto):
+    """Primera letra de cada palabra en mayúscula, salvo artículos y preposiciones en minúsculas"""
+    return ' '.join(palabra.lower() if palabra.upper() in PALABRAS_MINUSCULAS else palabra.capitalize()
+                    for palabra in texto.split())
+
+
+def formatear_actividad(texto):
+    """Todo en minúsculas salvo la primera letra del texto y la primera después de cada punto"""
+    if not texto:
+        return texto
+
+    partes = []
+    mayuscula = True
+    for parte in _RE_FIN_ORACION.split(texto.lower()):
+        if parte.strip() == '':
+            partes.append(parte)
+        elif _RE_PUNTOS.match(parte):
+            partes.append(parte)
+            mayuscula = True
+        elif mayuscula:
+            partes.append(parte[0].upper() + parte[1:])
+            mayuscula = False
+        else:
+            partes.append(parte)
+    return ''.join(partes)
+
+
+class Normalizador:
+    """Aplica `funcion` recordando los últimos `capacidad` resultados"""
+
+    def __init__(self, funcion, capacidad=CAPACIDAD):
+        self.funcion = funcion
+        self._memorizada = lru_cache(maxsize=capacidad, typed=True)(funcion)
+
+    def __call__(self, texto):
+        return self._memorizada(texto)
+
+    def limpiar(self):
+        self._memorizada.cache_clear()
+
+
+normalizar_carrera = Normalizador(formatear_carrera)
+normalizar_actividad = Normalizador(formatear_actividad)
@@ -0,0 +1,106 @@
+"""Reparto de la generación por institución entre varios procesos."""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from generador import metricas
+from generador.documento import procesar_institucion_en_memoria
+
+# Número de procesos para generar documentos: 1 (por defecto) genera en el proceso
+# actual, un número mayor usa un pool de ese tamaño y "auto" usa todos los núcleos
+VARIABLE_PROCESOS = 'GENERADOR_PROCESOS'
+# Tope de documentos en curso con el pool de procesos
+VARIABLE_EN_VUELO = 'GENERADOR_DOCUMENTOS_EN_VUELO'
+
+# Plantilla de cada proceso trabajador, recibida una sola vez en el inicializador
+_plantilla_trabajador = None
+
+
+def procesos_configurados():
+    """Lee el número de procesos de la variable de entorno GENERADOR_PROCESOS"""
+    valor = os.environ.get(VARIABLE_PROCESOS, '1').strip().lower()
+    if valor == 'auto':
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(valor))
+    except ValueError:
+        print(f"Advertencia: Valor no válido para {VARIABLE_PROCESOS}: {valor}. Se generará en un solo proceso.")
+        return 1
+
+
+def _inicializar_trabajador(plantilla):
+    global _plantilla_trabajador
+    _plantilla_trabajador = plantilla
+
+
+def _procesar_en_trabajador(registro, indice_hoja, en_base64, medir):
+    # Los tiempos del trabajador se devuelven para registrarlos en el proceso principal
+    with metricas.recolectar(medir, observar=False) as recolector:
+        resultado = procesar_institucion_en_memoria(registro, _plantilla_trabajador, indice_hoja, en_base64)
+    return resultado, recolector.tiempos if recolector is not None else None
+
+
+def en_vuelo_configurado(procesos):
+    """
+    Documentos que pueden estar generándose o esperando a ser consumidos a la vez con
+    el pool, de GENERADOR_DOCUMENTOS_EN_VUELO (por defecto, dos por proceso)
+    """
+    valor = os.environ.get(VARIABLE_EN_VUELO, '').strip()
+    if not valor:
+        return 2 * procesos
+    try:
+        return max(1, int(valor))
+    except ValueError:
+        print(f"Advertencia: Valor no válido para {VARIABLE_EN_VUELO}: {valor}. Se usarán {2 * procesos}.")
+        return 2 * procesos
+
+
+def procesar_instituciones(instituciones, plantilla, indice_hoja=1, procesos=None, en_base64=True):
+    """
+    Genera los documentos de cada InstitucionAgregada en el mismo orden en que se reciben.
+
+    Con más de un proceso, cada trabajador recibe la PlantillaPreparada una sola vez
+    al iniciar. Se envían al pool a lo más en_vuelo_configurado() instituciones a la
+    vez y cada una que se entrega deja lugar a la siguiente, así que la memoria no
+    crece con el número de instituciones aunque el consumidor sea más lento.
+    """
+    if procesos is None:
+        procesos = procesos_configurados()
+
+    if procesos <= 1:
+        for registro in instituciones:
+            yield procesar_institucion_en_memoria(registro, plantilla, indice_hoja, en_base64)
+        return
+
+    try:
+        pool = ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_trabajador, initargs=(plantilla,))
+    except (OSError, NotImplementedError) as e:
+        # Entornos sin soporte de multiprocesamiento (p. ej. algunas funciones serverless)
+        print(f"Advertencia: No se pudo iniciar el pool de procesos ({str(e)}). Se generará en un solo proceso.")
+        yield from procesar_instituciones(instituciones, plantilla, indice_hoja, procesos=1, en_base64=en_base64)
+        return
+
+    medir = metricas.midiendo()
+    registros = iter(instituciones)
+    pendientes = deque()
+
+    def enviar(registro):
+        pendientes.append(pool.submit(_procesar_en_trabajador, registro, indice_hoja, en_base64, medir))
+
+    with pool:
+        try:
+            for registro in islice(registros, en_vuelo_configurado(procesos)):
+                enviar(registro)
+            while pendientes:
+                resultado, tiempos = pendientes.popleft().result()
+                # Se envía la siguiente antes de entregar esta para que los trabajadores no esperen
+                for registro in islice(registros, 1):
+                    enviar(registro)
+                if tiempos:
+                    metricas.registrar(tiempos)
+                yield resultado
+        finally:
+            # Si el consumidor se detiene, no se generan las instituciones que aún no empiezan
+            for futuro in pendientes:
+                futuro.cancel()
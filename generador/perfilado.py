@@ -0,0 +1,253 @@
+"""
+Perfilado a pedido de una solicitud de generación.
+
+Una solicitud se perfila si trae el encabezado X-Generador-Perfil ("1" o el modo) o,
+sin él, con la probabilidad de GENERADOR_PERFILADO (0 por defecto; p. ej. 0.01 perfila
+una de cada cien). El perfil abarca todo lo que la solicitud hace en su hilo: lectura,
+agrupación, plantilla y cada procesar_institucion_en_memoria, también los que se
+generan al transmitir la respuesta. Con GENERADOR_PROCESOS mayor que 1 los documentos
+se generan en otros procesos y solo aparece la espera por ellos.
+
+Modos (GENERADOR_PERFILADO_MODO):
+
+- "muestreo" (por defecto): un hilo aparte toma la pila del hilo de la solicitud cada
+  GENERADOR_PERFILADO_INTERVALO_MS milisegundos (5 por defecto). El costo no depende
+  del número de llamadas, así que es apto para producción. Se guarda en el formato de
+  pilas plegadas (.folded) de flamegraph.pl, speedscope e inferno.
+- "determinista": cProfile registra cada llamada; es exacto pero hace más lenta la
+  solicitud. Se guarda como .pstats (pstats, snakeviz, gprof2dot).
+
+El encabezado solo activa el perfil en el modo configurado: el modo que nombra se
+respeta únicamente con GENERADOR_PERFILADO_MODO_POR_ENCABEZADO=1, para que un cliente
+cualquiera no pueda hacer más lenta su solicitud (y el servidor) con "determinista".
+
+Los perfiles se guardan en GENERADOR_DIRECTORIO_PERFILES, se conservan los
+MAXIMO_PERFILES más recientes y se descargan desde /api/perfiles/<id>.
+"""
+import cProfile
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import uuid
+from collections import Counter
+
+VARIABLE_TASA = 'GENERADOR_PERFILADO'
+VARIABLE_MODO = 'GENERADOR_PERFILADO_MODO'
+VARIABLE_INTERVALO = 'GENERADOR_PERFILADO_INTERVALO_MS'
+VARIABLE_DIRECTORIO = 'GENERADOR_DIRECTORIO_PERFILES'
+# Con "1", el modo que nombra el encabezado reemplaza al configurado
+VARIABLE_MODO_POR_ENCABEZADO = 'GENERADOR_PERFILADO_MODO_POR_ENCABEZADO'
+
+ENCABEZADO = 'X-Generador-Perfil'
+
+MODO_MUESTREO = 'muestreo'
+MODO_DETERMINISTA = 'determinista'
+EXTENSIONES = {MODO_MUESTREO: '.folded', MODO_DETERMINISTA: '.pstats'}
+
+INTERVALO_MS = 5
+MAXIMO_PERFILES = 50
+
+_RE_ID = re.compile(r'[0-9a-f]{32}')
+
+
+def tasa_configurada():
+    """Lee de GENERADOR_PERFILADO la fracción de solicitudes que se perfilan sin encabezado"""
+    try:
+        return min(1.0, max(0.0, float(os.environ.get(VARIABLE_TASA, 0) or 0)))
+    except ValueError:
+        print(f"Advertencia: Valor no válido para {VARIABLE_TASA}. No se perfilará.")
+        return 0.0
+
+
+def modo_configurado():
+    """Lee de GENERADOR_PERFILADO_MODO el modo por omisión"""
+    modo = os.environ.get(VARIABLE_MODO, MODO_MUESTREO).strip().lower()
+    return modo if modo in EXTENSIONES else MODO_MUESTREO
+
+
+def modo_por_encabezado():
+    """Lee de GENERADOR_PERFILADO_MODO_POR_ENCABEZADO si el encabezado puede elegir el modo"""
+    return os.environ.get(VARIABLE_MODO_POR_ENCABEZADO, '').strip().lower() in ('1', 'true', 'si', 'sí', 'on')
+
+
+def intervalo_configurado():
+    """Lee de GENERADOR_PERFILADO_INTERVALO_MS los segundos entre muestras"""
+    try:
+        return max(0.001, float(os.environ.get(VARIABLE_INTERVALO, INTERVALO_MS)) / 1000)
+    except ValueError:
+        return INTERVALO_MS / 1000
+
+
+def directorio_perfiles():
+    return os.environ.get(VARIABLE_DIRECTORIO) or os.path.join(tempfile.gettempdir(), 'generador_perfiles')
+
+
+def perfil_para(encabezado):
+    """
+    Perfil nuevo para una solicitud con el valor `encabezado` de X-Generador-Perfil (o
+    None si no lo trae), o None si no le toca perfilarse. El modo que nombra el
+    encabezado solo se usa con GENERADOR_PERFILADO_MODO_POR_ENCABEZADO.
+    """
+    valor = (encabezado or '').strip().lower()
+    if valor in EXTENSIONES:
+        return Perfil(valor if modo_por_encabezado() else modo_configurado())
+    if valor in ('1', 'true', 'si', 'sí', 'on'):
+        return Perfil(modo_configurado())
+    tasa = tasa_configurada()
+    if tasa and random.random() < tasa:
+        return Perfil(modo_configurado())
+    return None
+
+
+def _marco(codigo):
+    # Sin ';', que separa los marcos en el formato plegado (la cuenta va tras el último espacio)
+    return f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})'.replace(';', ',')
+
+
+class _Muestreador(threading.Thread):
+    """Hilo que cuenta las pilas de los hilos perfilados cada `intervalo` segundos"""
+
+    def __init__(self, intervalo):
+        super().__init__(name='generador-perfilado', daemon=True)
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.hilos = set()
+        self.muestras = 0
+        self._detener = threading.Event()
+
+    def run(self):
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo):
+            marcos = sys._current_frames()
+            for hilo in list(self.hilos):
+                marco = marcos.get(hilo)
+                if marco is None or hilo == propio:
+                    continue
+                pila = []
+                while marco is not None:
+                    pila.append(_marco(marco.f_code))
+                    marco = marco.f_back
+                self.pilas[';'.join(reversed(pila))] += 1
+                self.muestras += 1
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+    def plegado(self):
+        """Pilas en el formato plegado: marcos de la raíz a la hoja separados por ';' y la cuenta"""
+        return ''.join(f'{pila} {cuenta}\n' for pila, cuenta in self.pilas.most_common())
+
+
+class Perfil:
+    """
+    Perfil de una solicitud. Como metricas.Recolector, puede activarse varias veces
+    (p. ej. al transmitir la respuesta) y acumula lo medido en cada activación;
+    `terminar` lo guarda.
+    """
+
+    def __init__(self, modo):
+        self.id = uuid.uuid4().hex
+        self.modo = modo
+        self._perfilador = None
+        self._muestreador = None
+        self._terminado = False
+
+    def __enter__(self):
+        if self._terminado:
+            return self
+        if self.modo == MODO_DETERMINISTA:
+            if self._perfilador is None:
+                self._perfilador = cProfile.Profile()
+            try:
+                self._perfilador.enable()
+            except ValueError:
+                # Otro perfilador determinista activo (Python 3.12+ admite uno por proceso)
+                print("Advertencia: Ya hay un perfil determinista activo. Se perfilará por muestreo.")
+                self.modo = MODO_MUESTREO
+                self._perfilador = None
+        if self.modo == MODO_MUESTREO:
+            if self._muestreador is None:
+                self._muestreador = _Muestreador(intervalo_configurado())
+                self._muestreador.start()
+            self._muestreador.hilos.add(threading.get_ident())
+        return self
+
+    def __exit__(self, *exc):
+        if self._perfilador is not None:
+            self._perfilador.disable()
+        if self._muestreador is not None:
+            self._muestreador.hilos.discard(threading.get_ident())
+        return False
+
+    def terminar(self):
+        """Detiene el perfilado y guarda el perfil en el directorio de perfiles"""
+        if self._terminado:
+            return
+        self._terminado = True
+        directorio = directorio_perfiles()
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(directorio, self.id + EXTENSIONES[self.modo])
+        temporal = ruta + '.tmp'
+        try:
+            if self._perfilador is not None:
+                self._perfilador.dump_stats(temporal)
+            else:
+                plegado = ''
+                if self._muestreador is not None:
+                    self._muestreador.detener()
+                    plegado = self._muestreador.plegado()
+                with open(temporal, 'w', encoding='utf-8') as archivo:
+                    archivo.write(plegado)
+            os.replace(temporal, ruta)
+        except Exception as e:
+            print(f"Advertencia: No se pudo guardar el perfil {self.id} ({str(e)}).")
+            return
+        _limpiar(directorio)
+
+
+def _limpiar(directorio):
+    # Se conservan los perfiles más recientes
+    perfiles = []
+    for nombre in os.listdir(directorio):
+        if os.path.splitext(nombre)[1] in EXTENSIONES.values():
+            ruta = os.path.join(directorio, nombre)
+            try:
+                perfiles.append((os.path.getmtime(ruta), ruta))
+            except OSError:
+                pass
+    for _, ruta in sorted(perfiles, reverse=True)[MAXIMO_PERFILES:]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+def ruta_perfil(id_perfil):
+    """Ruta del perfil guardado con ese id, o None si no existe (o aún no termina)"""
+    if not _RE_ID.fullmatch(id_perfil or ''):
+        return None
+    for extension in EXTENSIONES.values():
+        ruta = os.path.join(directorio_perfiles(), id_perfil + extension)
+        if os.path.exists(ruta):
+            return ruta
+    return None
+
+
+def perfilando(perfil):
+    """El perfil como contexto, o un contexto vacío si la solicitud no se perfila"""
+    return perfil if perfil is not None else _SIN_PERFIL
+
+
+class _SinPerfil:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_SIN_PERFIL = _SinPerfil()
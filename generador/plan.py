@@ -0,0 +1,124 @@
+"""
+Plan de llenado de la hoja de la plantilla.
+
+Las celdas en las que va cada dato de la institución se describen en un mapeo
+declarativo (MAPEO_ALTIPLANO, la única región que se genera; el nombre de los
+archivos en generador.nombres también es el de ALTIPLANO). `compilar_plan` lo
+resuelve una sola vez por hoja de plantilla contra sus celdas combinadas: la celda
+que recibe cada dato fijo, las anclas de las columnas de la tabla de carreras en las
+filas que la plantilla combina y cuántas filas de la tabla trae ya con formato. Con
+el plan, `rellenar_hoja` solo aplica escrituras ya resueltas.
+"""
+from generador.formato import RANGOS_FILA
+
+DIRECCION_ALTIPLANO = ("Bahía de Ballenas No. 5, Piso 08, Col. Verónica Anzures, Alcaldía Miguel Hidalgo, "
+                       "C.P. 11300, CDMX.")
+
+# Celdas como (fila, columna); las combinadas se resuelven al compilar
+MAPEO_ALTIPLANO = {
+    'region': 'ALTIPLANO',
+    # Fecha de inicio más antigua
+    'fecha_inicio': (7, 5),
+    # Textos fijos de la región
+    'textos': (
+        ((66, 6), DIRECCION_ALTIPLANO),
+    ),
+    # Datos del responsable: columna del archivo origen y celda
+    'responsable': (
+        ('INSTITUCION', (116, 5)),
+        ('NOMBRE A QUIEN SE DIRIGE CARTA DE ACEPTACION', (119, 5)),
+        ('CARGO ESCOLAR', (122, 5)),
+    ),
+    'tabla': {
+        'fila': 88,
+        # Última fila que la plantilla trae con formato; None la detecta por sus celdas combinadas
+        'ultima_preformateada': 89,
+        'columna_carrera': 2,
+        'columna_estudiantes': 5,
+        'columna_actividad': 7,
+        # Rangos que se combinan en cada fila que se agrega a la tabla
+        'rangos': RANGOS_FILA,
+        # Anchos de columna cuando la tabla rebasa las filas preformateadas
+        'anchos': {'B': 15, 'E': 8, 'G': 50},
+    },
+}
+
+class PlanLlenado:
+    """
+    Mapeo compilado para una hoja. Las celdas fijas son (fila, columna, dinamica):
+    con `dinamica` la celda puede quedar dentro de un rango que agregue la tabla de
+    carreras y su ancla se busca al escribir en el IndiceCombinadas del documento.
+    """
+
+    __slots__ = ('region', 'fecha_inicio', 'textos', 'responsable', 'fila_tabla', 'ultima_preformateada',
+                 'columna_carrera', 'columna_estudiantes', 'columna_actividad', 'anclas_carrera',
+                 'anclas_estudiantes', 'anclas_actividad', 'rangos', 'anchos')
+
+    def __init__(self, **valores):
+        for nombre, valor in valores.items():
+            setattr(self, nombre, valor)
+
+    @staticmethod
+    def escribir(ws, celda, valor, combinadas):
+        """Escribe `valor` en una celda fija del plan"""
+        fila, columna, dinamica = celda
+        if dinamica:
+            ancla = combinadas.ancla(fila, columna)
+            if ancla is not None:
+                fila, columna = ancla
+        ws.cell(row=fila, column=columna).value = valor
+
+
+def compilar_plan(mapeo, base):
+    """
+    Compila `mapeo` para la hoja cuyas celdas combinadas son `base` (anclas y
+    extensiones de combinadas.mapa_rangos). Lanza ValueError si las columnas de la
+    tabla no inician sus rangos.
+    """
+    anclas, extensiones = base
+    tabla = mapeo['tabla']
+    fila_tabla = tabla['fila']
+    rangos = tuple(tabla['rangos'])
+    inicios = {inicio for inicio, _ in rangos}
+    interiores = {columna for inicio, fin in rangos for columna in range(inicio + 1, fin + 1)}
+
+    columnas = {nombre: tabla[nombre] for nombre in ('columna_carrera', 'columna_estudiantes', 'columna_actividad')}
+    for nombre, columna in columnas.items():
+        # En otra columna la celda quedaría combinada al agregar filas y su ancla cambiaría por documento
+        if columna not in inicios or columna in interiores:
+            raise ValueError(f'El mapeo {mapeo["region"]}: {nombre} ({columna}) no inicia un rango de la tabla')
+
+    def celda(coordenada):
+        fila, columna = coordenada
+        ancla = anclas.get(coordenada)
+        if ancla is not None:
+            # Los rangos de la plantilla prevalecen sobre los que agregue el documento
+            return ancla + (False,)
+        return (fila, columna, fila >= fila_tabla and columna in interiores)
+
+    def anclas_columna(columna):
+        return {fila: ancla for (fila, c), ancla in anclas.items() if c == columna and fila >= fila_tabla}
+
+    ultima_preformateada = tabla.get('ultima_preformateada')
+    if ultima_preformateada is None:
+        ultima_preformateada = fila_tabla - 1
+        while all((ultima_preformateada + 1, inicio) not in anclas
+                  and extensiones.get((ultima_preformateada + 1, inicio)) == (ultima_preformateada + 1, fin)
+                  for inicio, fin in rangos):
+            ultima_preformateada += 1
+
+    fecha_inicio = mapeo.get('fecha_inicio')
+    return PlanLlenado(
+        region=mapeo['region'],
+        fecha_inicio=celda(fecha_inicio) if fecha_inicio is not None else None,
+        textos=tuple((celda(coordenada), texto) for coordenada, texto in mapeo.get('textos', ())),
+        responsable=tuple((columna, celda(coordenada)) for columna, coordenada in mapeo.get('responsable', ())),
+        fila_tabla=fila_tabla,
+        ultima_preformateada=ultima_preformateada,
+        anclas_carrera=anclas_columna(columnas['columna_carrera']),
+        anclas_estudiantes=anclas_columna(columnas['columna_estudiantes']),
+        anclas_actividad=anclas_columna(columnas['columna_actividad']),
+        rangos=rangos,
+        anchos=dict(tabla.get('anchos', {})),
+        **columnas,
+    )
@@ -0,0 +1,233 @@
+"""Preparación de la plantilla y clonado barato por institución."""
+import copyreg
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from openpyxl import load_workbook
+from openpyxl.worksheet.dimensions import DimensionHolder
+
+from generador.combinadas import IndiceCombinadas, mapa_rangos
+from generador.compresion import partes_plantilla
+from generador.motor_xml import PlantillaXml
+from generador.plan import MAPEO_ALTIPLANO, compilar_plan
+
+
+class PlantillaPreparada:
+    """
+    Plantilla analizada una sola vez y congelada en memoria.
+
+    En lugar de guardar y volver a leer el XLSX por cada institución, se conserva
+    una instantánea inmutable (bytes de pickle) del modelo de openpyxl y cada
+    documento se construye deserializándola, que es una copia estructural de los
+    objetos sin pasar por el formato XLSX.
+    """
+
+    def __init__(self, wb_plantilla, huella=None, contenido=None):
+        self.num_hojas = len(wb_plantilla.worksheets)
+        # Hash SHA-256 del XLSX original, si se conoce
+        self.huella = huella
+        # XLSX original, necesario para el motor XML
+        self.contenido = contenido
+        self._plantillas_xml = {}
+        self._lock_xml = threading.Lock()
+        self._partes = None
+        # Planes de llenado compilados: (hoja, región) -> PlanLlenado
+        self._planes = {}
+        # Celdas combinadas de cada hoja de la plantilla, compartidas por todos los documentos
+        self._combinadas = [mapa_rangos(ws.merged_cells.ranges) for ws in wb_plantilla.worksheets]
+        try:
+            self._instantanea = serializar_libro(wb_plantilla)
+            self._restaurar = pickle.loads
+        except Exception as e:
+            # Algunas plantillas pueden traer objetos que no se serializan; en ese caso
+            # se conserva el XLSX y se vuelve a leer por cada copia (ruta anterior)
+            print(f"Advertencia: No se pudo preparar la plantilla en memoria ({str(e)}). Se usará guardado y recarga.")
+            self._instantanea = save_virtual_workbook(wb_plantilla)
+            self._restaurar = _recargar_xlsx
+
+    @classmethod
+    def desde_bytes(cls, contenido):
+        """Analiza el XLSX de la plantilla y lo prepara para clonarse"""
+        return cls(load_workbook(BytesIO(contenido)), huella_contenido(contenido), contenido)
+
+    @property
+    def indice_hoja(self):
+        """Hoja que se llena: la segunda, o la primera si la plantilla solo tiene una"""
+        return 1 if self.num_hojas >= 2 else 0
+
+    @property
+    def tamano(self):
+        """Bytes que ocupan en memoria la instantánea y el XLSX original"""
+        return len(self._instantanea) + len(self.contenido or b'')
+
+    def clonar(self):
+        """Devuelve un libro de trabajo nuevo e independiente con el contenido de la plantilla"""
+        return self._restaurar(self._instantanea)
+
+    def combinadas(self, indice_hoja):
+        """Índice de celdas combinadas de la hoja `indice_hoja` para un documento nuevo"""
+        mapas = self._combinadas
+        return IndiceCombinadas(mapas[indice_hoja] if indice_hoja < len(mapas) else mapas[-1])
+
+    def plan(self, indice_hoja, mapeo=MAPEO_ALTIPLANO):
+        """Plan de llenado de la hoja `indice_hoja` con `mapeo` (ver generador.plan), compilado la primera vez"""
+        clave = (indice_hoja, mapeo['region'])
+        plan = self._planes.get(clave)
+        if plan is None:
+            mapas = self._combinadas
+            base = mapas[indice_hoja] if indice_hoja < len(mapas) else mapas[-1]
+            plan = self._planes[clave] = compilar_plan(mapeo, base)
+        return plan
+
+    def plantilla_xml(self, indice_hoja):
+        """
+        Devuelve la plantilla indexada para el motor XML, preparándola la primera vez,
+        o None si el XLSX no está disponible o usa algo que ese motor no soporta.
+        """
+        if self.contenido is None:
+            return None
+        with self._lock_xml:
+            if indice_hoja not in self._plantillas_xml:
+                try:
+                    self._plantillas_xml[indice_hoja] = PlantillaXml(self.contenido, indice_hoja)
+                except Exception as e:
+                    print(f"Advertencia: La plantilla no es compatible con el motor XML ({str(e)}). Se usará openpyxl.")
+                    self._plantillas_xml[indice_hoja] = None
+            return self._plantillas_xml[indice_hoja]
+
+    def partes_originales(self):
+        """
+        Partes del XLSX original con sus datos comprimidos (ver generador.compresion), para
+        copiar sin recomprimir las que el documento no cambia; None sin el XLSX original
+        """
+        if self.contenido is None:
+            return None
+        with self._lock_xml:
+            if self._partes is None:
+                self._partes = partes_plantilla(self.contenido)
+            return self._partes
+
+    def __getstate__(self):
+        # Las plantillas XML llevan candados; cada proceso trabajador las prepara por su cuenta
+        estado = self.__dict__.copy()
+        estado['_plantillas_xml'] = {}
+        estado['_partes'] = None
+        del estado['_lock_xml']
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock_xml = threading.Lock()
+
+
+def huella_contenido(contenido):
+    return hashlib.sha256(contenido).hexdigest()
+
+
+# Memoria máxima, en MB, de las plantillas preparadas que se conservan entre solicitudes
+VARIABLE_CACHE_MB = 'GENERADOR_CACHE_PLANTILLAS_MB'
+
+
+class CachePlantillas:
+    """
+    Plantillas preparadas indexadas por el hash de su contenido, con desalojo LRU
+    cuando el tamaño total de las instantáneas supera `capacidad` bytes.
+
+    El hash sirve también como identificador público: una plantilla subida una vez
+    puede referenciarse después por su id sin volver a enviarla.
+    """
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self._plantillas = OrderedDict()
+        self._ocupado = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, huella):
+        """Devuelve la plantilla con esa huella, o None si no está (o fue desalojada)"""
+        with self._lock:
+            plantilla = self._plantillas.get(huella)
+            if plantilla is not None:
+                self._plantillas.move_to_end(huella)
+            return plantilla
+
+    def preparar(self, contenido):
+        """Devuelve la plantilla preparada del XLSX `contenido`, analizándolo solo si no está en caché"""
+        huella = huella_contenido(contenido)
+        plantilla = self.obtener(huella)
+        if plantilla is not None:
+            return plantilla
+
+        # El análisis se hace fuera del candado para no bloquear otras solicitudes
+        plantilla = PlantillaPreparada(load_workbook(BytesIO(contenido)), huella, contenido)
+        with self._lock:
+            if huella not in self._plantillas:
+                self._plantillas[huella] = plantilla
+                self._ocupado += plantilla.tamano
+                self._desalojar()
+        return plantilla
+
+    def _desalojar(self):
+        # Se conserva siempre la más reciente aunque por sí sola exceda la capacidad
+        while self._ocupado > self.capacidad and len(self._plantillas) > 1:
+            _, plantilla = self._plantillas.popitem(last=False)
+            self._ocupado -= plantilla.tamano
+
+
+_cache = None
+_lock_cache = threading.Lock()
+
+
+def cache_plantillas():
+    """Caché de plantillas del proceso, dimensionada con GENERADOR_CACHE_PLANTILLAS_MB (64 por defecto)"""
+    global _cache
+    with _lock_cache:
+        if _cache is None:
+            try:
+                megabytes = float(os.environ.get(VARIABLE_CACHE_MB, 64))
+            except ValueError:
+                print(f"Advertencia: Valor no válido para {VARIABLE_CACHE_MB}. Se usarán 64 MB.")
+                megabytes = 64
+            _cache = CachePlantillas(int(megabytes * 1024 * 1024))
+        return _cache
+
+
+def _recargar_xlsx(contenido):
+    return load_workbook(BytesIO(contenido))
+
+
+def _reducir_dimensiones(dimensiones):
+    # DimensionHolder hereda de defaultdict y su reducción por defecto pasa la fábrica
+    # como primer argumento (que aquí es la hoja), perdiendo el enlace con la hoja
+    return (
+        DimensionHolder,
+        (dimensiones.worksheet, dimensiones.reference, dimensiones.default_factory),
+        {'max_outline': dimensiones.max_outline},
+        None,
+        iter(dimensiones.items()),
+    )
+
+
+_TABLA_REDUCCION = copyreg.dispatch_table.copy()
+_TABLA_REDUCCION[DimensionHolder] = _reducir_dimensiones
+
+
+def serializar_libro(workbook):
+    """Serializa el modelo de objetos de un libro de openpyxl para restaurarlo con pickle.loads"""
+    salida = BytesIO()
+    pickler = pickle.Pickler(salida, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = _TABLA_REDUCCION
+    pickler.dump(workbook)
+    return salida.getvalue()
+
+
+def save_virtual_workbook(workbook):
+    """Guarda un libro de trabajo en memoria"""
+    virtual_workbook = BytesIO()
+    workbook.save(virtual_workbook)
+    virtual_workbook.seek(0)
+    return virtual_workbook.read()
@@ -0,0 +1,55 @@
+"""
+Carga anticipada de las dependencias pesadas de la generación.
+
+Las rutas importan pandas y openpyxl (a través de los módulos de MODULOS) solo
+cuando atienden una generación, para que un arranque en frío de la función
+serverless sirva la página y las rutas ligeras sin pagar esas importaciones. Con
+GENERADOR_PRECARGA activo se importan en un hilo en segundo plano al registrar las
+rutas; también pueden cargarse a pedido con `precargar` (p. ej. desde /api/precarga).
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+
+VARIABLE_PRECARGA = 'GENERADOR_PRECARGA'
+
+# Módulos del núcleo que arrastran pandas y openpyxl
+MODULOS = (
+    'generador.lectura',
+    'generador.agregado',
+    'generador.plantilla',
+    'generador.incremental',
+)
+
+_lock = threading.Lock()
+_hilo = None
+
+
+def precarga_configurada():
+    """Lee de la variable de entorno GENERADOR_PRECARGA si se precargan las dependencias al arrancar"""
+    return os.environ.get(VARIABLE_PRECARGA, '').strip().lower() in ('1', 'true', 'si', 'sí', 'on')
+
+
+def cargados():
+    """Indica si todos los módulos de MODULOS ya están importados"""
+    return all(modulo in sys.modules for modulo in MODULOS)
+
+
+def precargar():
+    """Importa los módulos que falten y devuelve los segundos que tomó"""
+    inicio = time.perf_counter()
+    for modulo in MODULOS:
+        importlib.import_module(modulo)
+    return time.perf_counter() - inicio
+
+
+def precargar_en_segundo_plano():
+    """Inicia la precarga en un hilo daemon, una sola vez por proceso; devuelve el hilo"""
+    global _hilo
+    with _lock:
+        if _hilo is None:
+            _hilo = threading.Thread(target=precargar, name='generador-precarga', daemon=True)
+            _hilo.start()
+        return _hilo
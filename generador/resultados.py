@@ -0,0 +1,294 @@
+"""
+Almacén de resultados: los documentos de una generación se guardan en el servidor y
+el cliente recibe solo sus nombres, tamaños y la URL de cada uno, de modo que descarga
+únicamente los que necesita.
+
+Como el almacén de trabajos, el respaldo es intercambiable: `ResultadosArchivos` (por
+defecto) guarda cada resultado en un subdirectorio y sus documentos se envían desde
+disco; `ResultadosMemoria` los guarda en el proceso. Los resultados vencen a los
+GENERADOR_VIGENCIA_RESULTADOS segundos de creados y, al crear uno nuevo, se eliminan
+los más antiguos mientras el total rebase GENERADOR_RESULTADOS_MB. Como los trabajos,
+un resultado solo se elimina después de `terminar`: los que aún reciben documentos
+se conservan aunque hayan vencido o no quepan.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from io import BytesIO
+
+# Respaldo del almacén: "archivos" (por defecto) o "memoria"
+VARIABLE_ALMACEN = 'GENERADOR_ALMACEN_RESULTADOS'
+# Directorio del almacén de archivos
+VARIABLE_DIRECTORIO = 'GENERADOR_DIRECTORIO_RESULTADOS'
+# Segundos que se conservan los resultados
+VARIABLE_VIGENCIA = 'GENERADOR_VIGENCIA_RESULTADOS'
+# Espacio máximo, en MB, de todos los resultados
+VARIABLE_CAPACIDAD_MB = 'GENERADOR_RESULTADOS_MB'
+
+
+class AlmacenResultados(ABC):
+    """
+    Interfaz del almacén. Un resultado es una lista de documentos {'nombre', 'bytes'}
+    que se identifican por su posición.
+    """
+
+    def __init__(self, capacidad, vigencia=3600):
+        self.capacidad = capacidad
+        self.vigencia = vigencia
+
+    @abstractmethod
+    def crear(self):
+        """
+        Registra un resultado vacío, eliminando antes los terminados que vencieron o no
+        caben, y devuelve su identificador
+        """
+
+    @abstractmethod
+    def agregar(self, id_resultado, nombre, contenido):
+        """Guarda un documento en el resultado y devuelve su posición"""
+
+    @abstractmethod
+    def terminar(self, id_resultado):
+        """Marca que el resultado ya no recibirá documentos; desde entonces puede eliminarse"""
+
+    @abstractmethod
+    def listar(self, id_resultado):
+        """
+        Devuelve {'creado', 'vence', 'terminado', 'archivos': [{'nombre', 'bytes'}]}, o
+        None si no existe o venció
+        """
+
+    @abstractmethod
+    def abrir(self, id_resultado, indice):
+        """Devuelve (nombre, archivo binario de lectura) del documento, o None si no existe"""
+
+    def _vencido(self, creado, ahora):
+        return ahora - creado > self.vigencia
+
+
+class ResultadosMemoria(AlmacenResultados):
+    """Almacén en el proceso actual; adecuado para un solo servidor y para pruebas locales"""
+
+    def __init__(self, capacidad, vigencia=3600):
+        super().__init__(capacidad, vigencia)
+        # Resultados en orden de creación: id -> (creado, [(nombre, contenido)])
+        self._resultados = OrderedDict()
+        # Resultados que aún reciben documentos
+        self._en_curso = set()
+        self._ocupado = 0
+        self._lock = threading.Lock()
+
+    def crear(self):
+        id_resultado = uuid.uuid4().hex
+        with self._lock:
+            self._limpiar()
+            self._resultados[id_resultado] = (time.time(), [])
+            self._en_curso.add(id_resultado)
+        return id_resultado
+
+    def agregar(self, id_resultado, nombre, contenido):
+        with self._lock:
+            _, documentos = self._resultados[id_resultado]
+            documentos.append((nombre, bytes(contenido)))
+            self._ocupado += len(contenido)
+            return len(documentos) - 1
+
+    def terminar(self, id_resultado):
+        with self._lock:
+            self._en_curso.discard(id_resultado)
+
+    def listar(self, id_resultado):
+        with self._lock:
+            resultado = self._resultados.get(id_resultado)
+            if resultado is None or self._vencido(resultado[0], time.time()):
+                return None
+            creado, documentos = resultado
+            return {'creado': creado, 'vence': creado + self.vigencia, 'terminado': id_resultado not in self._en_curso,
+                    'archivos': [{'nombre': nombre, 'bytes': len(contenido)} for nombre, contenido in documentos]}
+
+    def abrir(self, id_resultado, indice):
+        with self._lock:
+            resultado = self._resultados.get(id_resultado)
+            if resultado is None or self._vencido(resultado[0], time.time()):
+                return None
+            documentos = resultado[1]
+            if not 0 <= indice < len(documentos):
+                return None
+            nombre, contenido = documentos[indice]
+        return nombre, BytesIO(contenido)
+
+    def _limpiar(self):
+        ahora = time.time()
+        for id_resultado in list(self._resultados):
+            creado, documentos = self._resultados[id_resultado]
+            # Los más antiguos van primero
+            if not self._vencido(creado, ahora) and self._ocupado <= self.capacidad:
+                break
+            if id_resultado in self._en_curso:
+                continue
+            del self._resultados[id_resultado]
+            self._ocupado -= sum(len(contenido) for _, contenido in documentos)
+
+
+class ResultadosArchivos(AlmacenResultados):
+    """
+    Almacén en disco: un subdirectorio por resultado con indice.json (fecha de creación y
+    si terminó), archivos.jsonl (una línea {'nombre', 'bytes'} por documento, que se
+    agrega sin reescribir las anteriores) y un archivo por documento
+    """
+
+    def __init__(self, directorio, capacidad, vigencia=3600):
+        super().__init__(capacidad, vigencia)
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        # Siguiente posición de cada resultado en curso creado por este almacén
+        self._posiciones = {}
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, id_resultado, nombre):
+        # Los identificadores son hexadecimales; se descarta cualquier otro valor
+        if not id_resultado.isalnum():
+            raise KeyError(id_resultado)
+        return os.path.join(self.directorio, id_resultado, nombre)
+
+    def _leer_archivos(self, id_resultado):
+        archivos = []
+        try:
+            with open(self._ruta(id_resultado, 'archivos.jsonl'), encoding='utf-8') as f:
+                for linea in f:
+                    # Una línea sin salto aún se está escribiendo
+                    if not linea.endswith('\n'):
+                        break
+                    archivos.append(json.loads(linea))
+        except FileNotFoundError:
+            pass
+        return archivos
+
+    def _leer_estado(self, id_resultado):
+        try:
+            with open(self._ruta(id_resultado, 'indice.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (KeyError, OSError, ValueError):
+            return None
+
+    def _leer_indice(self, id_resultado):
+        estado = self._leer_estado(id_resultado)
+        if estado is None:
+            return None
+        try:
+            return {**estado, 'archivos': self._leer_archivos(id_resultado)}
+        except (OSError, ValueError):
+            return None
+
+    def _guardar_estado(self, id_resultado, estado):
+        ruta = self._ruta(id_resultado, 'indice.json')
+        with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(estado, f)
+        # Reemplazo atómico para que los lectores nunca vean un índice a medio escribir
+        os.replace(ruta + '.tmp', ruta)
+
+    def crear(self):
+        id_resultado = uuid.uuid4().hex
+        self._limpiar()
+        os.makedirs(os.path.join(self.directorio, id_resultado))
+        self._guardar_estado(id_resultado, {'creado': time.time(), 'terminado': False})
+        with self._lock:
+            self._posiciones[id_resultado] = 0
+        return id_resultado
+
+    def agregar(self, id_resultado, nombre, contenido):
+        with self._lock:
+            posicion = self._posiciones.get(id_resultado)
+            if posicion is None:
+                # Creado por otro almacén sobre el mismo directorio
+                posicion = len(self._leer_archivos(id_resultado))
+            # El nombre del documento solo va en el índice; en disco se usa la posición
+            with open(self._ruta(id_resultado, f'{posicion}.xlsx'), 'wb') as f:
+                f.write(contenido)
+            # El documento ya está en disco cuando su línea aparece en el índice
+            with open(self._ruta(id_resultado, 'archivos.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'nombre': nombre, 'bytes': len(contenido)}) + '\n')
+            self._posiciones[id_resultado] = posicion + 1
+            return posicion
+
+    def terminar(self, id_resultado):
+        with self._lock:
+            self._posiciones.pop(id_resultado, None)
+            estado = self._leer_estado(id_resultado)
+            if estado is not None:
+                estado['terminado'] = True
+                self._guardar_estado(id_resultado, estado)
+
+    def listar(self, id_resultado):
+        indice = self._leer_indice(id_resultado)
+        if indice is None or self._vencido(indice['creado'], time.time()):
+            return None
+        return {**indice, 'vence': indice['creado'] + self.vigencia}
+
+    def abrir(self, id_resultado, indice):
+        resultado = self.listar(id_resultado)
+        if resultado is None or not 0 <= indice < len(resultado['archivos']):
+            return None
+        try:
+            return resultado['archivos'][indice]['nombre'], open(self._ruta(id_resultado, f'{indice}.xlsx'), 'rb')
+        except OSError:
+            return None
+
+    def _limpiar(self):
+        ahora = time.time()
+        resultados = []
+        for id_resultado in os.listdir(self.directorio):
+            indice = self._leer_indice(id_resultado)
+            if indice is None:
+                continue
+            resultados.append((indice['creado'], id_resultado, sum(a['bytes'] for a in indice['archivos']),
+                               indice.get('terminado', True)))
+        ocupado = sum(tamano for _, _, tamano, _ in resultados)
+        for creado, id_resultado, tamano, terminado in sorted(resultados):
+            if not self._vencido(creado, ahora) and ocupado <= self.capacidad:
+                break
+            if not terminado:
+                # Aún recibe documentos: eliminarlo haría fallar su siguiente agregar
+                continue
+            shutil.rmtree(os.path.join(self.directorio, id_resultado), ignore_errors=True)
+            ocupado -= tamano
+
+
+_almacen = None
+_lock_configuracion = threading.Lock()
+
+
+def _numero_entorno(variable, por_defecto):
+    try:
+        return max(0.0, float(os.environ.get(variable, por_defecto)))
+    except ValueError:
+        print(f"Advertencia: Valor no válido para {variable}. Se usará {por_defecto}.")
+        return por_defecto
+
+
+def configurar_almacen(almacen):
+    """Reemplaza el almacén de resultados (p. ej. por uno respaldado en un servicio externo)"""
+    global _almacen
+    _almacen = almacen
+
+
+def obtener_almacen():
+    """Devuelve el almacén configurado, creándolo según GENERADOR_ALMACEN_RESULTADOS la primera vez"""
+    global _almacen
+    with _lock_configuracion:
+        if _almacen is None:
+            vigencia = _numero_entorno(VARIABLE_VIGENCIA, 3600)
+            capacidad = int(_numero_entorno(VARIABLE_CAPACIDAD_MB, 512) * 1024 * 1024)
+            if os.environ.get(VARIABLE_ALMACEN, 'archivos').strip().lower() == 'memoria':
+                _almacen = ResultadosMemoria(capacidad, vigencia)
+            else:
+                directorio = (os.environ.get(VARIABLE_DIRECTORIO)
+                              or os.path.join(tempfile.gettempdir(), 'generador_resultados'))
+                _almacen = ResultadosArchivos(directorio, capacidad, vigencia)
+        return _almacen
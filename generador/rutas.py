@@ -0,0 +1,634 @@
+"""Rutas de la API de generación, compartidas por backend.py y api/index.py."""
+import functools
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import nullcontext
+
+from flask import Blueprint, Response, g, make_response, request, jsonify, send_file, url_for
+
+from generador import metricas, perfilado, precarga, resultados, trabajos
+from generador.empaquetado import TIPO_XLSX, TIPO_ZIP, carpetas_origen, transmitir_json, transmitir_zip
+from generador.metricas import medir
+
+# Los módulos que dependen de pandas y openpyxl se importan dentro de las rutas que
+# generan (ver generador.precarga), para que el arranque en frío no los cargue
+
+bp = Blueprint('generador', __name__)
+
+@bp.record_once
+def precargar_al_registrar(estado):
+    """Con GENERADOR_PRECARGA, importa las dependencias pesadas en segundo plano al registrar las rutas"""
+    if precarga.precarga_configurada():
+        precarga.precargar_en_segundo_plano()
+
+# Configuración para subir archivos
+ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+class ErrorEntrada(Exception):
+    """Error en los archivos recibidos, con el código HTTP que debe devolverse"""
+
+    def __init__(self, mensaje, codigo=400):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.codigo = codigo
+
+def respuesta_zip_solicitada():
+    """El ZIP se solicita con ?formato=zip o con un encabezado Accept que prefiera application/zip"""
+    if request.args.get('formato', '').lower() == 'zip':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', TIPO_ZIP]) == TIPO_ZIP
+
+def enlaces_solicitados():
+    """Con ?formato=enlaces los documentos se guardan en el servidor y se responde con la URL de cada uno"""
+    return request.args.get('formato', '').lower() == 'enlaces'
+
+def desglose_solicitado():
+    """El desglose de tiempos por etapa se incluye en la respuesta JSON con ?tiempos=1"""
+    return request.args.get('tiempos', '').lower() in ('1', 'true', 'si')
+
+def perfilable(vista):
+    """
+    Perfila la solicitud si lo pide el encabezado X-Generador-Perfil o le toca por
+    GENERADOR_PERFILADO (ver generador.perfilado). El perfil queda en g.perfil, abarca
+    también la respuesta transmitida y se guarda al cerrarla; su URL de descarga va en
+    el encabezado X-Generador-Perfil-Url.
+    """
+    @functools.wraps(vista)
+    def envoltura(*args, **kwargs):
+        perfil = g.perfil = perfilado.perfil_para(request.headers.get(perfilado.ENCABEZADO))
+        if perfil is None:
+            return vista(*args, **kwargs)
+        try:
+            with perfil:
+                respuesta = make_response(vista(*args, **kwargs))
+        except BaseException:
+            perfil.terminar()
+            raise
+        respuesta.headers['X-Generador-Perfil-Url'] = url_perfil(perfil)
+        respuesta.call_on_close(perfil.terminar)
+        return respuesta
+    return envoltura
+
+def url_perfil(perfil):
+    return url_for('generador.descargar_perfil', id_perfil=perfil.id)
+
+def leer_plantilla():
+    """
+    Obtiene la plantilla preparada del archivo 'plantilla' o, si no se envió, del
+    campo 'plantilla_id' con el id devuelto por /api/plantillas. Lanza ErrorEntrada.
+    """
+    from generador.plantilla import cache_plantillas
+    
+    plantilla = request.files.get('plantilla')
+    if plantilla is None or plantilla.filename == '':
+        plantilla_id = request.form.get('plantilla_id', '').strip()
+        if not plantilla_id:
+            raise ErrorEntrada('No se enviaron archivos' if plantilla is None else 'No se seleccionaron archivos')
+        with medir('plantilla'):
+            plantilla_preparada = cache_plantillas().obtener(plantilla_id)
+        if plantilla_preparada is None:
+            raise ErrorEntrada('La plantilla no se encuentra en el servidor, vuelva a subirla', 404)
+        return plantilla_preparada
+    
+    # Verificar si el archivo es válido
+    if not allowed_file(plantilla.filename):
+        raise ErrorEntrada('Formato de archivo no válido')
+    
+    # Verificar la plantilla, reutilizando la preparación si ya se subió antes
+    try:
+        with medir('lectura_archivo'):
+            contenido_plantilla = plantilla.read()
+        with medir('plantilla'):
+            plantilla_preparada = cache_plantillas().preparar(contenido_plantilla)
+        print(f"Plantilla tiene {plantilla_preparada.num_hojas} hojas")
+    except Exception as e:
+        raise ErrorEntrada(f'Error al verificar la plantilla: {str(e)}', 500)
+    
+    # Verificar que haya al menos 2 hojas
+    if plantilla_preparada.num_hojas < 2:
+        print("Advertencia: La plantilla tiene menos de 2 hojas. Se usará la primera hoja disponible.")
+    
+    return plantilla_preparada
+
+def validar_subida(archivo):
+    """Verifica que el archivo subido tenga nombre y extensión de Excel; lanza ErrorEntrada"""
+    # Verificar si el archivo tiene nombre
+    if archivo.filename == '':
+        raise ErrorEntrada('No se seleccionaron archivos')
+    
+    # Verificar si el archivo es válido
+    if not allowed_file(archivo.filename):
+        raise ErrorEntrada('Formato de archivo no válido')
+
+def validar_encabezados(origen):
+    """
+    Lee solo la fila de encabezados del origen (bytes o archivo binario) y verifica que
+    estén las columnas requeridas. Devuelve los encabezados o lanza ErrorEntrada.
+    """
+    from generador.lectura import COLUMNAS_OPCIONALES, COLUMNAS_REQUERIDAS, leer_encabezados
+    
+    try:
+        with medir('lectura_excel'):
+            encabezados = leer_encabezados(origen)
+    except Exception as e:
+        raise ErrorEntrada(f'Error al leer el archivo Excel: {str(e)}', 500)
+    
+    # Verificar si el archivo tiene columnas
+    if not encabezados:
+        raise ErrorEntrada('El archivo de datos está vacío')
+    
+    # Verificar columnas necesarias
+    for columna in COLUMNAS_REQUERIDAS:
+        if columna not in encabezados:
+            raise ErrorEntrada(f'No se encontró la columna requerida: {columna}')
+    
+    # Informar sobre columnas opcionales que faltan
+    columnas_faltantes = [col for col in COLUMNAS_OPCIONALES if col not in encabezados]
+    if columnas_faltantes:
+        print(f"Advertencia: No se encontraron las siguientes columnas opcionales: {', '.join(columnas_faltantes)}")
+    
+    return encabezados
+
+def agregar_origen(origen, encabezados):
+    """
+    Lee del origen ya validado con validar_encabezados solo las columnas que se usan y lo
+    agrega por institución. Devuelve las instituciones agregadas o lanza ErrorEntrada.
+    """
+    from generador.agregado import agregar_instituciones
+    from generador.lectura import leer_origen
+    
+    try:
+        with medir('lectura_excel'):
+            df = leer_origen(origen, encabezados)
+        print(f"Leídos {len(df)} registros del archivo origen")
+    except Exception as e:
+        raise ErrorEntrada(f'Error al leer el archivo Excel: {str(e)}', 500)
+    
+    # Verificar si el DataFrame tiene datos
+    if df.empty:
+        raise ErrorEntrada('El archivo de datos está vacío')
+    
+    # Agregar por institución y carrera en una sola pasada
+    with medir('agrupacion'):
+        return agregar_instituciones(df)
+
+def leer_instituciones(archivo):
+    """
+    Lee el archivo origen subido y lo agrega por institución. Devuelve las instituciones
+    agregadas o lanza ErrorEntrada.
+    """
+    # El origen se lee directamente de la subida, que Werkzeug guarda en disco si es grande
+    origen = archivo.stream
+    
+    # Validar los encabezados antes de analizar el cuerpo de la hoja
+    encabezados = validar_encabezados(origen)
+    return agregar_origen(origen, encabezados)
+
+def leer_entrada():
+    """
+    Valida y lee el archivo 'archivo' y la plantilla de la solicitud.
+    Devuelve (instituciones agregadas, plantilla preparada, índice de hoja) o lanza ErrorEntrada.
+    """
+    # Verificar si se envió el archivo de datos
+    if 'archivo' not in request.files:
+        raise ErrorEntrada('No se enviaron archivos')
+    
+    archivo = request.files['archivo']
+    validar_subida(archivo)
+    
+    plantilla_preparada = leer_plantilla()
+    instituciones = leer_instituciones(archivo)
+    return instituciones, plantilla_preparada, plantilla_preparada.indice_hoja
+
+def leer_lote():
+    """
+    Valida y lee los archivos origen 'archivos' y la plantilla de una solicitud de lote.
+    Devuelve ([(nombre del archivo, instituciones agregadas)], plantilla preparada, índice
+    de hoja) o lanza ErrorEntrada, con el nombre del archivo si el error es de uno de ellos.
+    """
+    archivos = request.files.getlist('archivos')
+    if not archivos:
+        raise ErrorEntrada('No se enviaron archivos')
+    for archivo in archivos:
+        validar_subida(archivo)
+    
+    # La plantilla se prepara una sola vez para todos los archivos
+    plantilla_preparada = leer_plantilla()
+    
+    origenes = []
+    for archivo in archivos:
+        try:
+            origenes.append((archivo.filename, leer_instituciones(archivo)))
+        except ErrorEntrada as e:
+            raise ErrorEntrada(f'{archivo.filename}: {e.mensaje}', e.codigo)
+    return origenes, plantilla_preparada, plantilla_preparada.indice_hoja
+
+def datos_resultado(id_resultado, archivos, vence):
+    """Datos de un resultado del almacén con la URL de cada documento y la del ZIP que los reúne"""
+    url = url_for('generador.consultar_resultado', id_resultado=id_resultado)
+    return {
+        'id': id_resultado,
+        'url': url,
+        'zip': f'{url}/zip',
+        'vence': vence,
+        'archivos': [{**archivo, 'url': f'{url}/{indice}'} for indice, archivo in enumerate(archivos)]
+    }
+
+def documentos_en_almacen(plan, carpetas=None):
+    """
+    Guarda en el almacén de resultados cada documento del plan en cuanto se genera.
+    Devuelve los datos del resultado (sin 'archivos') y un generador con el nombre,
+    tamaño y URL de cada documento.
+    """
+    almacen = resultados.obtener_almacen()
+    id_resultado = almacen.crear()
+    resultado = datos_resultado(id_resultado, [], time.time() + almacen.vigencia)
+    del resultado['archivos']
+    
+    def enlaces():
+        documentos = plan.documentos(en_base64=False)
+        try:
+            for indice, archivo in enumerate(documentos):
+                nombre = archivo['nombre'] if carpetas is None else f"{carpetas[indice]}/{archivo['nombre']}"
+                posicion = almacen.agregar(id_resultado, nombre, archivo['contenido'])
+                yield {'nombre': archivo['nombre'], 'bytes': len(archivo['contenido']),
+                       'url': f"{resultado['url']}/{posicion}"}
+        finally:
+            # También si la generación falla o el cliente se desconecta; hasta aquí el almacén no lo elimina
+            almacen.terminar(id_resultado)
+    
+    return resultado, enlaces()
+
+def respuesta_documentos(plan, recolector, campos, carpetas=None):
+    """
+    Respuesta con los documentos del PlanIncremental: el ZIP si se solicitó, el JSON con
+    `campos` o, con ?formato=enlaces, el JSON con solo la URL de cada documento guardado
+    en el almacén de resultados; todos se transmiten conforme se generan. `carpetas`
+    indica, en el orden del plan, la carpeta de cada documento dentro del ZIP, que en el
+    JSON va en 'origen'. Las instituciones cuyo nombre de archivo coincide se informan
+    en 'colisiones' (o en el encabezado X-Documentos-Colisiones del ZIP). Debe llamarse
+    dentro del `recolector` de la solicitud.
+    """
+    campos = {**campos, 'colisiones': plan.colisiones}
+    perfil = g.get('perfil')
+    if perfil is not None:
+        campos['perfil'] = url_perfil(perfil)
+    
+    # Transmitir un ZIP con cada documento escrito en cuanto termina su institución
+    if respuesta_zip_solicitada() and not enlaces_solicitados():
+        documentos = plan.documentos(en_base64=False)
+        if carpetas is not None:
+            documentos = ({'nombre': f"{carpeta}/{archivo['nombre']}", 'contenido': archivo['contenido']}
+                          for carpeta, archivo in zip(carpetas, documentos))
+        try:
+            # Como en el JSON, el primero se genera antes de responder para que un error
+            # temprano devuelva 500 en lugar de un ZIP truncado con 200
+            primero = next(documentos, None)
+        except Exception as e:
+            return jsonify({'error': f'Error al procesar documentos: {str(e)}'}), 500
+        if primero is not None:
+            documentos = itertools.chain([primero], documentos)
+        
+        def paquete():
+            with perfilado.perfilando(perfil):
+                yield from transmitir_zip(documentos)
+        
+        return Response(
+            paquete(),
+            mimetype=TIPO_ZIP,
+            headers={
+                'Content-Disposition': 'attachment; filename="documentos_generados.zip"',
+                'X-Documentos-Cache': str(plan.aciertos),
+                'X-Documentos-Regenerados': str(plan.regenerados),
+                'X-Documentos-Compartidos': str(plan.compartidos),
+                'X-Documentos-Colisiones': str(len(plan.colisiones))
+            }
+        )
+    
+    if enlaces_solicitados():
+        # El cliente descarga después solo los documentos que necesita
+        resultado, documentos = documentos_en_almacen(plan, carpetas)
+        campos = {**campos, 'resultado': resultado}
+    else:
+        # Los documentos se codifican y se envían uno por uno, sin acumular la respuesta
+        documentos = plan.documentos()
+    if carpetas is not None:
+        documentos = ({**archivo, 'origen': carpeta} for carpeta, archivo in zip(carpetas, documentos))
+    try:
+        # El primero se genera antes de responder para que un error temprano aún devuelva 500
+        primero = next(documentos, None)
+    except Exception as e:
+        return jsonify({'error': f'Error al procesar documentos: {str(e)}'}), 500
+    
+    def archivos():
+        # Los tiempos de los documentos que se generan durante la transmisión también se
+        # recolectan y se perfilan
+        with recolector if recolector is not None else nullcontext(), perfilado.perfilando(perfil):
+            if primero is not None:
+                yield primero
+            yield from documentos
+    
+    def campos_finales():
+        campos = {'cache': plan.resumen()}
+        if recolector is not None:
+            campos['tiempos'] = recolector.desglose()
+        return campos
+    
+    return Response(transmitir_json(archivos(), campos, campos_finales), mimetype='application/json')
+
+@bp.route('/api/plantillas', methods=['POST'])
+def subir_plantilla():
+    """Prepara una plantilla y devuelve su id para usarla después como 'plantilla_id'"""
+    try:
+        try:
+            plantilla_preparada = leer_plantilla()
+        except ErrorEntrada as e:
+            return jsonify({'error': e.mensaje}), e.codigo
+        
+        return jsonify({
+            'success': True,
+            'id': plantilla_preparada.huella,
+            'hojas': plantilla_preparada.num_hojas
+        })
+    
+    except Exception as e:
+        return jsonify({'error': f'Error: {str(e)}'}), 500
+
+@bp.route('/api/generar_documentos', methods=['POST'])
+@perfilable
+def generar_documentos():
+    from generador.incremental import PlanIncremental
+    
+    try:
+        # Con ?tiempos=1 se acumulan los tiempos por etapa de esta solicitud
+        with metricas.recolectar(desglose_solicitado()) as recolector:
+            try:
+                instituciones, plantilla_preparada, indice_hoja = leer_entrada()
+            except ErrorEntrada as e:
+                return jsonify({'error': e.mensaje}), e.codigo
+            
+            # Solo se regeneran las instituciones cuyos datos cambiaron desde la última vez
+            plan = PlanIncremental(instituciones, plantilla_preparada, indice_hoja)
+            return respuesta_documentos(plan, recolector, {'message': 'Documentos generados'})
+        
+    except Exception as e:
+        return jsonify({'error': f'Error: {str(e)}'}), 500
+
+@bp.route('/api/generar_lote', methods=['POST'])
+@perfilable
+def generar_lote():
+    """
+    Genera los documentos de varios archivos origen ('archivos') con una sola plantilla.
+    La plantilla se prepara una vez y las instituciones de todos los archivos forman una
+    sola cola de generación. En el ZIP los documentos de cada archivo van en una carpeta
+    con su nombre; en el JSON cada documento indica esa carpeta en 'origen' y 'origenes'
+    resume cuántos documentos tiene cada archivo.
+    """
+    from generador.incremental import PlanIncremental
+    
+    try:
+        with metricas.recolectar(desglose_solicitado()) as recolector:
+            try:
+                origenes, plantilla_preparada, indice_hoja = leer_lote()
+            except ErrorEntrada as e:
+                return jsonify({'error': e.mensaje}), e.codigo
+            
+            carpetas = carpetas_origen([nombre for nombre, _ in origenes])
+            instituciones = [registro for _, registros in origenes for registro in registros]
+            # Carpeta de cada documento, en el orden de la cola; los nombres solo pueden coincidir dentro de una
+            carpeta_documentos = [carpeta for carpeta, (_, registros) in zip(carpetas, origenes) for _ in registros]
+            plan = PlanIncremental(instituciones, plantilla_preparada, indice_hoja, grupos=carpeta_documentos)
+            resumen = [{'archivo': nombre, 'carpeta': carpeta, 'documentos': len(registros)}
+                       for carpeta, (nombre, registros) in zip(carpetas, origenes)]
+            return respuesta_documentos(plan, recolector, {'message': 'Documentos generados', 'origenes': resumen},
+                                        carpeta_documentos)
+        
+    except Exception as e:
+        return jsonify({'error': f'Error: {str(e)}'}), 500
+
+@bp.route('/api/validar', methods=['POST'])
+@perfilable
+def validar():
+    """
+    Validación previa, sin generar: encabezados y conteo por institución del archivo
+    'archivo' y hojas y celdas de la plantilla ('plantilla' o 'plantilla_id'). Puede
+    enviarse cualquiera de los dos; 'valido' indica si la generación no encontraría errores.
+    """
+    from generador import validacion
+    from generador.plantilla import cache_plantillas
+    
+    try:
+        inicio = time.perf_counter()
+        archivo = request.files.get('archivo')
+        plantilla = request.files.get('plantilla')
+        plantilla_id = request.form.get('plantilla_id', '').strip()
+        if archivo is None and plantilla is None and not plantilla_id:
+            return jsonify({'error': 'No se enviaron archivos'}), 400
+        try:
+            for subida in (archivo, plantilla):
+                if subida is not None:
+                    validar_subida(subida)
+        except ErrorEntrada as e:
+            return jsonify({'error': e.mensaje}), e.codigo
+        
+        resultado = {}
+        if archivo is not None:
+            resultado['origen'] = validacion.revisar_origen(archivo.read())
+        if plantilla is not None:
+            resultado['plantilla'] = validacion.revisar_plantilla(plantilla.read())
+        elif plantilla_id:
+            plantilla_preparada = cache_plantillas().obtener(plantilla_id)
+            if plantilla_preparada is None:
+                return jsonify({'error': 'La plantilla no se encuentra en el servidor, vuelva a subirla'}), 404
+            resultado['plantilla'] = validacion.revisar_plantilla_preparada(plantilla_preparada)
+        
+        errores = [error for revision in resultado.values() for error in revision['errores']]
+        return jsonify({
+            'success': True,
+            'valido': not errores,
+            **resultado,
+            'segundos': round(time.perf_counter() - inicio, 4)
+        })
+    
+    except Exception as e:
+        return jsonify({'error': f'Error: {str(e)}'}), 500
+
+def guardar_subida(archivo):
+    """Copia la subida a un archivo temporal que sobrevive a la solicitud y devuelve su ruta"""
+    archivo.stream.seek(0)
+    with tempfile.NamedTemporaryFile(prefix='origen_', suffix='.' + archivo.filename.rsplit('.', 1)[1].lower(),
+                                     delete=False) as destino:
+        shutil.copyfileobj(archivo.stream, destino)
+    return destino.name
+
+def preparar_trabajo(ruta, plantilla_preparada, encabezados):
+    """
+    Lee y agrega el origen guardado por guardar_subida, lo elimina y devuelve el
+    PlanIncremental del trabajo. Se ejecuta en segundo plano (ver trabajos.ejecutar_trabajo).
+    """
+    from generador.incremental import PlanIncremental
+    
+    try:
+        with open(ruta, 'rb') as origen:
+            instituciones = agregar_origen(origen, encabezados)
+    finally:
+        os.remove(ruta)
+    return PlanIncremental(instituciones, plantilla_preparada, plantilla_preparada.indice_hoja)
+
+@bp.route('/api/trabajos', methods=['POST'])
+def crear_trabajo():
+    """
+    Valida la solicitud y los encabezados del origen, inicia el trabajo y responde de
+    inmediato con el id; la lectura, la agregación y la generación ocurren en segundo plano
+    """
+    try:
+        try:
+            # Verificar si se envió el archivo de datos
+            if 'archivo' not in request.files:
+                raise ErrorEntrada('No se enviaron archivos')
+            archivo = request.files['archivo']
+            validar_subida(archivo)
+            plantilla_preparada = leer_plantilla()
+            encabezados = validar_encabezados(archivo.stream)
+        except ErrorEntrada as e:
+            return jsonify({'error': e.mensaje}), e.codigo
+        
+        ruta = guardar_subida(archivo)
+        try:
+            id_trabajo = trabajos.iniciar_trabajo(
+                functools.partial(preparar_trabajo, ruta, plantilla_preparada, encabezados))
+        except Exception:
+            os.remove(ruta)
+            raise
+        return jsonify({
+            'success': True,
+            'id': id_trabajo,
+            'progreso': url_for('generador.progreso_trabajo', id_trabajo=id_trabajo),
+            'eventos': url_for('generador.eventos_trabajo', id_trabajo=id_trabajo),
+            'resultado': url_for('generador.resultado_trabajo', id_trabajo=id_trabajo)
+        }), 202
+    
+    except Exception as e:
+        return jsonify({'error': f'Error: {str(e)}'}), 500
+
+@bp.route('/api/trabajos/<id_trabajo>', methods=['GET'])
+def progreso_trabajo(id_trabajo):
+    """Estado del trabajo: instituciones completadas del total"""
+    estado = trabajos.obtener_almacen().obtener(id_trabajo)
+    if estado is None:
+        return jsonify({'error': 'No se encontró el trabajo'}), 404
+    return jsonify(estado)
+
+@bp.route('/api/trabajos/<id_trabajo>/eventos', methods=['GET'])
+def eventos_trabajo(id_trabajo):
+    """Progreso del trabajo como Server-Sent Events hasta que termina"""
+    almacen = trabajos.obtener_almacen()
+    if almacen.obtener(id_trabajo) is None:
+        return jsonify({'error': 'No se encontró el trabajo'}), 404
+    
+    def eventos():
+        anterior = None
+        while True:
+            estado = almacen.obtener(id_trabajo)
+            if estado is None:
+                return
+            # Enviar solo cuando cambia el progreso
+            if estado != anterior:
+                yield f"data: {json.dumps(estado)}\n\n"
+                anterior = estado
+            if trabajos.terminado(estado):
+                return
+            time.sleep(0.5)
+    
+    return Response(eventos(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@bp.route('/api/trabajos/<id_trabajo>/resultado', methods=['GET'])
+def resultado_trabajo(id_trabajo):
+    """Descarga el ZIP de un trabajo terminado"""
+    almacen = trabajos.obtener_almacen()
+    estado = almacen.obtener(id_trabajo)
+    if estado is None:
+        return jsonify({'error': 'No se encontró el trabajo'}), 404
+    if estado['estado'] == trabajos.ERROR:
+        return jsonify({'error': f"Error al procesar documentos: {estado['error']}"}), 500
+    if estado['estado'] != trabajos.TERMINADO:
+        return jsonify({'error': 'El trabajo aún no termina'}), 409
+    
+    return send_file(almacen.abrir_resultado(id_trabajo), mimetype=TIPO_ZIP,
+                     as_attachment=True, download_name='documentos_generados.zip')
+
+@bp.route('/api/perfiles/<id_perfil>', methods=['GET'])
+def descargar_perfil(id_perfil):
+    """Descarga un perfil: .pstats del modo determinista o pilas plegadas (.folded) del muestreo"""
+    ruta = perfilado.ruta_perfil(id_perfil)
+    if ruta is None:
+        return jsonify({'error': 'No se encontró el perfil o aún no termina la solicitud'}), 404
+    return send_file(ruta, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f'perfil_{id_perfil}{ruta[ruta.rindex("."):]}')
+
+@bp.route('/api/resultados/<id_resultado>', methods=['GET'])
+def consultar_resultado(id_resultado):
+    """
+    Nombre, tamaño y URL de cada documento de un resultado guardado con ?formato=enlaces;
+    'terminado' indica si ya están todos
+    """
+    resultado = resultados.obtener_almacen().listar(id_resultado)
+    if resultado is None:
+        return jsonify({'error': 'No se encontró el resultado o ya venció'}), 404
+    return jsonify({'success': True, **datos_resultado(id_resultado, resultado['archivos'], resultado['vence']),
+                    'terminado': resultado['terminado']})
+
+@bp.route('/api/resultados/<id_resultado>/<int:indice>', methods=['GET'])
+def descargar_documento(id_resultado, indice):
+    """Descarga un documento del resultado, enviado desde el almacén sin cargarlo completo"""
+    documento = resultados.obtener_almacen().abrir(id_resultado, indice)
+    if documento is None:
+        return jsonify({'error': 'No se encontró el documento o ya venció'}), 404
+    nombre, archivo = documento
+    return send_file(archivo, mimetype=TIPO_XLSX, as_attachment=True, download_name=nombre.rsplit('/', 1)[-1])
+
+@bp.route('/api/resultados/<id_resultado>/zip', methods=['GET'])
+def descargar_resultado(id_resultado):
+    """Todos los documentos del resultado en un ZIP, leídos del almacén uno por uno"""
+    almacen = resultados.obtener_almacen()
+    resultado = almacen.listar(id_resultado)
+    if resultado is None:
+        return jsonify({'error': 'No se encontró el resultado o ya venció'}), 404
+    
+    def documentos():
+        for indice in range(len(resultado['archivos'])):
+            documento = almacen.abrir(id_resultado, indice)
+            if documento is None:
+                # El resultado venció a media descarga
+                return
+            nombre, archivo = documento
+            with archivo:
+                yield {'nombre': nombre, 'contenido': archivo.read()}
+    
+    return Response(transmitir_zip(documentos()), mimetype=TIPO_ZIP,
+                    headers={'Content-Disposition': 'attachment; filename="documentos_generados.zip"'})
+
+@bp.route('/api/precarga', methods=['GET', 'POST'])
+def precargar():
+    """Carga las dependencias de la generación; útil para calentar la instancia antes de usarla"""
+    ya_cargados = precarga.cargados()
+    segundos = precarga.precargar()
+    return jsonify({
+        'success': True,
+        'ya_cargados': ya_cargados,
+        'segundos': round(segundos, 4)
+    })
+
+@bp.route('/metrics', methods=['GET'])
+def exponer_metricas():
+    """Histogramas de tiempo por etapa en el formato de texto de Prometheus (con GENERADOR_METRICAS)"""
+    if not metricas.metricas_activas():
+        return jsonify({'error': 'Las métricas están desactivadas'}), 404
+    return Response(metricas.registro_metricas().texto_prometheus(), content_type=metricas.TIPO_PROMETHEUS)
@@ -0,0 +1,264 @@
+"""
+Trabajos de generación en segundo plano con seguimiento de progreso.
+
+El almacén de trabajos es intercambiable: `AlmacenMemoria` guarda estado y resultado
+en el proceso y `AlmacenArchivos` los guarda en un directorio, de modo que el estado
+sobrevive a reinicios y puede compartirse entre procesos del mismo equipo. Para usar
+otro respaldo basta con implementar la interfaz de `AlmacenTrabajos` y asignarlo con
+`configurar_almacen`.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+
+from generador.empaquetado import abrir_zip
+
+# Respaldo del almacén: "memoria" (por defecto) o "archivos"
+VARIABLE_ALMACEN = 'GENERADOR_ALMACEN_TRABAJOS'
+# Directorio del almacén de archivos
+VARIABLE_DIRECTORIO = 'GENERADOR_DIRECTORIO_TRABAJOS'
+# Trabajos que se ejecutan a la vez en segundo plano
+VARIABLE_SIMULTANEOS = 'GENERADOR_TRABAJOS_SIMULTANEOS'
+# Segundos que se conservan los trabajos terminados antes de eliminarse
+VARIABLE_VIGENCIA = 'GENERADOR_VIGENCIA_TRABAJOS'
+
+PENDIENTE = 'pendiente'
+EN_PROCESO = 'en_proceso'
+TERMINADO = 'terminado'
+ERROR = 'error'
+
+
+def _entero_entorno(variable, por_defecto):
+    try:
+        return max(1, int(os.environ.get(variable, por_defecto)))
+    except ValueError:
+        print(f"Advertencia: Valor no válido para {variable}. Se usará {por_defecto}.")
+        return por_defecto
+
+
+class AlmacenTrabajos(ABC):
+    """Interfaz del almacén de estado y resultados de los trabajos"""
+
+    def __init__(self, vigencia=3600):
+        self.vigencia = vigencia
+
+    @abstractmethod
+    def crear(self, total):
+        """Registra un trabajo nuevo de `total` instituciones (None si aún no se sabe) y devuelve su identificador"""
+
+    @abstractmethod
+    def actualizar(self, id_trabajo, **cambios):
+        """Actualiza los campos del estado de un trabajo"""
+
+    @abstractmethod
+    def obtener(self, id_trabajo):
+        """Devuelve el estado del trabajo como diccionario, o None si no existe"""
+
+    @abstractmethod
+    def escribir_resultado(self, id_trabajo):
+        """Administrador de contexto que entrega un archivo binario donde escribir el resultado"""
+
+    @abstractmethod
+    def abrir_resultado(self, id_trabajo):
+        """Devuelve un archivo binario de lectura con el resultado, o None si no existe"""
+
+    def _estado_inicial(self, total):
+        return {
+            'id': uuid.uuid4().hex,
+            'estado': PENDIENTE,
+            'completados': 0,
+            'total': total,
+            'cache': None,
+            'colisiones': [],
+            'error': None,
+            'creado': time.time(),
+        }
+
+    def _vencido(self, estado, ahora):
+        return estado['estado'] in (TERMINADO, ERROR) and ahora - estado['creado'] > self.vigencia
+
+
+class AlmacenMemoria(AlmacenTrabajos):
+    """Almacén en el proceso actual; adecuado para un solo servidor y para pruebas locales"""
+
+    def __init__(self, vigencia=3600):
+        super().__init__(vigencia)
+        self._estados = {}
+        self._resultados = {}
+        self._lock = threading.Lock()
+
+    def crear(self, total):
+        estado = self._estado_inicial(total)
+        with self._lock:
+            self._limpiar()
+            self._estados[estado['id']] = estado
+        return estado['id']
+
+    def actualizar(self, id_trabajo, **cambios):
+        with self._lock:
+            self._estados[id_trabajo].update(cambios)
+
+    def obtener(self, id_trabajo):
+        with self._lock:
+            estado = self._estados.get(id_trabajo)
+            return dict(estado) if estado else None
+
+    @contextmanager
+    def escribir_resultado(self, id_trabajo):
+        destino = BytesIO()
+        yield destino
+        with self._lock:
+            self._resultados[id_trabajo] = destino.getvalue()
+
+    def abrir_resultado(self, id_trabajo):
+        with self._lock:
+            contenido = self._resultados.get(id_trabajo)
+        return BytesIO(contenido) if contenido is not None else None
+
+    def _limpiar(self):
+        ahora = time.time()
+        for id_trabajo in [i for i, e in self._estados.items() if self._vencido(e, ahora)]:
+            del self._estados[id_trabajo]
+            self._resultados.pop(id_trabajo, None)
+
+
+class AlmacenArchivos(AlmacenTrabajos):
+    """Almacén en disco: un subdirectorio por trabajo con estado.json y resultado.zip"""
+
+    def __init__(self, directorio, vigencia=3600):
+        super().__init__(vigencia)
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, id_trabajo, nombre):
+        # Los identificadores son hexadecimales; se descarta cualquier otro valor
+        if not id_trabajo.isalnum():
+            raise KeyError(id_trabajo)
+        return os.path.join(self.directorio, id_trabajo, nombre)
+
+    def _guardar(self, estado):
+        ruta = self._ruta(estado['id'], 'estado.json')
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(estado, f)
+        # Reemplazo atómico para que los lectores nunca vean un estado a medio escribir
+        os.replace(temporal, ruta)
+
+    def crear(self, total):
+        estado = self._estado_inicial(total)
+        self._limpiar()
+        os.makedirs(os.path.join(self.directorio, estado['id']))
+        self._guardar(estado)
+        return estado['id']
+
+    def actualizar(self, id_trabajo, **cambios):
+        with self._lock:
+            estado = self.obtener(id_trabajo)
+            estado.update(cambios)
+            self._guardar(estado)
+
+    def obtener(self, id_trabajo):
+        try:
+            with open(self._ruta(id_trabajo, 'estado.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (KeyError, OSError, ValueError):
+            return None
+
+    @contextmanager
+    def escribir_resultado(self, id_trabajo):
+        ruta = self._ruta(id_trabajo, 'resultado.zip')
+        with open(ruta + '.tmp', 'wb') as destino:
+            yield destino
+        os.replace(ruta + '.tmp', ruta)
+
+    def abrir_resultado(self, id_trabajo):
+        try:
+            return open(self._ruta(id_trabajo, 'resultado.zip'), 'rb')
+        except (KeyError, OSError):
+            return None
+
+    def _limpiar(self):
+        ahora = time.time()
+        for id_trabajo in os.listdir(self.directorio):
+            estado = self.obtener(id_trabajo)
+            if estado and self._vencido(estado, ahora):
+                shutil.rmtree(os.path.join(self.directorio, id_trabajo), ignore_errors=True)
+
+
+_almacen = None
+_ejecutor = None
+_lock_configuracion = threading.Lock()
+
+
+def configurar_almacen(almacen):
+    """Reemplaza el almacén de trabajos (p. ej. por uno respaldado en un servicio externo)"""
+    global _almacen
+    _almacen = almacen
+
+
+def obtener_almacen():
+    """Devuelve el almacén configurado, creándolo según GENERADOR_ALMACEN_TRABAJOS la primera vez"""
+    global _almacen
+    with _lock_configuracion:
+        if _almacen is None:
+            vigencia = _entero_entorno(VARIABLE_VIGENCIA, 3600)
+            if os.environ.get(VARIABLE_ALMACEN, 'memoria').strip().lower() == 'archivos':
+                directorio = os.environ.get(VARIABLE_DIRECTORIO) or os.path.join(tempfile.gettempdir(), 'generador_trabajos')
+                _almacen = AlmacenArchivos(directorio, vigencia)
+            else:
+                _almacen = AlmacenMemoria(vigencia)
+        return _almacen
+
+
+def _obtener_ejecutor():
+    global _ejecutor
+    with _lock_configuracion:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=_entero_entorno(VARIABLE_SIMULTANEOS, 2),
+                                           thread_name_prefix='trabajo-generador')
+        return _ejecutor
+
+
+def ejecutar_trabajo(almacen, id_trabajo, preparar):
+    """
+    Obtiene el PlanIncremental con `preparar()` (lectura y agregación del origen), genera sus
+    documentos en un ZIP y actualiza el progreso tras cada institución
+    """
+    try:
+        almacen.actualizar(id_trabajo, estado=EN_PROCESO)
+        plan = preparar()
+        almacen.actualizar(id_trabajo, total=len(plan), cache=plan.resumen(), colisiones=plan.colisiones)
+        with almacen.escribir_resultado(id_trabajo) as destino, abrir_zip(destino) as zip_salida:
+            archivos = plan.documentos(en_base64=False)
+            for completados, archivo in enumerate(archivos, 1):
+                zip_salida.writestr(archivo['nombre'], archivo['contenido'])
+                almacen.actualizar(id_trabajo, completados=completados)
+        almacen.actualizar(id_trabajo, estado=TERMINADO)
+    except Exception as e:
+        print(f"Error en el trabajo {id_trabajo}: {str(e)}")
+        almacen.actualizar(id_trabajo, estado=ERROR, error=str(e))
+
+
+def iniciar_trabajo(preparar):
+    """
+    Registra un trabajo, lo envía a segundo plano y devuelve su identificador sin esperar.
+    `preparar` devuelve el PlanIncremental y se llama ya en segundo plano, así que el total
+    de instituciones se conoce hasta entonces.
+    """
+    almacen = obtener_almacen()
+    id_trabajo = almacen.crear(None)
+    _obtener_ejecutor().submit(ejecutar_trabajo, almacen, id_trabajo, preparar)
+    return id_trabajo
+
+
+def terminado(estado):
+    return estado['estado'] in (TERMINADO, ERROR)
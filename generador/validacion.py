@@ -0,0 +1,315 @@
+"""
+Validación previa de los archivos, sin generar documentos.
+
+Del archivo origen se comparan los encabezados con las columnas requeridas y
+opcionales y se cuentan las filas y carreras de cada institución. El XLSX se
+recorre directamente: la hoja se descomprime por bloques y de cada fila solo se
+leen, con expresiones regulares, las celdas de institución y carrera, sin cargar el
+modelo de openpyxl ni construir un DataFrame. Los archivos que no son XLSX (.xls) se
+leen con pandas, solo esas dos columnas.
+
+De la plantilla se revisan el número de hojas y las celdas del mapeo (ver
+generador.plan) contra las celdas combinadas de la hoja que se llena.
+"""
+import codecs
+import html
+import itertools
+import re
+import zipfile
+from collections import defaultdict
+from io import BytesIO
+
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import column_index_from_string
+
+from generador.combinadas import mapa_rangos
+from generador.columnas import COLUMNA_CARRERA, COLUMNA_INSTITUCION, COLUMNAS_OPCIONALES, COLUMNAS_REQUERIDAS
+from generador.motor_xml import hojas_libro, rangos_combinados
+from generador.nombres import canonizar_institucion, resolver_nombres
+from generador.plan import MAPEO_ALTIPLANO, compilar_plan
+
+# Bytes de la hoja que se descomprimen a la vez
+_TAMANO_BLOQUE = 1 << 20
+
+_RE_FILA = re.compile(r'<row\b[^>]*?(?:/>|>(.*?)</row>)', re.S)
+_RE_CELDA = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_RE_REFERENCIA = re.compile(r'\br="([A-Z]+)\d+"')
+_RE_TIPO = re.compile(r'\bt="(\w+)"')
+_RE_VALOR = re.compile(r'<v>(.*?)</v>', re.S)
+_RE_TEXTO = re.compile(r'<t\b[^>]*?(?:/>|>(.*?)</t>)', re.S)
+_RE_FONETICA = re.compile(r'<rPh\b.*?</rPh>', re.S)
+_RE_CADENA = re.compile(r'<si\b[^>]*?(?:/>|>(.*?)</si>)', re.S)
+
+
+def _texto(contenido):
+    # Texto de una cadena compartida o en línea: todas sus corridas, sin la guía fonética
+    return html.unescape(''.join(t or '' for t in _RE_TEXTO.findall(_RE_FONETICA.sub('', contenido or ''))))
+
+
+class _Compartidas:
+    """Cadenas de sharedStrings.xml, separadas solo hasta la última que se pide"""
+
+    def __init__(self, xml):
+        self._elementos = _RE_CADENA.finditer(xml)
+        self._cadenas = []
+
+    def __getitem__(self, indice):
+        while len(self._cadenas) <= indice:
+            elemento = next(self._elementos, None)
+            if elemento is None:
+                raise IndexError(f'No existe la cadena compartida {indice}')
+            self._cadenas.append(elemento.group(1))
+        return _texto(self._cadenas[indice])
+
+
+def _valor(atributos, contenido):
+    """Valor crudo de una celda: (tipo, texto), o None si está vacía"""
+    tipo = _RE_TIPO.search(atributos)
+    tipo = tipo.group(1) if tipo else 'n'
+    if tipo == 'inlineStr':
+        return tipo, contenido or ''
+    valor = _RE_VALOR.search(contenido or '')
+    return (tipo, valor.group(1)) if valor is not None else None
+
+
+def _decodificar(valor, compartidas):
+    tipo, texto = valor
+    if tipo == 's':
+        return compartidas[int(texto)]
+    if tipo == 'inlineStr':
+        return _texto(texto)
+    return html.unescape(texto)
+
+
+def _bloques(paquete, ruta):
+    """Texto de la hoja en bloques que terminan al cierre de una fila, descomprimiéndola por partes"""
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    pendiente = ''
+    with paquete.open(ruta) as parte:
+        while True:
+            bloque = parte.read(_TAMANO_BLOQUE)
+            texto = pendiente + decodificador.decode(bloque, final=not bloque)
+            if not bloque:
+                yield texto
+                return
+            corte = texto.rfind('</row>')
+            if corte < 0:
+                pendiente = texto
+                continue
+            corte += len('</row>')
+            pendiente = texto[corte:]
+            yield texto[:corte]
+
+
+def _celdas(fila):
+    """Columna y valor crudo de cada celda de una fila"""
+    celdas = []
+    for celda in _RE_CELDA.finditer(fila):
+        referencia = _RE_REFERENCIA.search(celda.group(1))
+        if referencia is None:
+            raise ValueError('Celda sin atributo r')
+        celdas.append((column_index_from_string(referencia.group(1)), _valor(celda.group(1), celda.group(2))))
+    return celdas
+
+
+def _escanear_xlsx(contenido):
+    """Encabezados y, por institución, filas y carreras del XLSX, leyendo solo esas columnas"""
+    paquete = zipfile.ZipFile(BytesIO(contenido))
+    _, _, relaciones_libro, hojas = hojas_libro(paquete)
+    if not hojas:
+        return [], {}
+    ruta_cadenas = next((d for t, d, _ in relaciones_libro.values() if t.endswith('/sharedStrings')), None)
+    compartidas = _Compartidas(paquete.read(ruta_cadenas).decode('utf-8') if ruta_cadenas else '')
+
+    # Los encabezados son la primera fila con algún valor, como en pandas.read_excel
+    bloques = _bloques(paquete, hojas[0])
+    encabezados = []
+    resto = ''
+    for texto in bloques:
+        for fila in _RE_FILA.finditer(texto):
+            celdas = _celdas(fila.group(1) or '')
+            if any(valor is not None for _, valor in celdas):
+                encabezados = [(columna, _decodificar(valor, compartidas) if valor is not None else None)
+                               for columna, valor in celdas]
+                resto = texto[fila.end():]
+                break
+        if encabezados:
+            break
+
+    # Primera aparición de cada columna que se cuenta
+    posiciones = {}
+    for columna, nombre in encabezados:
+        if nombre in (COLUMNA_INSTITUCION, COLUMNA_CARRERA):
+            posiciones.setdefault(nombre, get_column_letter(columna))
+    nombres = [nombre for _, nombre in encabezados if nombre is not None]
+    if COLUMNA_INSTITUCION not in posiciones:
+        return nombres, {}
+
+    # Solo las celdas de las dos columnas, agrupadas por el número de fila de su referencia.
+    # Los valores se comparan crudos y se decodifican al final
+    letras = {letra: nombre == COLUMNA_INSTITUCION for nombre, letra in posiciones.items()}
+    alternativas = '|'.join(letras)
+    # Excel y openpyxl escriben r como primer atributo de la celda, lo que permite un patrón mucho
+    # más rápido; los bloques en que no es así se leen con el patrón general
+    patron_rapido = re.compile(r'<c r="(%s)(\d+)"([^>]*?)(?:/>|>(.*?)</c>)' % alternativas, re.S)
+    patron_general = re.compile(r'<c\b(?=[^>]*?\br="(%s)(\d+)")([^>]*?)(?:/>|>(.*?)</c>)' % alternativas, re.S)
+    conteo = defaultdict(lambda: [0, set()])
+
+    def contar(institucion, carrera):
+        # Las filas sin institución no generan documento
+        if institucion is None or institucion[1] == '':
+            return
+        entrada = conteo[institucion]
+        entrada[0] += 1
+        if carrera is not None and carrera[1] != '':
+            entrada[1].add(carrera)
+
+    fila_actual = institucion = carrera = None
+    for texto in itertools.chain((resto,), bloques):
+        patron = patron_rapido if texto.count('<c ') == texto.count('<c r="') else patron_general
+        for letra, fila, atributos, valor in patron.findall(texto):
+            if fila != fila_actual:
+                contar(institucion, carrera)
+                fila_actual = fila
+                institucion = carrera = None
+            if letras[letra]:
+                institucion = _valor(atributos, valor)
+            else:
+                carrera = _valor(atributos, valor)
+    contar(institucion, carrera)
+
+    instituciones = defaultdict(lambda: [0, set()])
+    for valor, (total, carreras) in conteo.items():
+        entrada = instituciones[canonizar_institucion(_decodificar(valor, compartidas))]
+        entrada[0] += total
+        entrada[1].update(_decodificar(carrera, compartidas) for carrera in carreras)
+    return nombres, instituciones
+
+
+def _escanear_pandas(contenido):
+    """Como _escanear_xlsx, con pandas para los formatos que no son XLSX"""
+    import pandas as pd
+
+    from generador.lectura import leer_encabezados
+
+    encabezados = leer_encabezados(contenido)
+    instituciones = defaultdict(lambda: [0, set()])
+    if COLUMNA_INSTITUCION not in encabezados:
+        return encabezados, instituciones
+    columnas = [c for c in (COLUMNA_INSTITUCION, COLUMNA_CARRERA) if c in encabezados]
+    df = pd.read_excel(BytesIO(contenido), usecols=columnas, dtype=object)
+    carreras = df[COLUMNA_CARRERA] if COLUMNA_CARRERA in columnas else [None] * len(df)
+    for institucion, carrera in zip(df[COLUMNA_INSTITUCION], carreras):
+        if pd.isna(institucion):
+            continue
+        entrada = instituciones[canonizar_institucion(str(institucion))]
+        entrada[0] += 1
+        if not pd.isna(carrera):
+            entrada[1].add(str(carrera))
+    return encabezados, instituciones
+
+
+def revisar_origen(contenido):
+    """
+    Revisa el archivo origen (bytes) sin leerlo completo. Devuelve un diccionario con
+    'columnas', 'faltantes' (requeridas), 'opcionales_faltantes', 'filas', 'instituciones'
+    ([{'institucion', 'filas', 'carreras'}] ordenadas por nombre, con las claves como las
+    agrupa la generación), 'colisiones' (instituciones cuyo archivo tendría el mismo
+    nombre, ver nombres.resolver_nombres), 'errores' y 'advertencias'.
+    """
+    resultado = {'columnas': [], 'faltantes': [], 'opcionales_faltantes': [], 'filas': 0, 'instituciones': [],
+                 'colisiones': [], 'errores': [], 'advertencias': []}
+    try:
+        escanear = _escanear_xlsx if zipfile.is_zipfile(BytesIO(contenido)) else _escanear_pandas
+        encabezados, instituciones = escanear(contenido)
+    except Exception as e:
+        resultado['errores'].append(f'Error al leer el archivo Excel: {str(e)}')
+        return resultado
+
+    resultado['columnas'] = encabezados
+    if not encabezados:
+        resultado['errores'].append('El archivo de datos está vacío')
+        return resultado
+    resultado['faltantes'] = [c for c in COLUMNAS_REQUERIDAS if c not in encabezados]
+    for columna in resultado['faltantes']:
+        resultado['errores'].append(f'No se encontró la columna requerida: {columna}')
+    resultado['opcionales_faltantes'] = [c for c in COLUMNAS_OPCIONALES if c not in encabezados]
+    if resultado['opcionales_faltantes']:
+        resultado['advertencias'].append('No se encontraron las siguientes columnas opcionales: '
+                                         + ', '.join(resultado['opcionales_faltantes']))
+    if resultado['faltantes']:
+        return resultado
+
+    resultado['instituciones'] = [{'institucion': nombre, 'filas': total, 'carreras': len(carreras)}
+                                  for nombre, (total, carreras) in sorted(instituciones.items())]
+    resultado['filas'] = sum(total for total, _ in instituciones.values())
+    if not instituciones:
+        resultado['errores'].append('El archivo no tiene filas con institución')
+    _, resultado['colisiones'] = resolver_nombres([i['institucion'] for i in resultado['instituciones']])
+    for colision in resultado['colisiones']:
+        resultado['advertencias'].append(f"Las instituciones {', '.join(colision['instituciones'])} dan el mismo "
+                                         f"archivo; se guardarán como {', '.join(colision['nombres'])}")
+    return resultado
+
+
+def _coordenada(fila, columna):
+    return f'{get_column_letter(columna)}{fila}'
+
+
+def _revisar_mapeo(num_hojas, indice_hoja, base, mapeo):
+    resultado = {'hojas': num_hojas, 'hoja': indice_hoja, 'region': mapeo['region'], 'celdas': [],
+                 'filas_preformateadas': None, 'errores': [], 'advertencias': []}
+    if num_hojas < 2:
+        resultado['advertencias'].append('La plantilla tiene menos de 2 hojas. Se usará la primera hoja disponible.')
+    try:
+        plan = compilar_plan(mapeo, base)
+        detectado = compilar_plan({**mapeo, 'tabla': {**mapeo['tabla'], 'ultima_preformateada': None}}, base)
+    except ValueError as e:
+        resultado['errores'].append(str(e))
+        return resultado
+
+    celdas = []
+    if plan.fecha_inicio is not None:
+        celdas.append(('fecha_inicio', mapeo['fecha_inicio'], plan.fecha_inicio))
+    celdas += [('texto', coordenada, celda) for (coordenada, _), (celda, _) in zip(mapeo['textos'], plan.textos)]
+    celdas += [(columna, coordenada, celda)
+               for (columna, coordenada), (_, celda) in zip(mapeo['responsable'], plan.responsable)]
+    for dato, coordenada, celda in celdas:
+        declarada = _coordenada(*coordenada)
+        escrita = _coordenada(*celda[:2])
+        resultado['celdas'].append({'dato': dato, 'celda': declarada, 'escribe_en': escrita})
+        if escrita != declarada:
+            resultado['advertencias'].append(f'La celda {declarada} ({dato}) está dentro de un rango combinado; '
+                                             f'el valor se escribirá en {escrita}')
+
+    esperadas = plan.ultima_preformateada - plan.fila_tabla + 1
+    encontradas = detectado.ultima_preformateada - detectado.fila_tabla + 1
+    resultado['filas_preformateadas'] = encontradas
+    if encontradas != esperadas:
+        resultado['advertencias'].append(f'La tabla de carreras de la plantilla tiene {encontradas} filas '
+                                         f'preformateadas; el mapeo {mapeo["region"]} espera {esperadas}')
+    return resultado
+
+
+def revisar_plantilla(contenido, mapeo=MAPEO_ALTIPLANO):
+    """
+    Revisa la plantilla (bytes del XLSX) sin cargarla en openpyxl: número de hojas,
+    celda en la que se escribe cada dato fijo del mapeo y filas preformateadas de la
+    tabla. Devuelve un diccionario con esos datos, 'errores' y 'advertencias'.
+    """
+    try:
+        paquete = zipfile.ZipFile(BytesIO(contenido))
+        _, _, _, hojas = hojas_libro(paquete)
+        if not hojas:
+            return {'hojas': 0, 'errores': ['La plantilla no tiene hojas de cálculo'], 'advertencias': []}
+        indice_hoja = 1 if len(hojas) >= 2 else 0
+        base = mapa_rangos(rangos_combinados(paquete.read(hojas[indice_hoja]).decode('utf-8')))
+    except Exception as e:
+        return {'errores': [f'Error al verificar la plantilla: {str(e)}'], 'advertencias': []}
+    return _revisar_mapeo(len(hojas), indice_hoja, base, mapeo)
+
+
+def revisar_plantilla_preparada(plantilla, mapeo=MAPEO_ALTIPLANO):
+    """Como revisar_plantilla, para una PlantillaPreparada (p. ej. la de un plantilla_id)"""
+    indice_hoja = plantilla.indice_hoja
+    return _revisar_mapeo(plantilla.num_hojas, indice_hoja, plantilla.combinadas(indice_hoja).base, mapeo)
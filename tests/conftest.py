@@ -0,0 +1,15 @@
+import pytest
+
+from benchmarks.sinteticos import generar_plantilla_sintetica
+from generador.plantilla import PlantillaPreparada
+
+
+@pytest.fixture(scope='session')
+def contenido_plantilla():
+    """Bytes de la plantilla sintética de los benchmarks"""
+    return generar_plantilla_sintetica()
+
+
+@pytest.fixture
+def plantilla(contenido_plantilla):
+    return PlantillaPreparada.desde_bytes(contenido_plantilla)
@@ -0,0 +1,47 @@
+"""Agregación del archivo origen por institución."""
+import datetime
+
+import pandas as pd
+
+from generador.agregado import agregar_instituciones
+from generador.columnas import COLUMNA_CARRERA, COLUMNA_DESTINATARIO, COLUMNA_FECHA, COLUMNA_INSTITUCION
+
+
+def _origen(**columnas):
+    return pd.DataFrame(columnas).rename(columns={'institucion': COLUMNA_INSTITUCION, 'carrera': COLUMNA_CARRERA,
+                                                  'fecha': COLUMNA_FECHA})
+
+
+def _fechas(df):
+    return {registro.institucion: registro.fecha_inicio for registro in agregar_instituciones(df)}
+
+
+def test_fecha_en_texto_con_celdas_vacias():
+    df = _origen(institucion=['A', 'A', 'A', 'B'], carrera=['X', 'X', 'Y', 'X'],
+                 fecha=['06/01/2025', None, '10/02/2025', None])
+    # Como el sort_values(...).iloc[0] original: la menor en orden de texto, sin contar las vacías
+    assert _fechas(df) == {'A': '06/01/2025', 'B': None}
+
+
+def test_fecha_mas_antigua():
+    df = _origen(institucion=['A', 'A', 'B'], carrera=['X', 'Y', 'X'],
+                 fecha=[datetime.datetime(2025, 3, 1), datetime.datetime(2025, 1, 6), pd.NaT])
+    assert _fechas(df) == {'A': datetime.datetime(2025, 1, 6), 'B': None}
+
+
+def test_variantes_de_espacios():
+    df = _origen(institucion=['Inst  0', 'Inst 0 ', ' X\nY'], carrera=['a', 'b', 'c'])
+    df[COLUMNA_DESTINATARIO] = ['Responsable', 'Otro', None]
+    registros = agregar_instituciones(df)
+    assert [(r.institucion, r.filas) for r in registros] == [('Inst 0', 2), ('X Y', 1)]
+    # La clave está canonizada, pero la celda de la institución lleva el texto de la primera fila
+    assert registros[0].responsable[COLUMNA_INSTITUCION] == 'Inst  0'
+    assert registros[1].responsable is None
+
+
+def test_tipos_de_fecha_distintos_entre_instituciones():
+    # Texto en una institución y fechas en otra no se pueden ordenar juntos
+    df = _origen(institucion=['A', 'A', 'B', 'B', 'C'], carrera=['X', 'Y', 'X', 'Y', 'X'],
+                 fecha=['10/02/2025', '06/01/2025', datetime.datetime(2025, 3, 1), datetime.datetime(2025, 1, 6),
+                        None])
+    assert _fechas(df) == {'A': '06/01/2025', 'B': datetime.datetime(2025, 1, 6), 'C': None}
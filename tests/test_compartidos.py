@@ -0,0 +1,66 @@
+"""procesar_compartiendo debe dar los mismos documentos que generar cada institución por separado."""
+import io
+import zipfile
+
+import pytest
+
+from benchmarks.sinteticos import generar_origen_sintetico
+from generador import documento
+from generador.agregado import InstitucionAgregada, agregar_instituciones
+from generador.columnas import COLUMNA_INSTITUCION
+from generador.compartidos import MARCA, claves_compartidas, procesar_compartiendo
+
+NOMBRES = ['Instituto A & B', 'Colegio <Norte>', 'Escuela "La Paz"', "Centro d'Estudios", 'Universidad > 2']
+
+
+def repetir(registro, nombres, con_responsable=True):
+    """Instituciones con los datos de `registro` y cada uno de los `nombres`"""
+    repetidas = []
+    for nombre in nombres:
+        responsable = {**registro.responsable, COLUMNA_INSTITUCION: nombre} if con_responsable else None
+        repetidas.append(InstitucionAgregada(nombre, registro.filas, registro.fecha_inicio, registro.carreras,
+                                             responsable))
+    return repetidas
+
+
+def partes(contenido):
+    # docProps/core.xml lleva la fecha de creación, que cambia entre documentos
+    with zipfile.ZipFile(io.BytesIO(contenido)) as paquete:
+        return {nombre: paquete.read(nombre) for nombre in paquete.namelist() if nombre != 'docProps/core.xml'}
+
+
+@pytest.fixture
+def registro():
+    return agregar_instituciones(generar_origen_sintetico(1, carreras_por_institucion=2,
+                                                          estudiantes_por_carrera=3))[0]
+
+
+@pytest.mark.parametrize('motor', [documento.MOTOR_OPENPYXL, documento.MOTOR_XML])
+@pytest.mark.parametrize('con_responsable', [True, False])
+def test_igual_que_por_separado(monkeypatch, plantilla, registro, motor, con_responsable):
+    monkeypatch.setenv(documento.VARIABLE_MOTOR, motor)
+    monkeypatch.setenv(documento.VARIABLE_UMBRAL_FILAS, '0')
+    instituciones = repetir(registro, NOMBRES, con_responsable)
+    assert all(clave is not None for clave in claves_compartidas(instituciones))
+
+    obtenidos = list(procesar_compartiendo(instituciones, plantilla, plantilla.indice_hoja, procesos=1))
+    assert len(obtenidos) == len(instituciones)
+    for institucion, obtenido in zip(instituciones, obtenidos):
+        esperado = documento.procesar_institucion_en_memoria(institucion, plantilla, plantilla.indice_hoja,
+                                                             en_base64=False)
+        assert obtenido['nombre'] == esperado['nombre']
+        assert partes(obtenido['contenido']) == partes(esperado['contenido'])
+        assert all(MARCA.encode('ascii') not in datos for datos in partes(obtenido['contenido']).values())
+
+
+def test_nombres_no_compartibles(monkeypatch, plantilla, registro):
+    # Los nombres con espacios de más se generan por separado, sin la marca
+    monkeypatch.setenv(documento.VARIABLE_MOTOR, documento.MOTOR_XML)
+    instituciones = repetir(registro, [' Instituto A', 'Instituto  A', 'Instituto A'])
+    assert claves_compartidas(instituciones)[:2] == [None, None]
+
+    obtenidos = list(procesar_compartiendo(instituciones, plantilla, plantilla.indice_hoja, procesos=1))
+    for institucion, obtenido in zip(instituciones, obtenidos):
+        esperado = documento.procesar_institucion_en_memoria(institucion, plantilla, plantilla.indice_hoja,
+                                                             en_base64=False)
+        assert partes(obtenido['contenido']) == partes(esperado['contenido'])
@@ -0,0 +1,133 @@
+"""Estructuras del ZIP que arma compresion: encabezado local, directorio central y registro final."""
+import datetime
+import struct
+import zipfile
+import zlib
+from io import BytesIO
+
+from openpyxl import Workbook, load_workbook
+
+from generador.compresion import EntradaZip, ensamblar_zip, entrada_original, fin_directorio, guardar_libro
+
+FECHA = (2025, 3, 14, 15, 9, 26)
+PARTES = [
+    ('[Content_Types].xml', b'<Types/>' * 50, 6),
+    ('xl/worksheets/sheet1.xml', b'<row r="1"/>' * 5000, 1),
+    ('docProps/app.xml', b'<Properties/>', 0),
+    ('xl/media/año.png', bytes(range(256)) * 4, 9),
+]
+
+_LOCAL = '<4s5H3L2H'
+_CENTRAL = '<4s6H3L5H2L'
+_FIN = '<4s4H2LH'
+
+
+def _entradas():
+    return [EntradaZip.comprimir(nombre, datos, FECHA, nivel) for nombre, datos, nivel in PARTES]
+
+
+def test_zip_legible():
+    contenido = ensamblar_zip(_entradas())
+    with zipfile.ZipFile(BytesIO(contenido)) as paquete:
+        assert paquete.testzip() is None
+        assert paquete.namelist() == [nombre for nombre, _, _ in PARTES]
+        for (nombre, datos, nivel), info in zip(PARTES, paquete.infolist()):
+            assert paquete.read(nombre) == datos
+            assert info.compress_type == (zipfile.ZIP_STORED if nivel == 0 else zipfile.ZIP_DEFLATED)
+            assert info.date_time == FECHA
+
+
+def test_encabezado_local():
+    entrada = EntradaZip.comprimir('xl/media/año.png', b'datos' * 100, FECHA)
+    local = entrada.encabezado_local()
+    (firma, version, banderas, metodo, hora, fecha, crc, comprimido, tamano, longitud_nombre,
+     longitud_extra) = struct.unpack(_LOCAL, local[:30])
+    assert firma == b'PK\x03\x04'
+    assert version == 20
+    # Nombre en UTF-8 (bit 11) y sin descriptor de datos (bit 3)
+    assert banderas & 0x800 and not banderas & 0x08
+    assert metodo == zipfile.ZIP_DEFLATED
+    assert (fecha >> 9) + 1980 == 2025 and (fecha >> 5) & 0xF == 3 and fecha & 0x1F == 14
+    assert hora >> 11 == 15 and (hora >> 5) & 0x3F == 9 and (hora & 0x1F) * 2 == 26
+    assert crc == zlib.crc32(b'datos' * 100)
+    assert comprimido == len(entrada.datos) and tamano == 500
+    assert longitud_extra == 0
+    assert local[30:] == 'xl/media/año.png'.encode('utf-8') and longitud_nombre == len(local) - 30
+
+
+def test_nombre_ascii_sin_bandera_utf8():
+    entrada = EntradaZip.comprimir('xl/workbook.xml', b'<workbook/>')
+    assert not struct.unpack(_LOCAL, entrada.encabezado_local()[:30])[2] & 0x800
+
+
+def test_directorio_central_y_registro_final():
+    entradas = _entradas()
+    contenido = ensamblar_zip(entradas)
+
+    # El registro final (sin comentario) ocupa los últimos 22 bytes
+    firma, disco, disco_directorio, en_disco, total, tamano, inicio, comentario = struct.unpack(_FIN, contenido[-22:])
+    assert firma == b'PK\x05\x06'
+    assert disco == disco_directorio == 0
+    assert en_disco == total == len(entradas)
+    assert comentario == 0
+    assert inicio + tamano == len(contenido) - 22
+
+    posicion = inicio
+    for entrada in entradas:
+        campos = struct.unpack(_CENTRAL, contenido[posicion:posicion + 46])
+        (firma, version, version_minima, banderas, metodo, _, _, crc, comprimido, tamano_parte, longitud_nombre,
+         longitud_extra, longitud_comentario, _, _, _, desplazamiento) = campos
+        assert firma == b'PK\x01\x02'
+        assert (version, version_minima) == (20, 20)
+        assert (banderas, metodo, crc, comprimido, tamano_parte) == (
+            entrada.banderas, entrada.metodo, entrada.crc, entrada.comprimido, entrada.tamano)
+        assert longitud_extra == longitud_comentario == 0
+        nombre = contenido[posicion + 46:posicion + 46 + longitud_nombre]
+        assert nombre == entrada.nombre
+
+        # El desplazamiento apunta al encabezado local de la misma parte, seguido de sus datos
+        local = entrada.encabezado_local()
+        assert contenido[desplazamiento:desplazamiento + len(local)] == local
+        inicio_datos = desplazamiento + len(local)
+        assert contenido[inicio_datos:inicio_datos + entrada.comprimido] == entrada.datos
+        posicion += 46 + longitud_nombre
+    assert posicion == inicio + tamano
+
+
+def test_fin_directorio_sin_entradas():
+    assert fin_directorio([], 0) == struct.pack(_FIN, b'PK\x05\x06', 0, 0, 0, 0, 0, 0, 0)
+    with zipfile.ZipFile(BytesIO(ensamblar_zip([]))) as paquete:
+        assert paquete.namelist() == []
+
+
+def test_entrada_original_copia_los_datos_comprimidos():
+    original = BytesIO()
+    with zipfile.ZipFile(original, 'w', zipfile.ZIP_DEFLATED) as paquete:
+        for nombre, datos, _ in PARTES:
+            paquete.writestr(zipfile.ZipInfo(nombre, FECHA), datos, zipfile.ZIP_DEFLATED)
+    contenido = original.getvalue()
+
+    with zipfile.ZipFile(BytesIO(contenido)) as paquete:
+        entradas = [entrada_original(contenido, info) for info in paquete.infolist()]
+    with zipfile.ZipFile(BytesIO(ensamblar_zip(entradas))) as copia:
+        assert copia.testzip() is None
+        for nombre, datos, _ in PARTES:
+            assert copia.read(nombre) == datos
+
+
+def test_comprimir_partes_igual_a_comprimir():
+    fragmentos = [f'<row r="{i}"><c r="A{i}"/></row>' for i in range(20000)]
+    contenido = ''.join(fragmentos).encode('utf-8')
+    for nivel in (0, 1, 6):
+        por_partes = EntradaZip.comprimir_partes('hoja.xml', iter(fragmentos), FECHA, nivel)
+        completo = EntradaZip.comprimir('hoja.xml', contenido, FECHA, nivel)
+        assert (por_partes.crc, por_partes.tamano, por_partes.datos) == (completo.crc, completo.tamano, completo.datos)
+
+
+def test_guardar_libro_actualiza_fecha_de_modificacion():
+    # Como workbook.save, docProps/core.xml lleva la fecha en que se guardó el libro
+    wb = Workbook()
+    wb.properties.modified = datetime.datetime(2000, 1, 1)
+    antes = datetime.datetime.utcnow().replace(microsecond=0)
+    modificado = load_workbook(BytesIO(guardar_libro(wb))).properties.modified
+    assert modificado >= antes
@@ -0,0 +1,40 @@
+"""FormatoFilas escribe el estado interno de openpyxl; su resultado debe ser el de la API pública."""
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+from benchmarks.comparar_motores import describir_documento
+from generador.combinadas import IndiceCombinadas
+from generador.formato import ALINEACION_FILA, BORDE_FILA, FUENTE_FILA, RANGOS_FILA, FormatoFilas
+
+
+def _con_api_publica(ws, fila_inicio, fila_fin):
+    for fila in range(fila_inicio, fila_fin + 1):
+        for inicio, fin in RANGOS_FILA:
+            celda = ws.cell(row=fila, column=inicio)
+            celda.border = BORDE_FILA
+            celda.alignment = ALINEACION_FILA
+            celda.font = FUENTE_FILA
+            ws.merge_cells(start_row=fila, start_column=inicio, end_row=fila, end_column=fin)
+
+
+def _con_formato_filas(ws, fila_inicio, fila_fin):
+    FormatoFilas(ws, IndiceCombinadas.desde_hoja(ws)).formatear_bloque(fila_inicio, fila_fin)
+
+
+def _guardar(wb):
+    salida = BytesIO()
+    wb.save(salida)
+    return salida.getvalue()
+
+
+# Filas preformateadas y ya combinadas, filas con estilo en la plantilla y filas nuevas
+@pytest.mark.parametrize('fila_inicio, fila_fin', [(88, 92), (90, 125), (128, 160)])
+def test_igual_a_la_api_publica(contenido_plantilla, fila_inicio, fila_fin):
+    documentos = []
+    for aplicar in (_con_api_publica, _con_formato_filas):
+        wb = load_workbook(BytesIO(contenido_plantilla))
+        aplicar(wb.worksheets[1], fila_inicio, fila_fin)
+        documentos.append(describir_documento(_guardar(wb), set()))
+    assert documentos[1] == documentos[0]
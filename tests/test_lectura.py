@@ -0,0 +1,35 @@
+"""Lectura del archivo origen."""
+from io import BytesIO
+
+import pandas as pd
+
+from generador.agregado import agregar_instituciones
+from generador.columnas import COLUMNA_CARRERA, COLUMNA_DESTINATARIO, COLUMNA_INSTITUCION
+from generador.lectura import leer_origen
+from generador.validacion import revisar_origen
+
+
+def _archivo(**columnas):
+    salida = BytesIO()
+    pd.DataFrame(columnas).to_excel(salida, index=False)
+    return salida.getvalue()
+
+
+def test_llaves_con_numeros_y_textos():
+    # Una clave numérica entre nombres: antes la columna categórica no se podía ordenar al agrupar
+    contenido = _archivo(**{COLUMNA_INSTITUCION: ['ESCUELA NORTE', 2045, 'CBTIS 12', None, 2045],
+                            COLUMNA_CARRERA: ['A', 1, 'B', 'C', 1],
+                            COLUMNA_DESTINATARIO: ['Responsable'] * 5})
+    df = leer_origen(contenido)
+    assert list(df[COLUMNA_INSTITUCION].cat.categories) == ['2045', 'CBTIS 12', 'ESCUELA NORTE']
+    assert df[COLUMNA_INSTITUCION].isna().sum() == 1
+
+    instituciones = agregar_instituciones(df)
+    assert [(r.institucion, r.filas, [c.nombre for c in r.carreras]) for r in instituciones] == [
+        ('2045', 2, ['1']), ('CBTIS 12', 1, ['B']), ('ESCUELA NORTE', 1, ['A'])]
+
+    # La validación previa cuenta las mismas instituciones que la generación
+    revision = revisar_origen(contenido)
+    assert not revision['errores']
+    assert [(i['institucion'], i['filas'], i['carreras']) for i in revision['instituciones']] == [
+        (r.institucion, r.filas, len(r.carreras)) for r in instituciones]
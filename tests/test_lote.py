@@ -0,0 +1,24 @@
+"""Generación por lotes desde la línea de comandos."""
+import os
+
+from benchmarks.sinteticos import generar_archivo_origen
+from generador.lote import main
+
+
+def test_origenes_con_el_mismo_nombre(tmp_path, contenido_plantilla):
+    plantilla = tmp_path / 'plantilla.xlsx'
+    plantilla.write_bytes(contenido_plantilla)
+    for carpeta, instituciones in (('a', 2), ('b', 3)):
+        (tmp_path / carpeta).mkdir()
+        (tmp_path / carpeta / 'export.xlsx').write_bytes(
+            generar_archivo_origen(instituciones, carreras_por_institucion=1, estudiantes_por_carrera=1))
+    salida = tmp_path / 'salida'
+
+    codigo = main([str(tmp_path / 'a' / 'export.xlsx'), str(tmp_path / 'b' / 'export.xlsx'),
+                   '--plantilla', str(plantilla), '--salida', str(salida), '--procesos', '1'])
+
+    assert codigo == 0
+    # Cada archivo en su propio subdirectorio: el segundo no sobrescribe los documentos del primero
+    assert sorted(os.listdir(salida)) == ['export', 'export (2)']
+    assert len(os.listdir(salida / 'export')) == 2
+    assert len(os.listdir(salida / 'export (2)')) == 3
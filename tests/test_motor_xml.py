@@ -0,0 +1,161 @@
+"""Parchado del XML de la hoja: escritura de celdas, lectura de la plantilla y partes sin cambios."""
+import datetime
+import re
+import zipfile
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell._writer import etree_write_cell
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.utils.datetime import WINDOWS_EPOCH
+from openpyxl.xml.functions import tostring
+
+from generador.motor_xml import (HojaXml, PlantillaNoCompatible, PlantillaXml, _convertir_valor,
+                                 _xml_celda_valor)
+
+VALORES = [
+    None, '', 'texto', '  con espacios ', 'a & b < c > d', 'ñandú', 42, -7, 1.5, 1e-20, 12345678901234567890,
+    float('nan'), float('inf'), True, False, Decimal('2.50'),
+    datetime.datetime(2025, 1, 6, 8, 30), datetime.date(2025, 2, 10), datetime.time(13, 45),
+    datetime.timedelta(hours=36), '=SUM(A1:A2)', '=A1&"<x>"', '#N/A', '#DIV/0!',
+]
+
+
+def _xml_openpyxl(valor):
+    # El escritor de openpyxl solo se usa aquí, como referencia de lo que escribe el motor XML
+    celda = Workbook().active.cell(row=3, column=2)
+    celda.value = valor
+    elementos = []
+    escritor = type('Escritor', (), {'write': lambda self, elemento: elementos.append(elemento)})()
+    etree_write_cell(escritor, None, celda, True)
+    return re.sub(r' s="\d+"', ' s="7"', tostring(elementos[0]).decode('utf-8'))
+
+
+@pytest.mark.parametrize('valor', VALORES, ids=repr)
+def test_xml_celda_igual_a_openpyxl(valor):
+    tipo, convertido, _ = _convertir_valor(valor, 'General')
+    assert _xml_celda_valor('B3', 7, tipo, convertido, WINDOWS_EPOCH) == _xml_openpyxl(valor)
+
+
+def test_zona_horaria_rechazada():
+    valor = datetime.datetime(2025, 1, 6, tzinfo=datetime.timezone.utc)
+    tipo, convertido, _ = _convertir_valor(valor, 'General')
+    with pytest.raises(TypeError):
+        _xml_celda_valor('A1', 0, tipo, convertido, WINDOWS_EPOCH)
+
+
+def _plantilla_lectura():
+    wb = Workbook()
+    ws = wb.active
+    ws['A1'] = 'compartido'
+    ws['A2'] = 17
+    ws['A3'] = 2.25
+    ws['A4'] = True
+    ws['A5'] = datetime.datetime(2025, 1, 6)
+    ws['A6'] = '=A2*2'
+    ws['A7'] = '#N/A'
+    ws['B1'].font = Font(name='Arial', size=14, bold=True)
+    ws['B2'].alignment = Alignment(horizontal='center', wrap_text=True)
+    ws['B3'].border = Border(left=Side(style='thin'))
+    ws.merge_cells('C1:D2')
+    salida = BytesIO()
+    wb.save(salida)
+    return salida.getvalue()
+
+
+def test_lectura_de_la_plantilla():
+    contenido = _plantilla_lectura()
+    ws = load_workbook(BytesIO(contenido)).active
+    hoja = HojaXml(PlantillaXml(contenido, 0))
+    for fila in range(1, 9):
+        for columna in range(1, 5):
+            esperada, obtenida = ws.cell(row=fila, column=columna), hoja.cell(fila, columna)
+            # Los estilos de openpyxl son StyleProxy: se comparan desde ellos
+            assert esperada.value == obtenida.value
+            assert esperada.font == obtenida.font
+            assert esperada.alignment == obtenida.alignment
+            assert esperada.border == obtenida.border
+
+
+def test_lectura_despues_de_escribir():
+    hoja = HojaXml(PlantillaXml(_plantilla_lectura(), 0))
+    celda = hoja.cell(1, 1)
+    celda.value = 'nuevo'
+    celda.font = Font(italic=True)
+    assert celda.value == 'nuevo'
+    assert celda.font.i
+    assert hoja.cell(2, 1).value == 17
+    assert hoja.cell(1, 4).value is None
+
+
+def test_documento_parchado(contenido_plantilla):
+    plantilla = PlantillaXml(contenido_plantilla, 1)
+    documento = plantilla.nuevo_documento()
+    hoja = documento.hoja
+    hoja.cell(7, 5).value = datetime.datetime(2025, 1, 6)
+    hoja.cell(200, 3).value = 'fila nueva'
+    hoja.merge_cells(start_row=200, start_column=3, end_row=200, end_column=4)
+    hoja.column_dimensions['C'].width = 30
+    contenido = documento.guardar()
+
+    ws = load_workbook(BytesIO(contenido)).worksheets[1]
+    assert ws.cell(row=7, column=5).value == datetime.datetime(2025, 1, 6)
+    assert ws.cell(row=7, column=5).is_date
+    assert ws.cell(row=200, column=3).value == 'fila nueva'
+    assert 'C200:D200' in {str(r) for r in ws.merged_cells.ranges}
+    assert ws.column_dimensions['C'].width == 30
+    # El texto fijo de la plantilla se conserva
+    assert ws.cell(row=87, column=2).value == 'CARRERA'
+
+    # Las partes que no son la hoja ni los estilos se copian sin cambios
+    with zipfile.ZipFile(BytesIO(contenido_plantilla)) as original, zipfile.ZipFile(BytesIO(contenido)) as nuevo:
+        assert nuevo.testzip() is None
+        variables = {plantilla.ruta_hoja, plantilla.ruta_estilos}
+        for nombre in original.namelist():
+            if nombre not in variables:
+                assert nuevo.read(nombre) == original.read(nombre)
+
+
+def _reemplazar_partes(contenido, reemplazos, nuevas=None):
+    salida = BytesIO()
+    with zipfile.ZipFile(BytesIO(contenido)) as original, zipfile.ZipFile(salida, 'w') as copia:
+        for info in original.infolist():
+            datos = original.read(info)
+            for anterior, nuevo in reemplazos.get(info.filename, ()):
+                datos = datos.replace(anterior, nuevo)
+            copia.writestr(info, datos)
+        for nombre, datos in (nuevas or {}).items():
+            copia.writestr(nombre, datos)
+    return salida.getvalue()
+
+
+def test_lectura_de_textos_compartidos():
+    # Excel guarda el texto en sharedStrings.xml, con formato por tramos en <r>
+    textos = (b'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="2" uniqueCount="2">'
+              b'<si><t>compartido</t></si><si><r><t>con </t></r><r><rPr><b/></rPr><t>formato</t></r></si></sst>')
+    contenido = _reemplazar_partes(_plantilla_lectura(), {
+        'xl/worksheets/sheet1.xml': [
+            (b'<c r="A1" t="inlineStr"><is><t>compartido</t></is></c>', b'<c r="A1" t="s"><v>0</v></c>'),
+            (b'<c r="A7" t="e"><v>#N/A</v></c>', b'<c r="A7" t="s"><v>1</v></c>'),
+        ],
+        'xl/_rels/workbook.xml.rels': [(b'</Relationships>', (
+            b'<Relationship Id="rIdTextos" Target="sharedStrings.xml" Type="http://schemas.openxmlformats.org/'
+            b'officeDocument/2006/relationships/sharedStrings"/></Relationships>'))],
+        '[Content_Types].xml': [(b'</Types>', (
+            b'<Override PartName="/xl/sharedStrings.xml" ContentType="application/'
+            b'vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>'))],
+    }, {'xl/sharedStrings.xml': textos})
+    ws = load_workbook(BytesIO(contenido)).active
+    hoja = HojaXml(PlantillaXml(contenido, 0))
+    assert hoja.cell(1, 1).value == ws['A1'].value == 'compartido'
+    assert hoja.cell(7, 1).value == ws['A7'].value == 'con formato'
+
+
+def test_formulas_compartidas_no_compatibles():
+    contenido = _reemplazar_partes(_plantilla_lectura(), {
+        'xl/worksheets/sheet1.xml': [(b'<f>A2*2</f>', b'<f t="shared" ref="A6:A7" si="0">A2*2</f>')],
+    })
+    with pytest.raises(PlantillaNoCompatible):
+        PlantillaXml(contenido, 0)
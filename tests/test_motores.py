@@ -0,0 +1,31 @@
+"""Los motores openpyxl y XML deben producir documentos equivalentes celda por celda."""
+import pytest
+
+from benchmarks.comparar_motores import ESCENARIOS, celdas_combinadas_plantilla, describir_documento
+from benchmarks.sinteticos import generar_origen_sintetico
+from generador import documento
+from generador.agregado import agregar_instituciones
+
+
+def generar(monkeypatch, motor, plantilla, instituciones):
+    monkeypatch.setenv(documento.VARIABLE_MOTOR, motor)
+    # Sin umbral, para que el motor openpyxl escriba también las tablas grandes
+    monkeypatch.setenv(documento.VARIABLE_UMBRAL_FILAS, '0')
+    return [documento.procesar_institucion_en_memoria(registro, plantilla, plantilla.indice_hoja, en_base64=False)
+            for registro in instituciones]
+
+
+@pytest.mark.parametrize('escenario', ESCENARIOS)
+def test_motores_equivalentes(monkeypatch, contenido_plantilla, plantilla, escenario):
+    parametros, faltantes = ESCENARIOS[escenario]
+    origen = generar_origen_sintetico(2, **parametros).drop(columns=list(faltantes))
+    instituciones = agregar_instituciones(origen)
+    assert plantilla.plantilla_xml(plantilla.indice_hoja) is not None
+
+    esperados = generar(monkeypatch, documento.MOTOR_OPENPYXL, plantilla, instituciones)
+    obtenidos = generar(monkeypatch, documento.MOTOR_XML, plantilla, instituciones)
+
+    excluir = celdas_combinadas_plantilla(contenido_plantilla)
+    for esperado, obtenido in zip(esperados, obtenidos):
+        assert esperado['nombre'] == obtenido['nombre']
+        assert describir_documento(obtenido['contenido'], excluir) == describir_documento(esperado['contenido'], excluir)
@@ -0,0 +1,33 @@
+"""Nombre del archivo de cada institución y texto de la institución en el documento."""
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from generador import documento
+from generador.agregado import agregar_instituciones
+from generador.columnas import COLUMNA_CARGO, COLUMNA_CARRERA, COLUMNA_DESTINATARIO, COLUMNA_INSTITUCION
+from generador.nombres import resolver_nombres
+
+
+def test_colisiones_con_sufijo():
+    nombres, colisiones = resolver_nombres(['U.N.A.M.', 'UNAM', 'unam', 'Otra'])
+    assert [n.split(' - ')[0] for n in nombres] == [
+        '2_REG. DE PROG. UNAM', '2_REG. DE PROG. UNAM', '2_REG. DE PROG. unam', '2_REG. DE PROG. Otra']
+    assert nombres[1].endswith(' (2).xlsx') and nombres[2].endswith(' (3).xlsx')
+    assert len(colisiones) == 1 and colisiones[0]['instituciones'] == ['U.N.A.M.', 'UNAM', 'unam']
+
+
+@pytest.mark.parametrize('motor', [documento.MOTOR_OPENPYXL, documento.MOTOR_XML])
+def test_documento_conserva_el_texto_original(monkeypatch, plantilla, motor):
+    monkeypatch.setenv(documento.VARIABLE_MOTOR, motor)
+    df = pd.DataFrame({COLUMNA_INSTITUCION: ['Inst  0', 'Inst 0'], COLUMNA_CARRERA: ['a', 'b'],
+                       COLUMNA_DESTINATARIO: ['Responsable', 'Otro'], COLUMNA_CARGO: ['Director', 'Directora']})
+    registro, = agregar_instituciones(df)
+    generado = documento.procesar_institucion_en_memoria(registro, plantilla, plantilla.indice_hoja, en_base64=False)
+
+    # El archivo lleva la clave canonizada y la celda el texto como viene en el origen
+    assert generado['nombre'] == '2_REG. DE PROG. Inst 0 - PEMEX 2025 ALTIPLANO.xlsx'
+    ws = load_workbook(BytesIO(generado['contenido'])).worksheets[plantilla.indice_hoja]
+    assert ws.cell(row=116, column=5).value == 'Inst  0'
@@ -0,0 +1,50 @@
+"""Los normalizadores deben dar exactamente lo mismo que las funciones originales de formato."""
+import random
+
+import pytest
+
+from benchmarks.bench_normalizacion import format_activity_text_original, format_career_name_original
+from generador.normalizacion import Normalizador, formatear_actividad, formatear_carrera
+
+SEMILLA = 20250106
+CASOS = 5000
+
+# Fragmentos que ejercitan los casos límite: puntos repetidos, espacios de todo tipo,
+# acentos, letras que cambian de longitud al pasar a mayúsculas y palabras especiales
+_FRAGMENTOS = ['.', '..', '...', ' ', '  ', '\t', '\n', '\xa0', 'a', 'Z', 'ñ', 'É', 'ß', 'ﬁ', 'İ', 'ǅ', '1', '-',
+               'de', 'DEL', 'La', 'los', 'y', 'EN', 'las', 'ingenieria', 'SISTEMAS', 'apoyo', 'Revisión']
+
+PARES = [(formatear_carrera, format_career_name_original), (formatear_actividad, format_activity_text_original)]
+IDS = ['carrera', 'actividad']
+
+
+@pytest.fixture(scope='module')
+def textos():
+    aleatorio = random.Random(SEMILLA)
+    return [''.join(aleatorio.choice(_FRAGMENTOS) for _ in range(aleatorio.randint(0, 12))) for _ in range(CASOS)]
+
+
+@pytest.mark.parametrize('nueva, original', PARES, ids=IDS)
+def test_igual_a_la_original(textos, nueva, original):
+    normalizador = Normalizador(nueva, capacidad=CASOS // 10)
+    # Dos pasadas: la segunda sale en parte de la caché
+    for texto in textos + textos:
+        esperado = original(texto)
+        assert nueva(texto) == esperado, texto
+        assert normalizador(texto) == esperado, texto
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('INGENIERIA EN SISTEMAS DE LA INFORMACION', 'Ingenieria en Sistemas de la Informacion'),
+    ('licenciatura  y   DERECHO', 'Licenciatura y Derecho'),
+])
+def test_carrera(texto, esperado):
+    assert formatear_carrera(texto) == esperado
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('APOYO EN EL AREA. REVISION DE DOCUMENTOS... Y ARCHIVO', 'Apoyo en el area. Revision de documentos... Y archivo'),
+    ('', ''),
+])
+def test_actividad(texto, esperado):
+    assert formatear_actividad(texto) == esperado
@@ -0,0 +1,30 @@
+import pytest
+
+from generador import perfilado
+
+
+@pytest.fixture(autouse=True)
+def entorno(monkeypatch):
+    for variable in (perfilado.VARIABLE_TASA, perfilado.VARIABLE_MODO, perfilado.VARIABLE_MODO_POR_ENCABEZADO):
+        monkeypatch.delenv(variable, raising=False)
+
+
+@pytest.mark.parametrize('encabezado', ['1', 'true', 'muestreo', 'determinista'])
+def test_encabezado_usa_modo_configurado(encabezado):
+    assert perfilado.perfil_para(encabezado).modo == perfilado.MODO_MUESTREO
+
+
+def test_encabezado_respeta_modo_del_servidor(monkeypatch):
+    monkeypatch.setenv(perfilado.VARIABLE_MODO, perfilado.MODO_DETERMINISTA)
+    assert perfilado.perfil_para('muestreo').modo == perfilado.MODO_DETERMINISTA
+
+
+def test_modo_por_encabezado_permitido(monkeypatch):
+    monkeypatch.setenv(perfilado.VARIABLE_MODO_POR_ENCABEZADO, '1')
+    assert perfilado.perfil_para('determinista').modo == perfilado.MODO_DETERMINISTA
+    assert perfilado.perfil_para('1').modo == perfilado.MODO_MUESTREO
+
+
+def test_sin_encabezado_ni_tasa():
+    assert perfilado.perfil_para(None) is None
+    assert perfilado.perfil_para('no') is None
@@ -0,0 +1,79 @@
+"""Almacén de resultados: los que aún reciben documentos no se eliminan."""
+import os
+
+import pytest
+
+from generador.resultados import AlmacenResultados, ResultadosArchivos, ResultadosMemoria
+
+
+@pytest.fixture(params=['memoria', 'archivos'])
+def crear_almacen(request, tmp_path):
+    def crear(capacidad, vigencia=3600):
+        if request.param == 'memoria':
+            return ResultadosMemoria(capacidad, vigencia)
+        return ResultadosArchivos(str(tmp_path / 'resultados'), capacidad, vigencia)
+    return crear
+
+
+def test_no_elimina_un_resultado_en_curso_por_espacio(crear_almacen):
+    almacen = crear_almacen(capacidad=10)
+    en_curso = almacen.crear()
+    almacen.agregar(en_curso, 'a.xlsx', b'x' * 20)
+
+    # Otro resultado se crea con el almacén lleno: el que está en curso se conserva
+    otro = almacen.crear()
+    assert almacen.agregar(en_curso, 'b.xlsx', b'y' * 5) == 1
+    almacen.terminar(en_curso)
+    nombre, archivo = almacen.abrir(en_curso, 1)
+    with archivo:
+        assert (nombre, archivo.read()) == ('b.xlsx', b'y' * 5)
+    assert almacen.listar(en_curso)['terminado']
+
+    # Ya terminado, sí se elimina para hacer espacio
+    almacen.terminar(otro)
+    almacen.crear()
+    assert almacen.listar(en_curso) is None
+
+
+def test_no_elimina_un_resultado_en_curso_vencido(crear_almacen):
+    almacen = crear_almacen(capacidad=1 << 20, vigencia=0)
+    en_curso = almacen.crear()
+    almacen.crear()
+    assert almacen.agregar(en_curso, 'a.xlsx', b'x') == 0
+    almacen.terminar(en_curso)
+    almacen.crear()
+    assert almacen.abrir(en_curso, 0) is None
+
+
+def test_interfaz_abstracta():
+    class Incompleto(AlmacenResultados):
+        def crear(self):
+            return 'id'
+
+    with pytest.raises(TypeError):
+        Incompleto(0)
+
+
+def test_archivos_indice_por_lineas(tmp_path):
+    directorio = str(tmp_path / 'resultados')
+    almacen = ResultadosArchivos(directorio, capacidad=1 << 20)
+    id_resultado = almacen.crear()
+    indice = os.path.join(directorio, id_resultado, 'indice.json')
+    with open(indice, encoding='utf-8') as f:
+        estado = f.read()
+    for i in range(3):
+        assert almacen.agregar(id_resultado, f'{i}.xlsx', b'x' * (i + 1)) == i
+
+    # Cada documento agrega una línea; indice.json no se reescribe hasta terminar
+    with open(indice, encoding='utf-8') as f:
+        assert f.read() == estado
+    with open(os.path.join(directorio, id_resultado, 'archivos.jsonl'), 'a', encoding='utf-8') as f:
+        f.write('{"nombre": "a medio escri')
+    # Otro almacén sobre el mismo directorio ve los documentos completos mientras se genera
+    otro = ResultadosArchivos(directorio, capacidad=1 << 20)
+    listado = otro.listar(id_resultado)
+    assert not listado['terminado']
+    assert listado['archivos'] == [{'nombre': f'{i}.xlsx', 'bytes': i + 1} for i in range(3)]
+
+    almacen.terminar(id_resultado)
+    assert otro.listar(id_resultado)['terminado']
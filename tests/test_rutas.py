@@ -0,0 +1,131 @@
+import json
+import time
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from backend import app
+from benchmarks.sinteticos import generar_archivo_origen
+from generador import trabajos
+
+
+@pytest.fixture
+def cliente():
+    return app.test_client()
+
+
+@pytest.fixture
+def almacen():
+    """Almacén de trabajos propio de la prueba"""
+    anterior = trabajos._almacen
+    almacen = trabajos.AlmacenMemoria()
+    trabajos.configurar_almacen(almacen)
+    yield almacen
+    trabajos.configurar_almacen(anterior)
+
+
+def _subida(contenido_plantilla, origen):
+    return {
+        'archivo': (BytesIO(origen), 'origen.xlsx'),
+        'plantilla': (BytesIO(contenido_plantilla), 'plantilla.xlsx'),
+    }
+
+
+def _esperar(cliente, url, limite=60):
+    fin = time.monotonic() + limite
+    while True:
+        estado = cliente.get(url).get_json()
+        if trabajos.terminado(estado) or time.monotonic() > fin:
+            return estado
+        time.sleep(0.05)
+
+
+def test_trabajo_completo(cliente, almacen, contenido_plantilla):
+    origen = generar_archivo_origen(instituciones=3, carreras_por_institucion=2, estudiantes_por_carrera=2)
+    respuesta = cliente.post('/api/trabajos', data=_subida(contenido_plantilla, origen))
+    assert respuesta.status_code == 202
+    creado = respuesta.get_json()
+    assert almacen.obtener(creado['id']) is not None
+
+    estado = _esperar(cliente, creado['progreso'])
+    assert estado['estado'] == trabajos.TERMINADO
+    assert estado['completados'] == estado['total'] == 3
+    assert estado['colisiones'] == []
+
+    eventos = cliente.get(creado['eventos'])
+    assert eventos.mimetype == 'text/event-stream'
+    datos = [json.loads(linea[len('data: '):]) for linea in eventos.get_data(as_text=True).split('\n\n') if linea]
+    assert datos[-1]['estado'] == trabajos.TERMINADO
+
+    resultado = cliente.get(creado['resultado'])
+    assert resultado.status_code == 200
+    with zipfile.ZipFile(BytesIO(resultado.data)) as zip_resultado:
+        assert len(zip_resultado.namelist()) == 3
+
+
+def test_errores_del_origen_en_segundo_plano(cliente, almacen, contenido_plantilla, monkeypatch):
+    # La lectura del cuerpo de la hoja ocurre en el trabajo, no al crearlo
+    def fallar(*args, **kwargs):
+        raise ValueError('hoja dañada')
+    monkeypatch.setattr('generador.lectura.leer_origen', fallar)
+
+    origen = generar_archivo_origen(instituciones=2)
+    respuesta = cliente.post('/api/trabajos', data=_subida(contenido_plantilla, origen))
+    assert respuesta.status_code == 202
+    creado = respuesta.get_json()
+
+    estado = _esperar(cliente, creado['progreso'])
+    assert estado['estado'] == trabajos.ERROR
+    assert 'hoja dañada' in estado['error']
+    resultado = cliente.get(creado['resultado'])
+    assert resultado.status_code == 500
+    assert 'hoja dañada' in resultado.get_json()['error']
+
+
+def test_encabezados_se_validan_al_crear(cliente, almacen, contenido_plantilla):
+    salida = BytesIO()
+    pd.DataFrame({'OTRA': [1]}).to_excel(salida, index=False)
+    respuesta = cliente.post('/api/trabajos', data=_subida(contenido_plantilla, salida.getvalue()))
+    assert respuesta.status_code == 400
+    assert 'columna requerida' in respuesta.get_json()['error']
+
+
+def test_trabajo_inexistente(cliente, almacen):
+    assert cliente.get('/api/trabajos/abc123').status_code == 404
+    assert cliente.get('/api/trabajos/abc123/eventos').status_code == 404
+    assert cliente.get('/api/trabajos/abc123/resultado').status_code == 404
+
+
+@pytest.mark.parametrize('consulta, encabezados', [
+    ('?formato=zip', {}),
+    ('', {'Accept': 'application/zip'}),
+])
+def test_generar_zip(cliente, contenido_plantilla, consulta, encabezados):
+    origen = generar_archivo_origen(instituciones=3, carreras_por_institucion=2, estudiantes_por_carrera=2)
+    respuesta = cliente.post('/api/generar_documentos' + consulta, headers=encabezados,
+                             data=_subida(contenido_plantilla, origen))
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == 'application/zip'
+    assert respuesta.headers['X-Documentos-Colisiones'] == '0'
+    with zipfile.ZipFile(BytesIO(respuesta.data)) as zip_resultado:
+        assert len(zip_resultado.namelist()) == 3
+
+
+@pytest.mark.parametrize('consulta, encabezados', [
+    ('?formato=zip', {}),
+    ('', {'Accept': 'application/zip'}),
+])
+def test_generar_zip_error_temprano(cliente, contenido_plantilla, monkeypatch, consulta, encabezados):
+    # Un error al generar el primer documento devuelve 500, no un ZIP truncado con 200
+    def fallar(self, *args, **kwargs):
+        raise ValueError('plantilla dañada')
+        yield
+    monkeypatch.setattr('generador.incremental.PlanIncremental.documentos', fallar)
+
+    origen = generar_archivo_origen(instituciones=2)
+    respuesta = cliente.post('/api/generar_documentos' + consulta, headers=encabezados,
+                             data=_subida(contenido_plantilla, origen))
+    assert respuesta.status_code == 500
+    assert 'plantilla dañada' in respuesta.get_json()['error']